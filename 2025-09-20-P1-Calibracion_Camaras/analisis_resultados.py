@@ -2,19 +2,21 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import os
-import glob
+from undistorter import Undistorter
+from reproyeccion import cargar_reporte
 
 def analizar_resultados():
     print("📊 Analizando resultados de calibración...")
     
-    # Cargar parámetros
-    try:
-        mtx = np.load('resultados/camera_matrix.npy')
-        dist = np.load('resultados/distortion_coeffs.npy')
-    except FileNotFoundError:
+    # Cargar el reporte de calibracion.py (parámetros, errores y vistas)
+    reporte, arreglos = cargar_reporte('resultados')
+    if reporte is None:
         print("❌ Ejecuta calibracion.py primero")
         return
     
+    mtx = reporte['camera_matrix']
+    dist = reporte['dist_coeffs']
+    
     # Mostrar parámetros detallados
     print("\n🔍 ANÁLISIS DETALLADO DE PARÁMETROS:")
     
@@ -48,30 +50,75 @@ def analizar_resultados():
     else:
         print("🟢 Distorsión radial baja")
     
+    # Errores de reproyección por vista
+    analizar_errores(reporte, arreglos)
+    
     # Generar gráficos comparativos
-    generar_graficos_comparacion()
+    generar_graficos_comparacion(reporte)
     
     # Análisis específico de distorsión
-    analizar_distorsion()
+    analizar_distorsion(reporte)
     
     # Generar reporte final
-    generar_reporte_final()
+    generar_reporte_final(reporte)
 
-def generar_graficos_comparacion():
+def analizar_errores(reporte, arreglos):
+    """Errores por vista del reporte y gráfico de errores y residuos por esquina"""
+    
+    print(f"\n📏 ERROR DE REPROYECCIÓN:")
+    print(f"Error RMS global: {reporte['rms']:.4f} píxeles "
+          f"({reporte['vistas_usadas']}/{len(reporte['vistas'])} vistas usadas)")
+    
+    for vista in reporte['vistas']:
+        marca = "✅" if vista['usada'] else "🗑️ "
+        print(f"{marca} {os.path.basename(vista['imagen'])}: RMS {vista['error_rms']:.4f} px, "
+              f"máximo {vista['error_max']:.4f} px")
+    
+    for paso in reporte['historial']:
+        print(f"   {paso['vistas']} vistas -> RMS {paso['rms']:.4f} px")
+    
+    if arreglos is None:
+        return
+    
+    usada = arreglos['usada']
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+    
+    # Error RMS de cada vista (en rojo las descartadas)
+    colores = ['tab:blue' if u else 'tab:red' for u in usada]
+    ax1.bar(np.arange(len(usada)), arreglos['error_vistas'], color=colores)
+    ax1.axhline(y=reporte['error_medio'], color='green', linestyle='--', label='Media (vistas usadas)')
+    ax1.set_title('Error RMS por Vista', fontweight='bold')
+    ax1.set_xlabel('Vista')
+    ax1.set_ylabel('Error (píxeles)')
+    ax1.legend()
+    
+    # Residuos de todas las esquinas de las vistas usadas
+    residuos = arreglos['residuos'][usada].reshape(-1, 2)
+    ax2.scatter(residuos[:, 0], residuos[:, 1], s=4, alpha=0.5)
+    ax2.set_title('Residuos por Esquina', fontweight='bold')
+    ax2.set_xlabel('dx (píxeles)')
+    ax2.set_ylabel('dy (píxeles)')
+    ax2.grid(True, alpha=0.3)
+    ax2.set_aspect('equal')
+    
+    plt.tight_layout()
+    plt.savefig('resultados/errores_reproyeccion.png', dpi=150, bbox_inches='tight')
+    plt.show()
+    
+    print("💾 Gráfico guardado: resultados/errores_reproyeccion.png")
+
+def generar_graficos_comparacion(reporte):
     print("\n📈 Generando gráficos comparativos...")
     
-    # Buscar imágenes de ejemplo
-    images = glob.glob('imagenes_tablero/*.jpg') + glob.glob('imagenes_tablero/*.png')
+    # Imágenes usadas en la calibración (máximo 3 para el análisis)
+    images = [v['imagen'] for v in reporte['vistas'] if v['usada']][:3]
     
     if not images:
         print("❌ No se encontraron imágenes para comparación")
         return
     
-    # Usar máximo 3 imágenes para el análisis
-    images = images[:3]
-    
-    mtx = np.load('resultados/camera_matrix.npy')
-    dist = np.load('resultados/distortion_coeffs.npy')
+    # Mapas de corrección en memoria, uno por resolución
+    undistorter = Undistorter(reporte['camera_matrix'], reporte['dist_coeffs'], reporte['image_size'])
     
     # Crear figura para comparación
     fig, axes = plt.subplots(len(images), 2, figsize=(15, 5*len(images)))
@@ -90,10 +137,14 @@ def generar_graficos_comparacion():
             
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         
-        # Corregir distorsión
-        h, w = img.shape[:2]
-        newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (w,h), 1, (w,h))
-        undistorted = cv2.undistort(img, mtx, dist, None, newcameramtx)
+        # Corregir distorsión (las vistas con otra orientación no se pueden corregir)
+        try:
+            undistorted = undistorter.corregir(img)
+        except ValueError as e:
+            print(f"⚠️  {img_path}: {e}")
+            axes[i,0].axis('off')
+            axes[i,1].axis('off')
+            continue
         undistorted_rgb = cv2.cvtColor(undistorted, cv2.COLOR_BGR2RGB)
         
         # Mostrar comparación
@@ -121,12 +172,12 @@ def generar_graficos_comparacion():
     
     print("💾 Gráfico guardado: resultados/comparacion_visual.png")
 
-def analizar_distorsion():
+def analizar_distorsion(reporte):
     """Análisis específico de los tipos de distorsión"""
     
     print("\n🔍 ANÁLISIS DE DISTORSIÓN:")
     
-    dist = np.load('resultados/distortion_coeffs.npy')
+    dist = reporte['dist_coeffs']
     
     k1, k2, p1, p2, k3 = dist[0]
     
@@ -148,13 +199,13 @@ def analizar_distorsion():
         print("📊 Distorsión tangencial mínima")
     
     # Crear visualización de distorsión
-    crear_mapa_distorsion()
+    crear_mapa_distorsion(reporte)
 
-def crear_mapa_distorsion():
+def crear_mapa_distorsion(reporte):
     """Crear un mapa visual de la distorsión"""
     
-    mtx = np.load('resultados/camera_matrix.npy')
-    dist = np.load('resultados/distortion_coeffs.npy')
+    mtx = reporte['camera_matrix']
+    dist = reporte['dist_coeffs']
     
     # Crear una grilla de puntos
     h, w = 480, 640  # Dimensiones típicas
@@ -196,14 +247,14 @@ def crear_mapa_distorsion():
     
     print("💾 Mapa de distorsión guardado: resultados/mapa_distorsion.png")
 
-def generar_reporte_final():
+def generar_reporte_final(reporte):
     """Genera un reporte completo en markdown"""
     
     print("\n📋 GENERANDO REPORTE FINAL...")
     
     # Leer parámetros
-    mtx = np.load('resultados/camera_matrix.npy')
-    dist = np.load('resultados/distortion_coeffs.npy')
+    mtx = reporte['camera_matrix']
+    dist = reporte['dist_coeffs']
     
     fx, fy = mtx[0,0], mtx[1,1]
     cx, cy = mtx[0,2], mtx[1,2]
@@ -219,7 +270,7 @@ def generar_reporte_final():
 
 ✅ **Estado de la Calibración**: {calidad}  
 📊 **Tipo de Distorsión Principal**: {tipo_distorsion}  
-🎯 **Error de Reproyección**: Ver archivo de calibración  
+🎯 **Error de Reproyección**: {reporte['rms']:.4f} píxeles RMS ({reporte['vistas_usadas']}/{len(reporte['vistas'])} vistas usadas)  
 
 ---
 
@@ -288,6 +339,9 @@ Con estos parámetros puedes implementar:
 |---------|-------------|
 | `camera_matrix.npy` | Matriz de parámetros intrínsecos |
 | `distortion_coeffs.npy` | Coeficientes de distorsión |
+| `reporte_calibracion.json` | Parámetros y error por vista |
+| `errores_por_vista.npz` | Residuos por vista y por esquina |
+| `errores_reproyeccion.png` | Error por vista y residuos |
 | `comparacion_visual.png` | Comparación antes/después |
 | `mapa_distorsion.png` | Visualización de la distorsión |
 | `corners_detected_*.jpg` | Verificación de detección de esquinas |
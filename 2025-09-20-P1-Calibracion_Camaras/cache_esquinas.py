@@ -0,0 +1,105 @@
+import numpy as np
+import hashlib
+import os
+
+def hash_archivo(ruta):
+    """SHA-1 del contenido del archivo (sin decodificar la imagen)"""
+    h = hashlib.sha1()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+class CacheEsquinas:
+    """
+    Esquinas detectadas por imagen, guardadas en un NPZ junto a los resultados.
+    
+    Cada entrada guarda el hash del archivo, su tamaño en bytes y fecha de
+    modificación, el tamaño de la imagen y las esquinas (o que no se
+    encontró el tablero). Si el tamaño y la fecha coinciden la entrada se
+    usa directamente; si solo coincide el tamaño se compara el hash. Cambiar
+    el tablero o la búsqueda piramidal invalida toda la caché.
+    """
+    
+    def __init__(self, ruta='resultados/esquinas_detectadas.npz', chessboard_size=(9, 6), piramide=0):
+        self.ruta = ruta
+        self.chessboard_size = tuple(chessboard_size)
+        self.piramide = int(piramide)
+        self.entradas = {}
+        self.modificada = False
+        self._cargar()
+    
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        datos = np.load(self.ruta)
+        if tuple(datos['chessboard_size']) != self.chessboard_size or int(datos['piramide']) != self.piramide:
+            print("♻️  Caché de esquinas creada con otros parámetros: se vuelve a detectar")
+            return
+        
+        for i, nombre in enumerate(datos['nombres']):
+            self.entradas[str(nombre)] = {
+                'sha1': str(datos['sha1'][i]),
+                'bytes': int(datos['bytes'][i]),
+                'mtime': int(datos['mtime'][i]),
+                'size': tuple(int(v) for v in datos['tamanos'][i]),
+                'corners': datos['esquinas'][i].reshape(-1, 1, 2) if datos['detectado'][i] else None
+            }
+    
+    def buscar(self, fname):
+        """(tamaño de imagen, esquinas o None) si la imagen no cambió, si no None"""
+        entrada = self.entradas.get(fname)
+        if entrada is None or not os.path.exists(fname):
+            return None
+        
+        st = os.stat(fname)
+        if st.st_size != entrada['bytes']:
+            return None
+        if st.st_mtime_ns != entrada['mtime']:
+            # Misma longitud pero otra fecha: decide el contenido
+            if hash_archivo(fname) != entrada['sha1']:
+                return None
+            entrada['mtime'] = st.st_mtime_ns
+            self.modificada = True
+        return entrada['size'], entrada['corners']
+    
+    def agregar(self, fname, size, corners):
+        st = os.stat(fname)
+        self.entradas[fname] = {
+            'sha1': hash_archivo(fname),
+            'bytes': st.st_size,
+            'mtime': st.st_mtime_ns,
+            'size': tuple(int(v) for v in size),
+            'corners': corners
+        }
+        self.modificada = True
+    
+    def guardar(self):
+        if not self.modificada:
+            return
+        
+        # Solo se conservan las imágenes que siguen existiendo
+        nombres = sorted(n for n in self.entradas if os.path.exists(n))
+        n_esquinas = self.chessboard_size[0] * self.chessboard_size[1]
+        esquinas = np.zeros((len(nombres), n_esquinas, 2), dtype=np.float32)
+        detectado = np.zeros(len(nombres), dtype=bool)
+        for i, nombre in enumerate(nombres):
+            corners = self.entradas[nombre]['corners']
+            if corners is not None:
+                esquinas[i] = corners.reshape(-1, 2)
+                detectado[i] = True
+        
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        temporal = self.ruta + '.tmp.npz'
+        np.savez(
+            temporal,
+            nombres=np.array(nombres, dtype=str),
+            sha1=np.array([self.entradas[n]['sha1'] for n in nombres], dtype=str),
+            bytes=np.array([self.entradas[n]['bytes'] for n in nombres], dtype=np.int64),
+            mtime=np.array([self.entradas[n]['mtime'] for n in nombres], dtype=np.int64),
+            tamanos=np.array([self.entradas[n]['size'] for n in nombres], dtype=np.int32).reshape(-1, 2),
+            detectado=detectado, esquinas=esquinas,
+            chessboard_size=np.array(self.chessboard_size), piramide=np.array(self.piramide)
+        )
+        os.replace(temporal, self.ruta)
+        self.modificada = False
\ No newline at end of file
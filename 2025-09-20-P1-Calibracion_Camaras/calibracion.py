@@ -2,9 +2,84 @@ import cv2
 import numpy as np
 import glob
 import os
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 import matplotlib.pyplot as plt
+from undistorter import Undistorter
+from reproyeccion import calibrar_con_rechazo, guardar_reporte
+from cache_esquinas import CacheEsquinas
 
-def calibrar_camara():
+def _iniciar_proceso():
+    # Un hilo de OpenCV por proceso: el paralelismo lo da el pool
+    cv2.setNumThreads(1)
+
+def buscar_esquinas_piramide(gray, chessboard_size, criteria, lado_max):
+    """
+    Búsqueda coarse-to-fine: detecta el tablero en una copia reducida (lado
+    mayor = lado_max) con FAST_CHECK, que descarta rápido las imágenes sin
+    tablero, y refina con cornerSubPix en la resolución completa solo
+    alrededor de las esquinas encontradas.
+    """
+    escala = lado_max / max(gray.shape)
+    if escala >= 1:
+        ret, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
+        return corners if ret else None
+    
+    small = cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+    ret, corners = cv2.findChessboardCorners(small, chessboard_size, flags)
+    if not ret:
+        return None
+    
+    # Refinar primero en la imagen reducida (barato) y llevar a la resolución completa
+    corners = cv2.cornerSubPix(small, corners, (5,5), (-1,-1), criteria)
+    return ((corners + 0.5) / escala - 0.5).astype(np.float32)
+
+def detectar_esquinas_gris(gray, chessboard_size, criteria, piramide=0):
+    """Esquinas refinadas (N, 1, 2) del tablero en una imagen en grises, o None"""
+    # Buscar esquinas del tablero
+    if piramide:
+        corners = buscar_esquinas_piramide(gray, chessboard_size, criteria, piramide)
+    else:
+        ret, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
+        corners = corners if ret else None
+    if corners is None:
+        return None
+    
+    # Refinar posición de esquinas
+    corners2 = cv2.cornerSubPix(gray, corners.reshape(-1, 1, 2), (11,11), (-1,-1), criteria)
+    return corners2.reshape(-1, 1, 2)
+
+def detectar_esquinas(fname, chessboard_size, criteria, piramide=0):
+    """Detecta y refina las esquinas de una imagen (se ejecuta en un proceso del pool)"""
+    # Solo se necesita la imagen en grises
+    gray = cv2.imread(fname, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None, None
+    
+    return gray.shape[::-1], detectar_esquinas_gris(gray, chessboard_size, criteria, piramide)
+
+# Imagen de origen de cada corners_detected_<i>.jpg (los índices cambian al
+# añadir o quitar imágenes)
+RUTA_INDICE_VERIFICACION = 'resultados/corners_detected.json'
+
+def leer_indice_verificacion():
+    """Devuelve {archivo de verificación: imagen} de la ejecución anterior"""
+    try:
+        with open(RUTA_INDICE_VERIFICACION) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def guardar_esquinas_detectadas(fname, indice, chessboard_size, corners):
+    """Dibuja las esquinas sobre la imagen para verificación"""
+    img_with_corners = cv2.imread(fname)
+    cv2.drawChessboardCorners(img_with_corners, chessboard_size, corners, True)
+    cv2.imwrite(f'resultados/corners_detected_{indice:03d}.jpg', img_with_corners)
+
+def calibrar_camara(workers=None, guardar_esquinas=True, piramide=1024, umbral_rechazo=2.0, usar_cache=True):
     print("🚀 Iniciando calibración de cámara...")
     
     # CONFIGURACIÓN DEL TABLERO
@@ -23,9 +98,10 @@ def calibrar_camara():
     # Arrays para almacenar puntos
     objpoints = []  # Puntos 3D en el mundo real
     imgpoints = []  # Puntos 2D en la imagen
+    nombres = []    # Imagen de cada vista
     
-    # Cargar imágenes
-    images = glob.glob('imagenes_tablero/*.jpg') + glob.glob('imagenes_tablero/*.png')
+    # Cargar imágenes (ordenadas: mismos índices en cada ejecución)
+    images = sorted(glob.glob('imagenes_tablero/*.jpg') + glob.glob('imagenes_tablero/*.png'))
     
     if len(images) == 0:
         print("❌ No se encontraron imágenes en la carpeta 'imagenes_tablero'")
@@ -38,79 +114,116 @@ def calibrar_camara():
     
     # Procesar cada imagen
     successful_images = 0
+    image_size = None
     
-    for i, fname in enumerate(images):
-        print(f"Procesando imagen {i+1}/{len(images)}: {os.path.basename(fname)}")
-        
-        img = cv2.imread(fname)
-        if img is None:
-            print(f"⚠️  No se pudo cargar: {fname}")
-            continue
-            
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Buscar esquinas del tablero
-        ret, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
+    # Esquinas ya detectadas en ejecuciones anteriores (imágenes sin cambios)
+    cache = CacheEsquinas(chessboard_size=chessboard_size, piramide=piramide) if usar_cache else None
+    en_cache = {fname: cache.buscar(fname) for fname in images} if cache else {}
+    pendientes = [fname for fname in images if en_cache.get(fname) is None]
+    if cache:
+        print(f"🗂️  {len(images) - len(pendientes)} imágenes en caché, {len(pendientes)} por procesar")
+    
+    # Detección en paralelo, un proceso por núcleo; map devuelve los
+    # resultados en el orden de las imágenes
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_proceso) if workers > 1 and len(pendientes) > 1 else None
+    mapear = pool.map if pool else map
+    
+    # Las imágenes de verificación se escriben en segundo plano
+    escritor = ThreadPoolExecutor(max_workers=2) if guardar_esquinas else None
+    indice_previo = leer_indice_verificacion() if escritor else {}
+    indice_verificacion = {}
+    if escritor and os.path.exists(RUTA_INDICE_VERIFICACION):
+        # Si la ejecución se interrumpe, la siguiente vuelve a dibujar todo
+        os.remove(RUTA_INDICE_VERIFICACION)
+    
+    if pendientes:
+        print(f"⚙️  Detectando esquinas con {workers if pool else 1} proceso(s)" +
+              (f", búsqueda inicial a {piramide} px" if piramide else ""))
+    
+    try:
+        nuevos = zip(pendientes, mapear(
+            detectar_esquinas, pendientes, repeat(chessboard_size), repeat(criteria), repeat(piramide)
+        ))
         
-        if ret:
-            # Refinar posición de esquinas
-            corners2 = cv2.cornerSubPix(gray, corners, (11,11), (-1,-1), criteria)
+        for i, fname in enumerate(images):
+            print(f"Procesando imagen {i+1}/{len(images)}: {os.path.basename(fname)}")
             
-            # Guardar puntos
-            objpoints.append(objp)
-            imgpoints.append(corners2)
+            detectada_ahora = en_cache.get(fname) is None
+            if detectada_ahora:
+                _, (size, corners2) = next(nuevos)
+                if cache and size is not None:
+                    cache.agregar(fname, size, corners2)
+            else:
+                size, corners2 = en_cache[fname]
             
-            # Dibujar esquinas para verificación
-            img_with_corners = img.copy()
-            cv2.drawChessboardCorners(img_with_corners, chessboard_size, corners2, ret)
-            cv2.imwrite(f'resultados/corners_detected_{i:03d}.jpg', img_with_corners)
+            if size is None:
+                print(f"⚠️  No se pudo cargar: {fname}")
+                continue
             
-            successful_images += 1
-            print(f"✅ Esquinas detectadas correctamente")
-        else:
-            print(f"❌ No se pudieron detectar esquinas")
+            if corners2 is not None:
+                # Guardar puntos
+                objpoints.append(objp)
+                imgpoints.append(corners2)
+                nombres.append(fname)
+                image_size = size
+                
+                # Dibujar esquinas para verificación (las de la caché solo si
+                # falta la imagen o el índice era de otra imagen)
+                if escritor:
+                    verificacion = f'corners_detected_{i:03d}.jpg'
+                    if (detectada_ahora or indice_previo.get(verificacion) != fname
+                            or not os.path.exists(os.path.join('resultados', verificacion))):
+                        escritor.submit(guardar_esquinas_detectadas, fname, i, chessboard_size, corners2)
+                    indice_verificacion[verificacion] = fname
+                
+                successful_images += 1
+                print(f"✅ Esquinas detectadas correctamente")
+            else:
+                print(f"❌ No se pudieron detectar esquinas")
+    finally:
+        if pool:
+            pool.shutdown()
+        if cache:
+            cache.guardar()
     
     print(f"\n📊 Resumen: {successful_images}/{len(images)} imágenes procesadas exitosamente")
     
+    if successful_images == 0:
+        print("❌ No se detectó el tablero en ninguna imagen")
+        return None
+    
     if successful_images < 10:
         print("⚠️  Se recomienda tener al menos 10 imágenes válidas para una buena calibración")
     
     # CALIBRACIÓN
     print("\n🔄 Ejecutando calibración...")
     
-    ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(
-        objpoints, imgpoints, gray.shape[::-1], None, None
-    )
-    
-    if not ret:
-        print("❌ La calibración falló")
-        return None
+    # Calibración con rechazo iterativo de las vistas con error atípico
+    resultado = calibrar_con_rechazo(objpoints, imgpoints, image_size, umbral=umbral_rechazo)
+    mtx, dist = resultado['mtx'], resultado['dist']
     
     # GUARDAR RESULTADOS
     np.save('resultados/camera_matrix.npy', mtx)
     np.save('resultados/distortion_coeffs.npy', dist)
+    np.save('resultados/image_size.npy', np.array(image_size))
+    reporte = guardar_reporte(resultado, objpoints, imgpoints, nombres, image_size, chessboard_size)
     
     print("✅ Calibración completada exitosamente!")
     print(f"\n📋 RESULTADOS:")
     print(f"Matriz de cámara (K):\n{mtx}")
     print(f"\nCoeficientes de distorsión:\n{dist}")
     
-    # CALCULAR ERROR DE REPROYECCIÓN
-    total_error = 0
-    errors = []
-    
-    for i in range(len(objpoints)):
-        imgpoints2, _ = cv2.projectPoints(objpoints[i], rvecs[i], tvecs[i], mtx, dist)
-        error = cv2.norm(imgpoints[i], imgpoints2, cv2.NORM_L2) / len(imgpoints2)
-        errors.append(error)
-        total_error += error
-    
-    mean_error = total_error / len(objpoints)
+    # ERROR DE REPROYECCIÓN (RMS por vista, calculado en bloque)
+    errores = [v['error_rms'] for v in reporte['vistas'] if v['usada']]
+    mean_error = reporte['error_medio']
     
     print(f"\n📏 ERROR DE REPROYECCIÓN:")
+    print(f"Vistas usadas: {reporte['vistas_usadas']}/{len(objpoints)}")
+    print(f"Error RMS global: {reporte['rms']:.4f} píxeles")
     print(f"Error medio: {mean_error:.4f} píxeles")
-    print(f"Error máximo: {max(errors):.4f} píxeles")
-    print(f"Error mínimo: {min(errors):.4f} píxeles")
+    print(f"Error máximo: {max(errores):.4f} píxeles")
+    print(f"Error mínimo: {min(errores):.4f} píxeles")
     
     # Interpretación del error
     if mean_error < 0.5:
@@ -121,30 +234,63 @@ def calibrar_camara():
         print("🔴 Calibración regular - considera tomar más imágenes")
     
     # GENERAR IMAGEN CORREGIDA DE EJEMPLO
-    test_img = cv2.imread(images[0])
+    # (la última vista válida: es la que fija image_size, y las imágenes con
+    # otra orientación no se pueden corregir con esta calibración)
+    test_img = cv2.imread(nombres[-1])
     h, w = test_img.shape[:2]
     
-    # Obtener nueva matriz de cámara optimizada
-    newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (w,h), 1, (w,h))
-    
-    # Corregir distorsión
-    dst = cv2.undistort(test_img, mtx, dist, None, newcameramtx)
+    # Mapas de corrección solo en memoria: para una imagen de ejemplo no vale
+    # la pena guardarlos (video_tiempo_real.py los cachea al usarlos)
+    undistorter = Undistorter(mtx, dist, image_size)
     
-    # Recortar imagen según ROI
-    x, y, w, h = roi
-    dst = dst[y:y+h, x:x+w]
+    # Corregir distorsión y recortar imagen según ROI
+    dst = undistorter.corregir(test_img, recortar=True)
     
     # Guardar comparación
     comparison = np.hstack((test_img, cv2.resize(dst, (test_img.shape[1], test_img.shape[0]))))
     cv2.imwrite('resultados/comparacion_antes_despues.jpg', comparison)
     
+    # Esperar a que terminen las imágenes de verificación
+    if escritor:
+        escritor.shutdown(wait=True)
+        # Las de índices sin tablero o que ya no existen mostrarían otra imagen
+        for ruta in glob.glob('resultados/corners_detected_*.jpg'):
+            if os.path.basename(ruta) not in indice_verificacion:
+                os.remove(ruta)
+        with open(RUTA_INDICE_VERIFICACION, 'w') as f:
+            json.dump(indice_verificacion, f, indent=2)
+    
     print(f"\n💾 Archivos guardados en 'resultados/':")
     print("- camera_matrix.npy")
     print("- distortion_coeffs.npy") 
-    print("- corners_detected_*.jpg")
+    print("- image_size.npy")
+    if cache:
+        print("- esquinas_detectadas.npz")
+    print("- reporte_calibracion.json")
+    print("- errores_por_vista.npz")
+    if guardar_esquinas:
+        print("- corners_detected_*.jpg")
+        print("- corners_detected.json")
     print("- comparacion_antes_despues.jpg")
     
     return mtx, dist, mean_error
 
 if __name__ == "__main__":
-    calibrar_camara()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Calibración de cámara con tablero de ajedrez")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos para detectar esquinas (por defecto: uno por núcleo)')
+    parser.add_argument('--sin-imagenes-esquinas', action='store_true',
+                        help='No guardar resultados/corners_detected_*.jpg')
+    parser.add_argument('--piramide', type=int, default=1024,
+                        help='Lado mayor (px) de la copia reducida donde se busca el tablero '
+                             'antes de refinar en resolución completa (0 = buscar en resolución completa)')
+    parser.add_argument('--sin-cache', action='store_true',
+                        help='Detectar de nuevo las esquinas de todas las imágenes')
+    parser.add_argument('--umbral-rechazo', type=float, default=2.0,
+                        help='Descartar vistas con error mayor que este múltiplo de la mediana '
+                             '(0 = usar todas las vistas)')
+    args = parser.parse_args()
+    
+    calibrar_camara(workers=args.workers, guardar_esquinas=not args.sin_imagenes_esquinas,
+                    piramide=args.piramide, umbral_rechazo=args.umbral_rechazo,
+                    usar_cache=not args.sin_cache)
\ No newline at end of file
@@ -0,0 +1,307 @@
+import cv2
+import numpy as np
+import os
+import time
+import threading
+import argparse
+from calibracion import detectar_esquinas_gris
+
+def descriptor_pose(corners, chessboard_size, image_size):
+    """
+    Resumen de la pose del tablero a partir de sus esquinas: posición del
+    centro, tamaño aparente e inclinación (perspectiva horizontal y vertical)
+    """
+    w, h = image_size
+    pts = corners.reshape(chessboard_size[1], chessboard_size[0], 2)
+    tl, tr, bl, br = pts[0, 0], pts[0, -1], pts[-1, 0], pts[-1, -1]
+    
+    centro = pts.reshape(-1, 2).mean(axis=0) / (w, h)
+    area = cv2.contourArea(np.array([tl, tr, br, bl], dtype=np.float32))
+    tamano = np.sqrt(area / (w * h))
+    
+    # Relación entre lados opuestos: 0 con el tablero de frente
+    inclinacion_x = np.log(np.linalg.norm(tr - br) / max(np.linalg.norm(tl - bl), 1e-6))
+    inclinacion_y = np.log(np.linalg.norm(bl - br) / max(np.linalg.norm(tl - tr), 1e-6))
+    
+    return np.array([centro[0], centro[1], tamano, 2 * abs(inclinacion_x), 2 * abs(inclinacion_y)])
+
+class CalibradorEnVivo:
+    """
+    Calibración incremental desde un flujo de vídeo.
+    
+    Un hilo detecta el tablero en el frame más reciente y acepta solo las
+    vistas cuya pose difiere de las ya aceptadas. Con cada vista nueva se
+    recalibra en otro hilo partiendo de los intrínsecos anteriores
+    (CALIB_USE_INTRINSIC_GUESS), de modo que el error se ve bajar mientras
+    se mueve el tablero.
+    """
+    
+    def __init__(self, chessboard_size=(9, 6), square_size=1.0, min_diferencia=0.15,
+                 min_vistas=6, max_vistas=40, piramide=640):
+        self.chessboard_size = chessboard_size
+        self.min_diferencia = min_diferencia
+        self.min_vistas = min_vistas
+        self.max_vistas = max_vistas
+        self.piramide = piramide
+        self.criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+        
+        # Puntos 3D del tablero (z=0, plano)
+        self.objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
+        self.objp[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2)
+        self.objp *= square_size
+        
+        self.vistas = []
+        self.descriptores = []
+        self.image_size = None
+        self.mtx = None
+        self.dist = None
+        self.rms = None
+        self.calibraciones = 0
+        self.error = None
+        self.ultimas_esquinas = None
+        self.ultima_aceptada = 0.0
+        self.frames_analizados = 0
+        
+        self._lock = threading.Lock()
+        self._nuevo_frame = threading.Condition(self._lock)
+        self._frame = None
+        self._activo = False
+        self._calibrando = False
+        self._pendiente = False
+        self._hilo = None
+    
+    def iniciar(self):
+        self._activo = True
+        self._hilo = threading.Thread(target=self._detectar, name='deteccion-tablero', daemon=True)
+        self._hilo.start()
+        return self
+    
+    def detener(self):
+        self._activo = False
+        with self._nuevo_frame:
+            self._nuevo_frame.notify_all()
+        if self._hilo:
+            self._hilo.join(timeout=2.0)
+        # Esperar a la recalibración en curso
+        while self._calibrando:
+            time.sleep(0.05)
+    
+    def enviar_frame(self, frame):
+        """Entrega el frame más reciente; los que llegan mientras se analiza otro se descartan"""
+        with self._nuevo_frame:
+            self._frame = frame
+            self._nuevo_frame.notify()
+    
+    def _detectar(self):
+        while self._activo:
+            with self._nuevo_frame:
+                self._nuevo_frame.wait_for(lambda: self._frame is not None or not self._activo, timeout=0.5)
+                frame, self._frame = self._frame, None
+            if frame is None:
+                continue
+            
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            corners = detectar_esquinas_gris(gray, self.chessboard_size, self.criteria, self.piramide)
+            self.frames_analizados += 1
+            self.ultimas_esquinas = corners
+            if corners is not None:
+                self._evaluar_vista(corners, gray.shape[::-1])
+    
+    def _evaluar_vista(self, corners, image_size):
+        """Acepta la vista si aporta una pose distinta de las ya aceptadas"""
+        if len(self.vistas) >= self.max_vistas:
+            return
+        
+        descriptor = descriptor_pose(corners, self.chessboard_size, image_size)
+        if self.descriptores:
+            distancias = np.linalg.norm(np.array(self.descriptores) - descriptor, axis=1)
+            if distancias.min() < self.min_diferencia:
+                return
+        
+        with self._lock:
+            self.image_size = image_size
+            self.vistas.append(corners)
+            self.descriptores.append(descriptor)
+            self.ultima_aceptada = time.time()
+        print(f"📸 Vista aceptada ({len(self.vistas)}/{self.max_vistas})")
+        
+        if len(self.vistas) >= self.min_vistas:
+            self._solicitar_calibracion()
+    
+    def _solicitar_calibracion(self):
+        with self._lock:
+            if self._calibrando:
+                # Se recalibra al terminar la actual, con todas las vistas nuevas
+                self._pendiente = True
+                return
+            self._calibrando = True
+        threading.Thread(target=self._calibrar, name='calibracion', daemon=True).start()
+    
+    def _calibrar(self):
+        try:
+            while True:
+                with self._lock:
+                    vistas = list(self.vistas)
+                    mtx = None if self.mtx is None else self.mtx.copy()
+                    dist = None if self.dist is None else self.dist.copy()
+                    self._pendiente = False
+                
+                # Arranque en caliente desde los intrínsecos anteriores
+                flags = cv2.CALIB_USE_INTRINSIC_GUESS if mtx is not None else 0
+                error = None
+                try:
+                    rms, mtx, dist, _, _ = cv2.calibrateCamera(
+                        [self.objp] * len(vistas), vistas, self.image_size, mtx, dist, flags=flags
+                    )
+                except cv2.error as e:
+                    # Vistas degeneradas: se conserva la calibración anterior
+                    error = str(e).strip().splitlines()[-1]
+                    print(f"❌ Falló la recalibración con {len(vistas)} vistas: {error}")
+                
+                with self._lock:
+                    self.error = error
+                    if error is None:
+                        self.mtx, self.dist, self.rms = mtx, dist, rms
+                        self.calibraciones += 1
+                    if not self._pendiente:
+                        self._calibrando = False
+                        break
+        except BaseException:
+            # Un error inesperado no debe bloquear las recalibraciones ni detener()
+            with self._lock:
+                self._calibrando = False
+            raise
+        if error is None:
+            print(f"🔄 Recalibrado con {len(vistas)} vistas: error RMS {rms:.4f} px")
+    
+    def estado(self):
+        with self._lock:
+            return {
+                'vistas': len(self.vistas),
+                'rms': self.rms,
+                'mtx': self.mtx,
+                'calibrando': self._calibrando,
+                'error': self.error,
+                'esquinas': self.ultimas_esquinas,
+                'aceptada_reciente': time.time() - self.ultima_aceptada < 0.5,
+                'descriptores': list(self.descriptores)
+            }
+    
+    def guardar(self, directorio='resultados'):
+        """Guarda los resultados con el mismo formato que calibracion.py"""
+        if self.mtx is None:
+            print("⚠️  Aún no hay calibración que guardar")
+            return False
+        os.makedirs(directorio, exist_ok=True)
+        with self._lock:
+            np.save(os.path.join(directorio, 'camera_matrix.npy'), self.mtx)
+            np.save(os.path.join(directorio, 'distortion_coeffs.npy'), self.dist)
+            np.save(os.path.join(directorio, 'image_size.npy'), np.array(self.image_size))
+        print(f"💾 Calibración guardada en '{directorio}/' (error RMS {self.rms:.4f} px, {len(self.vistas)} vistas)")
+        return True
+
+def dibujar_estado(frame, calibrador, estado):
+    """Esquinas detectadas, cobertura de las vistas aceptadas y error actual"""
+    vista = frame.copy()
+    h, w = vista.shape[:2]
+    
+    # Cobertura: centro y tamaño de cada vista aceptada
+    for cx, cy, tamano, _, _ in estado['descriptores']:
+        radio = max(4, int(tamano * min(w, h) / 4))
+        cv2.circle(vista, (int(cx * w), int(cy * h)), radio, (255, 128, 0), 1)
+    
+    if estado['esquinas'] is not None:
+        cv2.drawChessboardCorners(vista, calibrador.chessboard_size, estado['esquinas'], True)
+    
+    rms = f"{estado['rms']:.3f} px" if estado['rms'] is not None else "-"
+    lineas = [
+        f"Vistas: {estado['vistas']}/{calibrador.max_vistas}",
+        f"Error RMS: {rms}" + (" (calibrando...)" if estado['calibrando'] else ""),
+    ]
+    if estado['mtx'] is not None:
+        lineas.append(f"fx={estado['mtx'][0, 0]:.1f} fy={estado['mtx'][1, 1]:.1f}")
+    if estado['error']:
+        lineas.append("Ultima recalibracion fallida")
+    lineas.append("Q: salir  G: guardar")
+    
+    color = (0, 255, 0) if estado['aceptada_reciente'] else (255, 255, 255)
+    for i, texto in enumerate(lineas):
+        cv2.putText(vista, texto, (10, 30 + 30 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+    return vista
+
+def calibracion_en_vivo(fuente=0, chessboard_size=(9, 6), square_size=1.0, min_diferencia=0.15,
+                        max_vistas=40, piramide=640, mostrar=True, directorio='resultados'):
+    print("🎥 Iniciando calibración en vivo...")
+    
+    cap = cv2.VideoCapture(fuente)
+    if not cap.isOpened():
+        print(f"❌ No se pudo abrir la fuente: {fuente}")
+        return None
+    
+    calibrador = CalibradorEnVivo(
+        chessboard_size, square_size, min_diferencia, max_vistas=max_vistas, piramide=piramide
+    ).iniciar()
+    print("📷 Mueve el tablero por todo el campo de visión, cerca, lejos e inclinado")
+    
+    # Los archivos se leen a su ritmo nominal para simular una cámara
+    intervalo = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30) if not isinstance(fuente, int) else 0
+    
+    try:
+        while True:
+            inicio = time.time()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            
+            calibrador.enviar_frame(frame)
+            
+            if mostrar:
+                cv2.imshow('Calibracion en Vivo', dibujar_estado(frame, calibrador, calibrador.estado()))
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+                elif key == ord('g'):
+                    calibrador.guardar(directorio)
+            
+            if calibrador.estado()['vistas'] >= max_vistas and not calibrador.estado()['calibrando']:
+                print("✅ Número máximo de vistas alcanzado")
+                break
+            
+            espera = intervalo - (time.time() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+    finally:
+        cap.release()
+        calibrador.detener()
+        if mostrar:
+            cv2.destroyAllWindows()
+    
+    print(f"\n📊 Frames analizados: {calibrador.frames_analizados}, vistas aceptadas: {len(calibrador.vistas)}, "
+          f"calibraciones: {calibrador.calibraciones}")
+    
+    if calibrador.mtx is None:
+        print(f"❌ Se necesitan al menos {calibrador.min_vistas} vistas para calibrar")
+        return None
+    
+    print(f"Matriz de cámara (K):\n{calibrador.mtx}")
+    print(f"\nCoeficientes de distorsión:\n{calibrador.dist}")
+    calibrador.guardar(directorio)
+    return calibrador.mtx, calibrador.dist, calibrador.rms
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibración de cámara en vivo con tablero de ajedrez")
+    parser.add_argument('--fuente', default='0', help='ID de cámara o ruta de vídeo')
+    parser.add_argument('--tablero', default='9x6', help='Esquinas internas (ancho x alto)')
+    parser.add_argument('--tamano-cuadro', type=float, default=1.0, help='Lado de cada cuadro')
+    parser.add_argument('--min-diferencia', type=float, default=0.15,
+                        help='Diferencia mínima de pose para aceptar una vista nueva')
+    parser.add_argument('--max-vistas', type=int, default=40, help='Vistas a recoger antes de terminar')
+    parser.add_argument('--piramide', type=int, default=640,
+                        help='Lado mayor (px) de la búsqueda inicial del tablero (0 = resolución completa)')
+    parser.add_argument('--sin-ventana', action='store_true', help='No mostrar ventana (servidores)')
+    args = parser.parse_args()
+    
+    fuente = int(args.fuente) if args.fuente.isdigit() else args.fuente
+    tablero = tuple(int(v) for v in args.tablero.lower().split('x'))
+    calibracion_en_vivo(fuente, tablero, args.tamano_cuadro, args.min_diferencia,
+                        args.max_vistas, args.piramide, mostrar=not args.sin_ventana)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import cv2
+import numpy as np
+import json
+import os
+from datetime import datetime
+
+def matrices_rotacion(rvecs):
+    """Fórmula de Rodrigues para todas las vistas a la vez: (V, 3) -> (V, 3, 3)"""
+    r = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(r, axis=1)
+    k = r / np.where(theta > 1e-12, theta, 1.0)[:, None]
+    
+    K = np.zeros((len(r), 3, 3))
+    K[:, 0, 1], K[:, 0, 2] = -k[:, 2], k[:, 1]
+    K[:, 1, 0], K[:, 1, 2] = k[:, 2], -k[:, 0]
+    K[:, 2, 0], K[:, 2, 1] = -k[:, 1], k[:, 0]
+    
+    seno = np.sin(theta)[:, None, None]
+    coseno = (1 - np.cos(theta))[:, None, None]
+    return np.eye(3) + seno * K + coseno * (K @ K)
+
+def errores_reproyeccion(objpoints, imgpoints, rvecs, tvecs, mtx, dist):
+    """
+    Residuos de reproyección de todas las vistas con una sola llamada a
+    projectPoints: los puntos del tablero se llevan al sistema de la cámara
+    con numpy y se proyectan juntos con pose nula.
+    
+    Devuelve residuos (V, N, 2), error por esquina (V, N) y RMS por vista (V,)
+    """
+    obj = np.asarray(objpoints, dtype=np.float64).reshape(len(objpoints), -1, 3)
+    img = np.asarray(imgpoints, dtype=np.float64).reshape(len(imgpoints), -1, 2)
+    
+    R = matrices_rotacion(rvecs)
+    t = np.asarray(tvecs, dtype=np.float64).reshape(-1, 1, 3)
+    camara = obj @ R.transpose(0, 2, 1) + t
+    
+    proyectados, _ = cv2.projectPoints(camara.reshape(-1, 1, 3), np.zeros(3), np.zeros(3), mtx, dist)
+    residuos = img - proyectados.reshape(img.shape)
+    error_esquinas = np.linalg.norm(residuos, axis=2)
+    error_vistas = np.sqrt((error_esquinas ** 2).mean(axis=1))
+    return residuos, error_esquinas, error_vistas
+
+def calibrar_con_rechazo(objpoints, imgpoints, image_size, umbral=2.0, min_vistas=10, max_iteraciones=20):
+    """
+    Calibra y descarta la peor vista mientras su error RMS supere umbral
+    veces la mediana de las vistas; cada recalibración parte de los
+    intrínsecos anteriores (CALIB_USE_INTRINSIC_GUESS). umbral=0 desactiva
+    el rechazo.
+    """
+    activas = list(range(len(objpoints)))
+    descartadas = []
+    historial = []
+    mtx = dist = None
+    flags = 0
+    
+    for iteracion in range(max_iteraciones + 1):
+        rms, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(
+            [objpoints[i] for i in activas], [imgpoints[i] for i in activas], image_size, mtx, dist, flags=flags
+        )
+        flags = cv2.CALIB_USE_INTRINSIC_GUESS
+        historial.append({'vistas': len(activas), 'rms': float(rms)})
+        
+        _, _, errores = errores_reproyeccion(
+            [objpoints[i] for i in activas], [imgpoints[i] for i in activas], rvecs, tvecs, mtx, dist
+        )
+        
+        if not umbral or len(activas) <= min_vistas or iteracion == max_iteraciones:
+            break
+        peor = int(np.argmax(errores))
+        mediana = float(np.median(errores))
+        if errores[peor] <= umbral * mediana:
+            break
+        
+        print(f"🗑️  Descartando vista {activas[peor]}: error {errores[peor]:.4f} px "
+              f"(mediana {mediana:.4f} px, RMS global {rms:.4f} px)")
+        descartadas.append({'indice': activas[peor], 'error_rms': float(errores[peor]), 'iteracion': iteracion})
+        del activas[peor]
+    
+    return {
+        'mtx': mtx, 'dist': dist, 'rms': float(rms),
+        'rvecs': np.asarray(rvecs).reshape(-1, 3), 'tvecs': np.asarray(tvecs).reshape(-1, 3),
+        'activas': activas, 'descartadas': descartadas, 'historial': historial
+    }
+
+def guardar_reporte(resultado, objpoints, imgpoints, nombres, image_size, chessboard_size, directorio='resultados'):
+    """
+    Escribe el reporte compacto (reporte_calibracion.json) y los arreglos
+    por vista y por esquina (errores_por_vista.npz) que usa analisis_resultados.py
+    """
+    mtx, dist = resultado['mtx'], resultado['dist']
+    total = len(objpoints)
+    rvecs = np.zeros((total, 3))
+    tvecs = np.zeros((total, 3))
+    rvecs[resultado['activas']] = resultado['rvecs']
+    tvecs[resultado['activas']] = resultado['tvecs']
+    
+    # Las vistas descartadas se evalúan con la calibración final
+    for d in resultado['descartadas']:
+        i = d['indice']
+        _, rvec, tvec = cv2.solvePnP(objpoints[i], imgpoints[i], mtx, dist)
+        rvecs[i], tvecs[i] = rvec.ravel(), tvec.ravel()
+    
+    residuos, error_esquinas, error_vistas = errores_reproyeccion(objpoints, imgpoints, rvecs, tvecs, mtx, dist)
+    usada = np.zeros(total, dtype=bool)
+    usada[resultado['activas']] = True
+    
+    os.makedirs(directorio, exist_ok=True)
+    np.savez(
+        os.path.join(directorio, 'errores_por_vista.npz'),
+        imagenes=np.array(nombres), usada=usada,
+        imgpoints=np.asarray(imgpoints, dtype=np.float32).reshape(total, -1, 2),
+        residuos=residuos.astype(np.float32), error_esquinas=error_esquinas.astype(np.float32),
+        error_vistas=error_vistas, rvecs=rvecs, tvecs=tvecs
+    )
+    
+    reporte = {
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'image_size': [int(v) for v in image_size],
+        'chessboard_size': list(chessboard_size),
+        'camera_matrix': mtx.tolist(),
+        'dist_coeffs': dist.tolist(),
+        'rms': resultado['rms'],
+        'error_medio': float(error_vistas[usada].mean()),
+        'error_maximo': float(error_vistas[usada].max()),
+        'vistas_usadas': int(usada.sum()),
+        'historial': resultado['historial'],
+        'vistas': [
+            {
+                'imagen': nombres[i],
+                'error_rms': round(float(error_vistas[i]), 5),
+                'error_max': round(float(error_esquinas[i].max()), 5),
+                'usada': bool(usada[i])
+            }
+            for i in range(total)
+        ],
+        'descartadas': [
+            {'imagen': nombres[d['indice']], 'error_rms': round(d['error_rms'], 5), 'iteracion': d['iteracion']}
+            for d in resultado['descartadas']
+        ]
+    }
+    with open(os.path.join(directorio, 'reporte_calibracion.json'), 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    
+    return reporte
+
+def cargar_reporte(directorio='resultados'):
+    """Reporte JSON (con K y distorsión como arreglos) y arreglos por vista, o (None, None)"""
+    ruta = os.path.join(directorio, 'reporte_calibracion.json')
+    if not os.path.exists(ruta):
+        return None, None
+    
+    with open(ruta, encoding='utf-8') as f:
+        reporte = json.load(f)
+    reporte['camera_matrix'] = np.array(reporte['camera_matrix'])
+    reporte['dist_coeffs'] = np.array(reporte['dist_coeffs'])
+    
+    ruta_arreglos = os.path.join(directorio, 'errores_por_vista.npz')
+    arreglos = dict(np.load(ruta_arreglos)) if os.path.exists(ruta_arreglos) else None
+    return reporte, arreglos
\ No newline at end of file
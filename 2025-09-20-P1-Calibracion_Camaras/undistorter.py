@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+import os
+
+# Diferencia relativa de aspecto (ancho/alto) tolerada al escalar la calibración
+TOLERANCIA_ASPECTO = 0.01
+
+class Undistorter:
+    """
+    Corrección de distorsión con mapas de remapeo precalculados.
+    
+    cv2.undistort recalcula el mapa de distorsión completo en cada llamada.
+    Aquí los mapas (initUndistortRectifyMap en formato de punto fijo
+    CV_16SC2) se calculan una vez por resolución, se guardan en disco junto
+    a camera_matrix.npy y cada frame solo necesita un cv2.remap.
+    
+    Es la única implementación del formato de caché
+    (undistort_maps_<w>x<h>_alpha<a>.npz): el pipeline de detección de
+    2025-12-02_taller_4 la importa desde aquí. Con directorio_cache=None los
+    mapas solo se guardan en memoria.
+    """
+    
+    def __init__(self, mtx, dist, tamano_calibracion=None, alpha=1.0, directorio_cache=None):
+        self.mtx = np.asarray(mtx, dtype=np.float64)
+        self.dist = np.asarray(dist, dtype=np.float64)
+        self.tamano_calibracion = tuple(int(v) for v in tamano_calibracion) if tamano_calibracion is not None else None
+        self.alpha = alpha
+        self.directorio_cache = directorio_cache
+        self._mapas = {}
+    
+    @classmethod
+    def desde_resultados(cls, directorio='resultados', alpha=1.0):
+        """Carga los parámetros guardados por calibracion.py"""
+        mtx = np.load(os.path.join(directorio, 'camera_matrix.npy'))
+        dist = np.load(os.path.join(directorio, 'distortion_coeffs.npy'))
+        ruta_tamano = os.path.join(directorio, 'image_size.npy')
+        tamano = np.load(ruta_tamano) if os.path.exists(ruta_tamano) else None
+        return cls(mtx, dist, tamano, alpha, directorio)
+    
+    def matriz_para(self, tamano):
+        """
+        Matriz de cámara escalada a otra resolución con la misma óptica.
+        
+        Solo vale para la misma imagen redimensionada: si el aspecto cambia
+        (imagen vertical contra video 16:9, recorte del sensor) fx y fy no
+        escalan igual y la matriz sería incorrecta, así que se rechaza.
+        """
+        if self.tamano_calibracion is None:
+            print(f"⚠️ Sin image_size.npy: se usa la matriz de cámara tal cual para {tamano[0]}x{tamano[1]}; "
+                  "solo es correcta a la resolución de calibración (vuelve a ejecutar calibracion.py)")
+            return self.mtx
+        if tuple(tamano) == self.tamano_calibracion:
+            return self.mtx
+        aspecto_cal = self.tamano_calibracion[0] / self.tamano_calibracion[1]
+        aspecto = tamano[0] / tamano[1]
+        if abs(aspecto / aspecto_cal - 1) > TOLERANCIA_ASPECTO:
+            raise ValueError(
+                f"La calibración es de {self.tamano_calibracion[0]}x{self.tamano_calibracion[1]} y el frame de "
+                f"{tamano[0]}x{tamano[1]}: el aspecto no coincide, calibra la cámara en esta resolución"
+            )
+        sx = tamano[0] / self.tamano_calibracion[0]
+        sy = tamano[1] / self.tamano_calibracion[1]
+        return np.diag([sx, sy, 1.0]) @ self.mtx
+    
+    def ruta_cache(self, tamano):
+        if not self.directorio_cache:
+            return None
+        w, h = tamano
+        return os.path.join(self.directorio_cache, f'undistort_maps_{w}x{h}_alpha{self.alpha:g}.npz')
+    
+    def mapas(self, tamano):
+        """Mapas de remapeo para (ancho, alto): memoria, luego disco, luego se calculan"""
+        tamano = (int(tamano[0]), int(tamano[1]))
+        if tamano in self._mapas:
+            return self._mapas[tamano]
+        
+        mtx = self.matriz_para(tamano)
+        ruta = self.ruta_cache(tamano)
+        
+        # Reutilizar los mapas guardados si corresponden a esta calibración
+        if ruta and os.path.exists(ruta):
+            datos = np.load(ruta)
+            if np.allclose(datos['camera_matrix'], mtx) and np.allclose(datos['dist_coeffs'], self.dist):
+                self._mapas[tamano] = (datos['map1'], datos['map2'], datos['new_camera_matrix'], tuple(datos['roi']))
+                return self._mapas[tamano]
+        
+        newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, self.dist, tamano, self.alpha, tamano)
+        map1, map2 = cv2.initUndistortRectifyMap(mtx, self.dist, None, newcameramtx, tamano, cv2.CV_16SC2)
+        self._mapas[tamano] = (map1, map2, newcameramtx, tuple(roi))
+        
+        if ruta:
+            # Comprimidos: a 4096x3072 los mapas ocupan ~75 MB sin comprimir
+            os.makedirs(self.directorio_cache, exist_ok=True)
+            np.savez_compressed(ruta, map1=map1, map2=map2, new_camera_matrix=newcameramtx, roi=np.array(roi),
+                                camera_matrix=mtx, dist_coeffs=self.dist)
+        
+        return self._mapas[tamano]
+    
+    def corregir(self, img, recortar=False):
+        """Corrige la distorsión de una imagen (opcionalmente recortada a la región válida)"""
+        h, w = img.shape[:2]
+        map1, map2, _, roi = self.mapas((w, h))
+        dst = cv2.remap(img, map1, map2, cv2.INTER_LINEAR)
+        
+        if recortar:
+            x, y, rw, rh = roi
+            if rw > 0 and rh > 0:
+                dst = dst[y:y+rh, x:x+rw]
+        return dst
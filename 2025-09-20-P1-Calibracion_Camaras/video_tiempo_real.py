@@ -1,13 +1,13 @@
 import cv2
 import numpy as np
+from undistorter import Undistorter
 
 def demo_tiempo_real():
     print("🎥 Iniciando demo en tiempo real...")
     
     # Cargar parámetros de calibración
     try:
-        mtx = np.load('resultados/camera_matrix.npy')
-        dist = np.load('resultados/distortion_coeffs.npy')
+        undistorter = Undistorter.desde_resultados('resultados')
         print("✅ Parámetros de calibración cargados")
     except FileNotFoundError:
         print("❌ No se encontraron parámetros de calibración. Ejecuta calibracion.py primero")
@@ -33,11 +33,12 @@ def demo_tiempo_real():
         # Obtener dimensiones
         h, w = frame.shape[:2]
         
-        # Calcular nueva matriz de cámara
-        newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (w,h), 1, (w,h))
-        
-        # Aplicar corrección de distorsión
-        undistorted = cv2.undistort(frame, mtx, dist, None, newcameramtx)
+        # Aplicar corrección de distorsión (mapas calculados una sola vez por resolución)
+        try:
+            undistorted = undistorter.corregir(frame)
+        except ValueError as e:
+            print(f"❌ {e}")
+            break
         
         # Crear vista combinada (original | corregido)
         combined = np.hstack((frame, undistorted))
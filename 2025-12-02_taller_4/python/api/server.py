@@ -7,13 +7,13 @@ import sys
 from pathlib import Path
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 import cv2
 import numpy as np
 import base64
 import io
 from PIL import Image
 import json
+import tempfile
 import time
 
 # Add parent directory to path and import modules
@@ -28,68 +28,94 @@ sys.path.insert(0, str(project_root))
 # Change working directory to project root
 os.chdir(project_root)
 
-# Import detection modules
-from python.detection.pipeline import DetectionSegmentationPipeline
-from python.detection.yolo_detector import YOLODetector
-from python.detection.sam_segmenter import SAMSegmenter
+# Detection modules are imported by the first request that needs a model,
+# so startup and /health do not pay for the detection stack
+from python.utils.profiling import PROFILE_MODES, install_request_profiling
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'data/input/api_uploads'
-OUTPUT_FOLDER = 'data/output/api_results'
+# Under python/data (gitignored), not relative to the working directory
+OUTPUT_FOLDER = parent_dir / 'data' / 'output' / 'api_results'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'webp'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+CONFIG_PATH = parent_dir / 'config.yaml'
 
-Path(UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
 Path(OUTPUT_FOLDER).mkdir(parents=True, exist_ok=True)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Per-request profiling: sampling is set by --profile-rate; the X-Profile header
+# is ignored unless --profile-token (or DETSEG_PROFILE_TOKEN) is set
+install_request_profiling(
+    app, output_dir=parent_dir / 'results' / 'profiles', token=os.environ.get('DETSEG_PROFILE_TOKEN')
+)
+
 # Initialize pipeline (lazy loading)
 pipeline = None
 yolo_detector = None
 sam_segmenter = None
 
 
+def load_config():
+    """Load config.yaml from the python/ directory."""
+    import yaml
+    
+    with open(CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
 def get_pipeline():
     """Get or initialize pipeline."""
     global pipeline
     if pipeline is None:
+        from python.detection.pipeline import DetectionSegmentationPipeline
+        
         print("Initializing detection & segmentation pipeline...")
-        pipeline = DetectionSegmentationPipeline(config_path='config.yaml')
+        pipeline = DetectionSegmentationPipeline(config_path=str(CONFIG_PATH))
         print("Pipeline ready!")
     return pipeline
 
 
 def get_yolo():
-    """Get or initialize YOLO detector."""
+    """Get or initialize YOLO detector (backend from config.yaml)."""
     global yolo_detector
     if yolo_detector is None:
+        from python.detection.backends import create_detector
+        
         print("Initializing YOLO detector...")
-        yolo_detector = YOLODetector(model_path="yolov8n.pt", device="cuda")
+        yolo_detector = create_detector(load_config())
         print("YOLO ready!")
     return yolo_detector
 
 
 def get_sam():
-    """Get or initialize SAM segmenter."""
+    """Get or initialize SAM segmenter (backend from config.yaml)."""
     global sam_segmenter
     if sam_segmenter is None:
+        from python.detection.backends import create_segmenter
+        
         print("Initializing SAM segmenter...")
-        sam_segmenter = SAMSegmenter(
-            model_type="vit_b",
-            checkpoint_path="data/models/sam_vit_b_01ec64.pth",
-            device="cuda"
-        )
+        sam_segmenter = create_segmenter(load_config())
         print("SAM ready!")
     return sam_segmenter
 
 
+def tiling_modes():
+    """Valid tiling modes (imports the detector module on first use)."""
+    from python.detection.yolo_detector import TILING_MODES
+    
+    return TILING_MODES
+
+
+def decode_image_bytes(data):
+    """Decode image file bytes in memory (uploads are never written to disk)."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -103,10 +129,7 @@ def encode_image_to_base64(image_path):
 
 def decode_base64_image(base64_string):
     """Decode base64 string to image."""
-    img_data = base64.b64decode(base64_string)
-    img_array = np.frombuffer(img_data, dtype=np.uint8)
-    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-    return img
+    return decode_image_bytes(base64.b64decode(base64_string))
 
 
 # ============================================================================
@@ -156,14 +179,14 @@ def list_models():
     models_dir = Path('data/models')
     
     yolo_models = list(Path('.').glob('yolov8*.pt'))
-    sam_models = list(models_dir.glob('sam_*.pth'))
+    sam_models = list(models_dir.glob('sam_*.pth')) + list(models_dir.glob('mobile_sam*.pt'))
     
     return jsonify({
         'yolo_models': [m.name for m in yolo_models],
         'sam_models': [m.name for m in sam_models],
         'currently_loaded': {
             'yolo': 'yolov8n.pt' if yolo_detector else None,
-            'sam': 'sam_vit_b_01ec64.pth' if sam_segmenter else None
+            'sam': Path(sam_segmenter.checkpoint_path).name if sam_segmenter and sam_segmenter.checkpoint_path else None
         }
     })
 
@@ -171,12 +194,8 @@ def list_models():
 @app.route('/config')
 def get_config():
     """Get current configuration."""
-    import yaml
-    
     try:
-        with open('config.yaml', 'r') as f:
-            config = yaml.safe_load(f)
-        return jsonify(config)
+        return jsonify(load_config())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,6 +209,7 @@ def detect():
         - image: file upload or base64 string
         - confidence: float (optional, default from config)
         - classes: list of int (optional, specific classes to detect)
+        - tiling: auto, always or never (optional, tiled inference for large images)
         - return_image: bool (optional, return annotated image)
     
     Returns:
@@ -202,6 +222,9 @@ def detect():
         if classes:
             classes = [int(c) for c in classes.split(',')]
         return_image = request.form.get('return_image', 'false').lower() == 'true'
+        tiling = request.form.get('tiling')
+        if tiling and tiling not in tiling_modes():
+            return jsonify({'error': f"Invalid tiling mode. Available: {', '.join(tiling_modes())}"}), 400
         
         # Get image
         if 'image' in request.files:
@@ -213,11 +236,7 @@ def detect():
             if not allowed_file(file.filename):
                 return jsonify({'error': 'Invalid file type'}), 400
             
-            filename = secure_filename(file.filename)
-            filepath = Path(app.config['UPLOAD_FOLDER']) / filename
-            file.save(filepath)
-            
-            image = cv2.imread(str(filepath))
+            image = decode_image_bytes(file.read())
         
         elif request.json and 'image' in request.json:
             # Base64 encoded
@@ -226,17 +245,21 @@ def detect():
         else:
             return jsonify({'error': 'No image provided'}), 400
         
+        if image is None:
+            return jsonify({'error': 'Could not decode image'}), 400
+        
         # Detect
         detector = get_yolo()
         if confidence:
             detector.confidence = confidence
         
         start_time = time.time()
-        detections, inference_time = detector.detect(image, classes=classes)
+        detections, inference_time, num_tiles = detector.detect_image(image, classes=classes, tiling=tiling)
         
         # Prepare response
         response = {
             'num_detections': len(detections),
+            'num_tiles': num_tiles,
             'inference_time_ms': inference_time * 1000,
             'total_time_ms': (time.time() - start_time) * 1000,
             'detections': []
@@ -285,16 +308,16 @@ def segment():
             if not allowed_file(file.filename):
                 return jsonify({'error': 'Invalid file type'}), 400
             
-            filename = secure_filename(file.filename)
-            filepath = Path(app.config['UPLOAD_FOLDER']) / filename
-            file.save(filepath)
-            image = cv2.imread(str(filepath))
+            image = decode_image_bytes(file.read())
         
         elif request.json and 'image' in request.json:
             image = decode_base64_image(request.json['image'])
         else:
             return jsonify({'error': 'No image provided'}), 400
         
+        if image is None:
+            return jsonify({'error': 'Could not decode image'}), 400
+        
         # Get bboxes
         if 'bboxes' in request.form:
             bboxes = json.loads(request.form.get('bboxes'))
@@ -347,6 +370,7 @@ def pipeline_process():
     Input:
         - image: file upload or base64 string
         - save_masks: bool (optional)
+        - tiling: auto, always or never (optional, tiled detection for large images)
         - return_image: bool (optional)
     
     Returns:
@@ -355,6 +379,9 @@ def pipeline_process():
     try:
         save_masks = request.form.get('save_masks', 'false').lower() == 'true'
         return_image = request.form.get('return_image', 'true').lower() == 'true'
+        tiling = request.form.get('tiling')
+        if tiling and tiling not in tiling_modes():
+            return jsonify({'error': f"Invalid tiling mode. Available: {', '.join(tiling_modes())}"}), 400
         
         # Get image
         if 'image' in request.files:
@@ -362,14 +389,10 @@ def pipeline_process():
             if not allowed_file(file.filename):
                 return jsonify({'error': 'Invalid file type'}), 400
             
-            filename = secure_filename(file.filename)
-            filepath = Path(app.config['UPLOAD_FOLDER']) / filename
-            file.save(filepath)
+            data = file.read()
         
         elif request.json and 'image' in request.json:
-            img = decode_base64_image(request.json['image'])
-            filepath = Path(app.config['UPLOAD_FOLDER']) / 'temp_image.jpg'
-            cv2.imwrite(str(filepath), img)
+            data = base64.b64decode(request.json['image'])
         
         else:
             return jsonify({'error': 'No image provided'}), 400
@@ -378,16 +401,27 @@ def pipeline_process():
         pipe = get_pipeline()
         output_path = Path(app.config['OUTPUT_FOLDER']) / 'pipeline_result.jpg'
         
-        results = pipe.process_image(
-            str(filepath),
-            output_path=str(output_path) if return_image else None,
-            save_masks=save_masks,
-            save_json=False
-        )
+        # process_image reads from disk: the upload goes to a temporary file
+        # that is removed once the request is done
+        fd, filepath = tempfile.mkstemp(prefix='api_upload_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            results = pipe.process_image(
+                filepath,
+                output_path=str(output_path) if return_image else None,
+                save_masks=save_masks,
+                save_json=False,
+                tiling=tiling
+            )
+        finally:
+            os.remove(filepath)
         
         # Prepare response
         response = {
             'num_detections': results['num_detections'],
+            'num_tiles': results['num_tiles'],
+            'num_masks': results['num_masks'],
             'detection_time_ms': results['detection_time'] * 1000,
             'segmentation_time_ms': results['segmentation_time'] * 1000,
             'total_time_ms': results['total_time'] * 1000,
@@ -437,13 +471,28 @@ def main():
     parser.add_argument('--host', default='0.0.0.0', help='Host address')
     parser.add_argument('--port', type=int, default=5000, help='Port number')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default='sampling',
+                        help='Profiler for sampled and X-Profile requests')
+    parser.add_argument('--profile-rate', type=float, default=0.0,
+                        help='Fraction of requests to profile (e.g. 0.01)')
+    parser.add_argument('--profile-token', default=None,
+                        help='Enable on-demand profiling for requests sending X-Profile-Token with this value')
     
     args = parser.parse_args()
     
+    app.config['PROFILE_MODE'] = args.profile
+    app.config['PROFILE_SAMPLE_RATE'] = args.profile_rate
+    if args.profile_token:
+        app.config['PROFILE_TOKEN'] = args.profile_token
+    
     print("="*60)
     print("DETECTION & SEGMENTATION API SERVER")
     print("="*60)
     print(f"Starting server on http://{args.host}:{args.port}")
+    if args.profile_rate > 0:
+        print(f"Profiling {args.profile_rate:.1%} of requests ({args.profile}) -> results/profiles")
+    if app.config['PROFILE_TOKEN']:
+        print("On-demand profiling enabled (X-Profile with X-Profile-Token)")
     print("="*60)
     
     app.run(host=args.host, port=args.port, debug=args.debug)
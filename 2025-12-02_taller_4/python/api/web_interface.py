@@ -39,6 +39,7 @@ import uuid
 
 # Import detection modules
 from python.detection.pipeline import DetectionSegmentationPipeline
+from python.utils.profiling import PROFILE_MODES, install_request_profiling
 
 app = Flask(__name__)
 CORS(app)
@@ -49,6 +50,12 @@ OUTPUT_FOLDER = Path("data/output/web_results")
 UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
 
+# Per-request profiling: sampling is set by --profile-rate; the X-Profile header
+# is ignored unless --profile-token (or DETSEG_PROFILE_TOKEN) is set
+install_request_profiling(
+    app, output_dir=Path("results/profiles"), token=os.environ.get('DETSEG_PROFILE_TOKEN')
+)
+
 # Global pipeline (lazy loading)
 pipeline = None
 
@@ -995,9 +1002,23 @@ def cleanup_web_results():
         print(f"⚠️ Error cleaning up web results: {e}")
 
 if __name__ == '__main__':
+    import argparse
     import atexit
     import signal
     
+    parser = argparse.ArgumentParser(description='Detection & Segmentation Web Interface')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default='sampling',
+                        help='Profiler for sampled and X-Profile requests')
+    parser.add_argument('--profile-rate', type=float, default=0.0,
+                        help='Fraction of requests to profile (e.g. 0.01)')
+    parser.add_argument('--profile-token', default=None,
+                        help='Enable on-demand profiling for requests sending X-Profile-Token with this value')
+    args = parser.parse_args()
+    app.config['PROFILE_MODE'] = args.profile
+    app.config['PROFILE_SAMPLE_RATE'] = args.profile_rate
+    if args.profile_token:
+        app.config['PROFILE_TOKEN'] = args.profile_token
+    
     # Register cleanup functions to run on exit
     atexit.register(cleanup_web_results)
     atexit.register(cleanup_web_uploads)
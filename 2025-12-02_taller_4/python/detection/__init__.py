@@ -1,8 +1,46 @@
-"""Detection module for YOLO and SAM integration."""
+"""Detection module for YOLO and SAM integration.
 
-from .yolo_detector import YOLODetector
-from .sam_segmenter import SAMSegmenter
-from .pipeline import DetectionSegmentationPipeline
-from .video_processor import VideoProcessor
+Exports are resolved on first access (PEP 562 module __getattr__), so
+importing one submodule, e.g. detection.display, does not load the whole
+stack.
+"""
+import importlib
 
-__all__ = ['YOLODetector', 'SAMSegmenter', 'DetectionSegmentationPipeline', 'VideoProcessor']
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'YOLODetector': 'yolo_detector',
+    'SAMSegmenter': 'sam_segmenter',
+    'SAM_MODEL_REGISTRY': 'sam_segmenter',
+    'register_sam_model': 'sam_segmenter',
+    'FakeDetector': 'fake_backends',
+    'FakeSegmenter': 'fake_backends',
+    'ONNXDetector': 'onnx_detector',
+    'create_detector': 'backends',
+    'create_segmenter': 'backends',
+    'AdaptiveResolution': 'adaptive_resolution',
+    'Undistorter': 'undistort',
+    'LatestFrameGrabber': 'realtime',
+    'FrameScheduler': 'realtime',
+    'SharedFrameRing': 'frame_ring',
+    'SharedFrameCapture': 'frame_ring',
+    'StreamSource': 'multi_stream',
+    'StreamBatcher': 'multi_stream',
+    'WindowDisplay': 'display',
+    'HeadlessDisplay': 'display',
+    'DetectionSegmentationPipeline': 'pipeline',
+    'VideoProcessor': 'video_processor',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
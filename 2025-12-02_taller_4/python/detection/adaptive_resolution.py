@@ -0,0 +1,111 @@
+"""
+Adaptive Resolution
+Adjust the detector inference size from measured frame latency to keep a
+target FPS on video and webcam streams.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class AdaptiveResolution:
+    """
+    Step the detector imgsz down when frames exceed the latency budget and
+    back up when there is headroom.
+    
+    Steps down react quickly (median of the last few frames) while steps up
+    need a full window of fast frames, so the size does not oscillate.
+    
+    Detectors that cannot change their size (ONNX exports with a static
+    input shape) keep their own; the controller then never steps.
+    """
+    
+    def __init__(
+        self,
+        detector,
+        target_fps: float = 15.0,
+        sizes: Optional[List[int]] = None,
+        headroom: float = 0.7,
+        window: int = 15
+    ):
+        """
+        Initialize controller.
+        
+        Args:
+            detector: Detector exposing imgsz and set_imgsz()
+            target_fps: Frames per second to sustain
+            sizes: Candidate inference sizes (multiples of 32)
+            headroom: Raise the size when frames take less than headroom * budget
+            window: Frames considered per step-up decision
+        """
+        self.detector = detector
+        self.budget_ms = 1000.0 / target_fps
+        self.sizes = sorted(sizes or [320, 416, 512, 640, 768])
+        self.headroom = headroom
+        self.window = window
+        self.samples = deque(maxlen=window)
+        self.changes = 0
+        
+        # Start from the candidate closest to the configured size
+        self.index = int(np.argmin([abs(s - detector.imgsz) for s in self.sizes]))
+        self.adjustable = not getattr(detector, 'static_input', False) and self._apply()
+    
+    @classmethod
+    def from_config(cls, detector, yolo_config: Dict) -> Optional['AdaptiveResolution']:
+        """Create from models.yolo.adaptive_resolution (None if disabled or the size is fixed)."""
+        settings = dict(yolo_config.get('adaptive_resolution') or {})
+        if not settings.pop('enabled', False):
+            return None
+        controller = cls(detector, **settings)
+        if not controller.adjustable:
+            print(f"⚠ Detector input size is fixed at {detector.imgsz}, adaptive resolution disabled")
+            return None
+        return controller
+    
+    @property
+    def imgsz(self) -> int:
+        """Inference size the detector actually uses."""
+        return self.detector.imgsz
+    
+    def _apply(self) -> bool:
+        """Set the current candidate; False if the detector kept another size."""
+        used = self.detector.set_imgsz(self.sizes[self.index])
+        self.samples.clear()
+        return used == self.sizes[self.index]
+    
+    def _step(self, delta: int):
+        self.index += delta
+        if self._apply():
+            self.changes += 1
+            return
+        # The detector refused the size: stay where it is from now on
+        self.index -= delta
+        self.detector.set_imgsz(self.sizes[self.index])
+        self.adjustable = False
+        print(f"⚠ Detector kept imgsz {self.imgsz}, adaptive resolution disabled")
+    
+    def update(self, frame_time: float) -> int:
+        """
+        Record one frame's processing time and adjust the size if needed.
+        
+        Args:
+            frame_time: Processing time of the frame in seconds
+        
+        Returns:
+            Inference size for the next frame
+        """
+        if not self.adjustable:
+            return self.imgsz
+        
+        self.samples.append(frame_time * 1000)
+        recent = list(self.samples)[-max(3, self.window // 3):]
+        
+        if len(recent) >= 3 and np.median(recent) > self.budget_ms and self.index > 0:
+            self._step(-1)
+        elif (len(self.samples) == self.window
+              and np.median(self.samples) < self.headroom * self.budget_ms
+              and self.index < len(self.sizes) - 1):
+            self._step(1)
+        
+        return self.imgsz
@@ -0,0 +1,176 @@
+"""
+Model Backends
+Build detectors and segmenters from config.yaml so the pipeline, API and
+benchmarks can switch between real models and fake ones.
+"""
+import os
+from pathlib import Path
+from typing import Callable, Dict
+import sys
+
+# Handle imports for both module and standalone execution
+try:
+    from .yolo_detector import YOLODetector
+    from .sam_segmenter import SAMSegmenter
+    from .fake_backends import FakeDetector, FakeSegmenter
+    from .onnx_detector import ONNXDetector
+except ImportError:
+    # Running as standalone script
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from python.detection.yolo_detector import YOLODetector
+    from python.detection.sam_segmenter import SAMSegmenter
+    from python.detection.fake_backends import FakeDetector, FakeSegmenter
+    from python.detection.onnx_detector import ONNXDetector
+
+
+# Environment variables that force a backend: one per model, plus one for
+# both models (e.g. "fake" in CI) applied where the name exists
+BACKEND_ENV_VAR = 'DETSEG_BACKEND'
+DETECTOR_BACKEND_ENV_VAR = 'DETSEG_DETECTOR_BACKEND'
+SEGMENTER_BACKEND_ENV_VAR = 'DETSEG_SEGMENTER_BACKEND'
+
+
+def resolve_device(device: str) -> str:
+    """Return the requested device, or 'cpu' if CUDA is requested but unavailable."""
+    if not str(device).startswith('cuda'):
+        return device
+    
+    try:
+        import torch
+        cuda_available = torch.cuda.is_available()
+    except ImportError:
+        cuda_available = False
+    
+    if not cuda_available:
+        print(f"⚠ CUDA not available, falling back to CPU (requested: {device})")
+        return 'cpu'
+    return device
+
+
+def _build_ultralytics(yolo_config: Dict, config: Dict) -> YOLODetector:
+    if yolo_config.get('precision', 'fp32') != 'fp32':
+        raise ValueError("models.yolo.precision other than fp32 requires backend: onnx")
+    return YOLODetector(
+        model_path=yolo_config['model_name'],
+        confidence=yolo_config['confidence'],
+        iou_threshold=yolo_config['iou_threshold'],
+        device=resolve_device(yolo_config['device']),
+        imgsz=yolo_config.get('imgsz', 640),
+        max_detections=yolo_config.get('max_detections', 100),
+        classes=config.get('target_classes')
+    )
+
+
+def _build_onnx(yolo_config: Dict, config: Dict) -> ONNXDetector:
+    onnx_config = yolo_config.get('onnx') or {}
+    if yolo_config.get('precision', 'fp32') == 'int8':
+        model_name = onnx_config.get('model_path_int8') or Path(yolo_config['model_name']).stem + '_int8.onnx'
+    else:
+        model_name = onnx_config.get('model_path') or Path(yolo_config['model_name']).with_suffix('.onnx').name
+    return ONNXDetector(
+        model_path=str(Path(config['io']['models_dir']) / model_name),
+        confidence=yolo_config['confidence'],
+        iou_threshold=yolo_config['iou_threshold'],
+        # ONNX Runtime picks its own provider; no torch needed for the CUDA check
+        device=yolo_config['device'],
+        imgsz=yolo_config.get('imgsz', 640),
+        max_detections=yolo_config.get('max_detections', 100),
+        classes=config.get('target_classes'),
+        intra_op_threads=onnx_config.get('intra_op_threads', 0),
+        inter_op_threads=onnx_config.get('inter_op_threads', 1)
+    )
+
+
+def _build_fake_detector(yolo_config: Dict, config: Dict) -> FakeDetector:
+    fake_config = dict(yolo_config.get('fake') or {})
+    if isinstance(fake_config.get('num_objects'), list):
+        fake_config['num_objects'] = tuple(fake_config['num_objects'])
+    return FakeDetector(
+        confidence=yolo_config.get('confidence', 0.5),
+        iou_threshold=yolo_config.get('iou_threshold', 0.45),
+        imgsz=yolo_config.get('imgsz', 640),
+        max_detections=yolo_config.get('max_detections', 100),
+        classes=config.get('target_classes'),
+        **fake_config
+    )
+
+
+def _build_segment_anything(sam_config: Dict, config: Dict) -> SAMSegmenter:
+    models_dir = Path(config['io']['models_dir'])
+    precision = sam_config.get('precision', 'fp32')
+    decoder_path = None
+    if precision == 'int8' and sam_config.get('decoder_int8'):
+        decoder_path = str(models_dir / sam_config['decoder_int8'])
+    return SAMSegmenter(
+        model_type=sam_config['model_type'],
+        checkpoint_path=str(models_dir / sam_config['checkpoint']),
+        device=resolve_device(sam_config['device']),
+        precision=precision,
+        decoder_path=decoder_path
+    )
+
+
+def _build_fake_segmenter(sam_config: Dict, config: Dict) -> FakeSegmenter:
+    return FakeSegmenter(**(sam_config.get('fake') or {}))
+
+
+DETECTOR_BACKENDS: Dict[str, Callable] = {
+    'ultralytics': _build_ultralytics,
+    'onnx': _build_onnx,
+    'fake': _build_fake_detector,
+}
+
+SEGMENTER_BACKENDS: Dict[str, Callable] = {
+    'segment_anything': _build_segment_anything,
+    'fake': _build_fake_segmenter,
+}
+
+
+def _select_backend(model_config: Dict, registry: Dict[str, Callable], default: str, env_var: str) -> Callable:
+    """Resolve the backend name (env overrides first) to its builder."""
+    shared = os.environ.get(BACKEND_ENV_VAR)
+    if shared and not any(shared in backends for backends in (DETECTOR_BACKENDS, SEGMENTER_BACKENDS)):
+        raise ValueError(f"Unknown backend '{shared}' in {BACKEND_ENV_VAR}")
+    if shared not in registry:
+        # e.g. DETSEG_BACKEND=onnx only applies to the detector
+        shared = None
+    name = os.environ.get(env_var) or shared or model_config.get('backend', default)
+    if name not in registry:
+        raise ValueError(
+            f"Unknown backend '{name}'. Available: {', '.join(registry)}"
+        )
+    return registry[name]
+
+
+def create_detector(config: Dict) -> YOLODetector:
+    """
+    Create the detector configured in models.yolo.
+    
+    Args:
+        config: Full configuration dictionary (config.yaml)
+    
+    Returns:
+        Detector instance exposing the YOLODetector API
+    """
+    yolo_config = config['models']['yolo']
+    builder = _select_backend(yolo_config, DETECTOR_BACKENDS, 'ultralytics', DETECTOR_BACKEND_ENV_VAR)
+    detector = builder(yolo_config, config)
+    detector.configure_tiling(**(yolo_config.get('tiling') or {}))
+    return detector
+
+
+def create_segmenter(config: Dict) -> SAMSegmenter:
+    """
+    Create the segmenter configured in models.sam.
+    
+    Args:
+        config: Full configuration dictionary (config.yaml)
+    
+    Returns:
+        Segmenter instance exposing the SAMSegmenter API
+    """
+    sam_config = config['models']['sam']
+    builder = _select_backend(sam_config, SEGMENTER_BACKENDS, 'segment_anything', SEGMENTER_BACKEND_ENV_VAR)
+    segmenter = builder(sam_config, config)
+    segmenter.configure_budget(**(sam_config.get('budget') or {}))
+    return segmenter
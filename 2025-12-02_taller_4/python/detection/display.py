@@ -0,0 +1,330 @@
+"""
+Display and Run Control
+Processing loops show frames and read commands through a display object:
+an OpenCV window (imshow + waitKey) or, on servers without a screen, a
+headless display controlled from stdin and signals that can dump periodic
+snapshots and serve an MJPEG preview over HTTP.
+
+Loops ask wants_frame() before drawing, so headless runs with no consumer
+skip rendering entirely.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+# Commands returned by poll()
+COMMANDS = ('quit', 'screenshot')
+
+# Keys / stdin lines mapped to commands
+_COMMAND_KEYS = {'q': 'quit', 'quit': 'quit', 'exit': 'quit', 's': 'screenshot', 'screenshot': 'screenshot'}
+
+# One stdin reader per process, shared by successive headless runs
+_stdin_commands = deque()
+_stdin_thread = None
+
+
+def _read_stdin():
+    for line in sys.stdin:
+        command = _COMMAND_KEYS.get(line.strip().lower())
+        if command:
+            _stdin_commands.append(command)
+
+
+def _start_stdin_reader() -> bool:
+    global _stdin_thread
+    if sys.stdin is None or sys.stdin.closed:
+        return False
+    if _stdin_thread is None:
+        _stdin_thread = threading.Thread(target=_read_stdin, name='stdin-control', daemon=True)
+        _stdin_thread.start()
+    return True
+
+
+def resolve_headless(setting: Union[bool, str, None] = 'auto') -> bool:
+    """
+    Decide whether to run without a window.
+    
+    Args:
+        setting: True, False or 'auto' (headless on Linux without DISPLAY/WAYLAND_DISPLAY)
+    """
+    if setting in (None, 'auto'):
+        return sys.platform.startswith('linux') and not (
+            os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')
+        )
+    return bool(setting)
+
+
+class WindowDisplay:
+    """OpenCV window; 'q' quits and 's' requests a screenshot."""
+    
+    def __init__(self, window_name: str):
+        self.window_name = window_name
+    
+    def wants_frame(self) -> bool:
+        return True
+    
+    def show(self, frame: np.ndarray):
+        cv2.imshow(self.window_name, frame)
+    
+    def poll(self) -> Optional[str]:
+        """Pump the window event loop and return a command, if any."""
+        key = cv2.waitKey(1) & 0xFF
+        return _COMMAND_KEYS.get(chr(key)) if key != 0xFF else None
+    
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    """Serve the latest frame: / (page), /stream (MJPEG) and /snapshot.jpg."""
+    
+    display = None  # set per server
+    
+    def do_GET(self):
+        if self.path == '/':
+            body = (
+                f"<html><head><title>{self.display.name}</title></head>"
+                f"<body style='margin:0;background:#000'><img src='/stream' style='max-width:100%'></body></html>"
+            ).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/snapshot.jpg':
+            # Counts as a client so the loop renders a fresh frame
+            self.display.add_client(1)
+            try:
+                jpeg = self.display.wait_jpeg(self.display._jpeg_id, timeout=5.0)[1]
+            finally:
+                self.display.add_client(-1)
+            if jpeg is None:
+                self.send_error(503, 'No frame yet')
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+        elif self.path == '/stream':
+            self.send_response(200)
+            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+            self.end_headers()
+            self.display.add_client(1)
+            try:
+                frame_id = 0
+                while not self.display.closed:
+                    frame_id, jpeg = self.display.wait_jpeg(frame_id, timeout=1.0)
+                    if jpeg is None:
+                        continue
+                    self.wfile.write(
+                        b'--frame\r\nContent-Type: image/jpeg\r\n'
+                        + f'Content-Length: {len(jpeg)}\r\n\r\n'.encode() + jpeg + b'\r\n'
+                    )
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                self.display.add_client(-1)
+        else:
+            self.send_error(404)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class HeadlessDisplay:
+    """
+    Run without a window.
+    
+    Commands come from stdin lines (q / s), SIGINT/SIGTERM (quit) and SIGUSR1
+    (screenshot). Frames are only requested when a snapshot is due, a
+    preview client is connected or a screenshot is pending.
+    """
+    
+    def __init__(
+        self,
+        name: str = 'detection',
+        snapshot_dir: Optional[str] = None,
+        snapshot_interval: float = 0.0,
+        preview_port: Optional[int] = None,
+        preview_host: str = '127.0.0.1',
+        preview_fps: float = 10.0,
+        preview_quality: int = 80,
+        control_stdin: bool = True
+    ):
+        """
+        Start the headless controls.
+        
+        Args:
+            name: Run name (snapshot file name and preview title)
+            snapshot_dir: Directory for snapshots
+            snapshot_interval: Seconds between snapshots (0 disables them); each
+                one overwrites <name>_latest.jpg
+            preview_port: Port for the MJPEG preview server (None disables it)
+            preview_host: Address the preview binds to; the preview has no
+                authentication, so the default only accepts local clients
+            preview_fps: Maximum preview frame rate
+            preview_quality: JPEG quality of the preview
+            control_stdin: Read commands from stdin
+        """
+        self.name = name
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.snapshot_interval = snapshot_interval if self.snapshot_dir else 0.0
+        self.preview_interval = 1.0 / preview_fps if preview_fps else 0.0
+        self.preview_quality = preview_quality
+        self.closed = False
+        self._commands = deque()
+        self.control_stdin = False
+        self._last_snapshot = 0.0
+        self._last_preview = 0.0
+        self._clients = 0
+        self._jpeg = None
+        self._jpeg_id = 0
+        self._cond = threading.Condition()
+        self._previous_handlers = {}
+        self.server = None
+        
+        if self.snapshot_interval:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        
+        if preview_port:
+            handler = type('PreviewHandler', (_PreviewHandler,), {'display': self})
+            self.server = ThreadingHTTPServer((preview_host, preview_port), handler)
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name='preview-server', daemon=True).start()
+            if preview_host in ('127.0.0.1', 'localhost', '::1'):
+                print(f"Preview: http://localhost:{preview_port}/")
+            else:
+                shown = '<host>' if preview_host in ('0.0.0.0', '::') else preview_host
+                print(f"Preview: http://{shown}:{preview_port}/")
+                print("⚠ The preview has no authentication: anyone who can reach this address sees the feed")
+        
+        # Signals and stdin control the interactive run; in server threads
+        # (e.g. API requests) neither is touched
+        if threading.current_thread() is threading.main_thread():
+            for signum, command in (('SIGINT', 'quit'), ('SIGTERM', 'quit'), ('SIGUSR1', 'screenshot')):
+                if hasattr(signal, signum):
+                    sig = getattr(signal, signum)
+                    self._previous_handlers[sig] = signal.signal(
+                        sig, lambda *_, command=command: self._commands.append(command)
+                    )
+            
+            if control_stdin and _start_stdin_reader():
+                # Commands typed before this run started are discarded
+                _stdin_commands.clear()
+                self.control_stdin = True
+                print("Headless mode: type 'q' + Enter (or Ctrl+C) to stop, 's' + Enter for a screenshot")
+    
+    def _pending(self) -> deque:
+        if self.control_stdin:
+            while _stdin_commands:
+                self._commands.append(_stdin_commands.popleft())
+        return self._commands
+    
+    def add_client(self, delta: int):
+        with self._cond:
+            self._clients += delta
+    
+    def wait_jpeg(self, after_id: int, timeout: float):
+        """Wait for a preview frame newer than after_id; returns (id, jpeg or None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._jpeg_id > after_id or self.closed, timeout=timeout)
+            if self._jpeg_id > after_id:
+                return self._jpeg_id, self._jpeg
+            return after_id, None
+    
+    def _snapshot_due(self, now: float) -> bool:
+        return bool(self.snapshot_interval) and now - self._last_snapshot >= self.snapshot_interval
+    
+    def _preview_due(self, now: float) -> bool:
+        return self._clients > 0 and now - self._last_preview >= self.preview_interval
+    
+    def wants_frame(self) -> bool:
+        """Whether the next rendered frame would be used."""
+        now = time.time()
+        return 'screenshot' in self._pending() or self._snapshot_due(now) or self._preview_due(now)
+    
+    def show(self, frame: np.ndarray):
+        """Hand a rendered frame to the snapshot writer and preview clients."""
+        now = time.time()
+        if self._snapshot_due(now):
+            self._last_snapshot = now
+            path = self.snapshot_dir / f"{self.name}_latest.jpg"
+            tmp_path = path.with_name(f"{path.stem}.tmp.jpg")
+            # Replace atomically so readers never see a partial file
+            if cv2.imwrite(str(tmp_path), frame):
+                os.replace(tmp_path, path)
+        
+        if self._preview_due(now):
+            self._last_preview = now
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.preview_quality])
+            if ok:
+                with self._cond:
+                    self._jpeg = jpeg.tobytes()
+                    self._jpeg_id += 1
+                    self._cond.notify_all()
+    
+    def poll(self) -> Optional[str]:
+        """Return the next pending command, if any (never blocks)."""
+        commands = self._pending()
+        return commands.popleft() if commands else None
+    
+    def close(self):
+        self.closed = True
+        with self._cond:
+            self._cond.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for sig, handler in self._previous_handlers.items():
+            signal.signal(sig, handler)
+        self._previous_handlers = {}
+
+
+def open_display(
+    window_name: str,
+    video_config: Optional[Dict] = None,
+    display: bool = True,
+    headless: Optional[bool] = None,
+    preview_port: Optional[int] = None
+):
+    """
+    Create the display for a processing loop.
+    
+    Args:
+        window_name: Window title (and headless snapshot name)
+        video_config: config.yaml 'video' section (headless settings)
+        display: Show frames; False always runs headless
+        headless: Force headless mode (None uses video.headless.enabled)
+        preview_port: MJPEG preview port (None uses video.headless.preview_port)
+    
+    Returns:
+        WindowDisplay or HeadlessDisplay
+    """
+    headless_config = (video_config or {}).get('headless') or {}
+    if headless is None:
+        headless = resolve_headless(headless_config.get('enabled', 'auto'))
+    
+    if display and not headless:
+        return WindowDisplay(window_name)
+    
+    name = ''.join(c if c.isalnum() else '_' for c in window_name.lower()).strip('_')
+    return HeadlessDisplay(
+        name=name,
+        snapshot_dir=headless_config.get('snapshot_dir', 'results/snapshots'),
+        snapshot_interval=headless_config.get('snapshot_interval', 0) or 0,
+        preview_port=preview_port or headless_config.get('preview_port'),
+        preview_host=headless_config.get('preview_host') or '127.0.0.1',
+        preview_fps=headless_config.get('preview_fps', 10),
+        control_stdin=headless_config.get('control_stdin', True)
+    )
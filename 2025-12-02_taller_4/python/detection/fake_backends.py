@@ -0,0 +1,286 @@
+"""
+Fake Model Backends
+Deterministic stand-ins for YOLO and SAM with configurable latency and
+object counts, for testing and benchmarking without GPU or weights.
+"""
+import cv2
+import numpy as np
+import zlib
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Union
+import threading
+import time
+import sys
+
+# Handle imports for both module and standalone execution
+try:
+    from .yolo_detector import YOLODetector
+    from .sam_segmenter import SAMSegmenter
+except ImportError:
+    # Running as standalone script
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from python.detection.yolo_detector import YOLODetector
+    from python.detection.sam_segmenter import SAMSegmenter
+
+
+# First COCO classes, enough to exercise labels and colors
+FAKE_CLASS_NAMES = {
+    0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 4: 'airplane',
+    5: 'bus', 6: 'train', 7: 'truck', 8: 'boat', 9: 'traffic light'
+}
+
+
+def _image_seed(image: np.ndarray, seed: int) -> int:
+    """Cheap content hash so the same image always yields the same output."""
+    sample = np.ascontiguousarray(image[::16, ::16])
+    return zlib.crc32(sample.tobytes(), seed & 0xFFFFFFFF)
+
+
+def _sleep_ms(latency_ms: float, jitter_ms: float, rng: np.random.Generator):
+    """Simulate model latency."""
+    delay = latency_ms + (rng.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+
+class FakeDetector(YOLODetector):
+    """
+    Drop-in replacement for YOLODetector that generates random boxes.
+    """
+    
+    def __init__(
+        self,
+        num_objects: Union[int, Tuple[int, int]] = (1, 5),
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+        confidence: float = 0.5,
+        iou_threshold: float = 0.45,
+        imgsz: int = 640,
+        max_detections: int = 100,
+        classes: Optional[List[int]] = None,
+        **kwargs
+    ):
+        """
+        Initialize fake detector.
+        
+        Args:
+            num_objects: Objects per image, fixed or (min, max) range
+            latency_ms: Simulated inference time per image at imgsz 640
+                (scales with the input area, like a real detector)
+            jitter_ms: Uniform random variation added to latency
+            seed: Base seed; output depends only on seed and image content
+            confidence: Confidence threshold (boxes below it are dropped)
+            iou_threshold: Kept for API compatibility
+            imgsz: Simulated inference size
+            max_detections: Maximum detections per image
+            classes: Default class indices to keep (None for all)
+            **kwargs: Ignored real-backend options (model_path, device, ...)
+        """
+        self.model_path = 'fake'
+        self.confidence = confidence
+        self.iou_threshold = iou_threshold
+        self.device = 'cpu'
+        self.num_objects = num_objects
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self.max_detections = max_detections
+        self.classes = classes
+        self.class_names = dict(FAKE_CLASS_NAMES)
+        self.set_imgsz(imgsz)
+    
+    def detect(
+        self,
+        image: np.ndarray,
+        classes: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """
+        Generate deterministic detections for an image.
+        
+        Args:
+            image: Input image (BGR format)
+            classes: List of class indices to keep (None for the default classes)
+        
+        Returns:
+            Same structure as YOLODetector.detect
+        """
+        start_time = time.time()
+        if classes is None:
+            classes = self.classes
+        
+        rng = np.random.default_rng(_image_seed(image, self.seed))
+        _sleep_ms(self.latency_ms * (self.imgsz / 640) ** 2, self.jitter_ms, rng)
+        
+        h, w = image.shape[:2]
+        if isinstance(self.num_objects, int):
+            count = self.num_objects
+        else:
+            count = int(rng.integers(self.num_objects[0], self.num_objects[1] + 1))
+        
+        detections = []
+        for _ in range(count):
+            bw = int(w * rng.uniform(0.1, 0.4))
+            bh = int(h * rng.uniform(0.1, 0.5))
+            x1 = int(rng.integers(0, max(1, w - bw)))
+            y1 = int(rng.integers(0, max(1, h - bh)))
+            cls_id = int(rng.integers(0, len(self.class_names)))
+            conf = float(rng.uniform(self.confidence, 1.0))
+            
+            if classes is not None and cls_id not in classes:
+                continue
+            
+            detections.append({
+                'bbox': [x1, y1, x1 + bw, y1 + bh],
+                'confidence': conf,
+                'class_id': cls_id,
+                'class_name': self.class_names[cls_id]
+            })
+        
+        detections.sort(key=lambda d: d['confidence'], reverse=True)
+        detections = detections[:self.max_detections]
+        
+        inference_time = time.time() - start_time
+        
+        return detections, inference_time
+    
+    def detect_batch(
+        self,
+        images: List[np.ndarray],
+        classes: Optional[List[int]] = None
+    ) -> List[List[Dict]]:
+        """Generate detections for each image (same format as detect)."""
+        return [self.detect(image, classes)[0] for image in images]
+
+
+class FakeSegmenter(SAMSegmenter):
+    """
+    Drop-in replacement for SAMSegmenter that returns ellipse masks.
+    
+    Latency is split like SAM: a per-image encoder cost paid in set_image
+    and a per-prompt decoder cost paid in every segment call.
+    """
+    
+    def __init__(
+        self,
+        encoder_latency_ms: float = 0.0,
+        decoder_latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+        **kwargs
+    ):
+        """
+        Initialize fake segmenter.
+        
+        Args:
+            encoder_latency_ms: Simulated image embedding time
+            decoder_latency_ms: Simulated mask decoding time per prompt
+            jitter_ms: Uniform random variation added to each latency
+            seed: Base seed; scores and jitter depend only on seed, image
+                content and prompt
+            **kwargs: Ignored real-backend options (model_type, checkpoint_path, ...)
+        """
+        self.model_type = 'fake'
+        self.checkpoint_path = None
+        self.device = 'cpu'
+        self.encoder_latency_ms = encoder_latency_ms
+        self.decoder_latency_ms = decoder_latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        # The image set by set_image is kept per thread, so concurrent
+        # requests on a threaded server do not see each other's image
+        self._current = threading.local()
+    
+    def set_image(self, image: np.ndarray):
+        """
+        Simulate image encoding.
+        
+        Args:
+            image: Input image in RGB format
+        """
+        self._current.seed = _image_seed(image, self.seed)
+        self._current.shape = image.shape[:2]
+        _sleep_ms(self.encoder_latency_ms, self.jitter_ms, np.random.default_rng(self._current.seed))
+    
+    def _prompt_rng(self, prompt) -> np.random.Generator:
+        """Generator seeded by the current image and a prompt (same inputs, same output)."""
+        values = np.asarray(prompt, dtype=np.float64).round().astype(np.int64).ravel()
+        return np.random.default_rng([self._current.seed] + [int(v) & 0xFFFFFFFF for v in values])
+    
+    def _ellipse_mask(self, bbox: List[int]) -> np.ndarray:
+        """Full-frame mask with the ellipse inscribed in bbox."""
+        mask = np.zeros(self._current.shape, dtype=np.uint8)
+        x1, y1, x2, y2 = [int(v) for v in bbox]
+        center = ((x1 + x2) // 2, (y1 + y2) // 2)
+        axes = (max(1, (x2 - x1) // 2), max(1, (y2 - y1) // 2))
+        cv2.ellipse(mask, center, axes, 0, 0, 360, 1, -1)
+        return mask.astype(bool)
+    
+    def segment_from_bbox(
+        self,
+        bbox: List[int],
+        image: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Generate an ellipse mask from a bounding box.
+        
+        Args:
+            bbox: Bounding box [x1, y1, x2, y2]
+            image: Input image (if not already set)
+        
+        Returns:
+            mask: Binary segmentation mask
+            score: Confidence score
+        """
+        start_time = time.time()
+        
+        if image is not None:
+            self.set_image(image)
+        
+        rng = self._prompt_rng(bbox)
+        _sleep_ms(self.decoder_latency_ms, self.jitter_ms, rng)
+        mask = self._ellipse_mask(bbox)
+        score = float(rng.uniform(0.85, 1.0))
+        
+        inference_time = time.time() - start_time
+        
+        return mask, score, inference_time
+    
+    def segment_from_points(
+        self,
+        points: np.ndarray,
+        labels: np.ndarray,
+        image: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Generate a mask around the foreground points.
+        
+        Args:
+            points: Array of points [[x1, y1], [x2, y2], ...]
+            labels: Array of labels (1=foreground, 0=background)
+            image: Input image (if not already set)
+        
+        Returns:
+            mask: Binary segmentation mask
+            score: Confidence score
+        """
+        start_time = time.time()
+        
+        if image is not None:
+            self.set_image(image)
+        
+        rng = self._prompt_rng(points)
+        _sleep_ms(self.decoder_latency_ms, self.jitter_ms, rng)
+        
+        h, w = self._current.shape
+        fg = np.asarray(points)[np.asarray(labels) == 1]
+        if len(fg) == 0:
+            fg = np.asarray(points)
+        x, y = fg.mean(axis=0)
+        radius = max(8, int(0.1 * min(h, w)))
+        mask = self._ellipse_mask([x - radius, y - radius, x + radius, y + radius])
+        score = float(rng.uniform(0.85, 1.0))
+        
+        inference_time = time.time() - start_time
+        
+        return mask, score, inference_time
@@ -0,0 +1,360 @@
+"""
+Shared-Memory Frame Ring
+Fixed-size frame slots in multiprocessing.shared_memory, so a capture
+process can hand frames to the inference process without pickling them.
+
+One producer, one consumer. Each slot has a sequence number used as a
+seqlock: odd while the producer writes it, the frame sequence when done.
+The producer overwrites the oldest slot (drop-oldest) or, for files where
+every frame matters, waits for the consumer.
+"""
+import multiprocessing as mp
+import sys
+import time
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Header fields (int64); producer and consumer each own their counters
+_WRITE_SEQ, _READ_SEQ, _CLOSED, _DROPPED, _SKIPPED = range(5)
+_HEADER_FIELDS = 5
+
+
+class SharedFrameRing:
+    """
+    Ring of frame slots backed by shared memory, with NumPy views on it.
+    """
+    
+    def __init__(
+        self,
+        frame_shape: Tuple[int, ...],
+        num_slots: int = 4,
+        dtype: str = 'uint8',
+        name: Optional[str] = None
+    ):
+        """
+        Create a ring, or attach to an existing one when name is given.
+        
+        Args:
+            frame_shape: Shape of every frame, e.g. (720, 1280, 3)
+            num_slots: Number of frames held
+            dtype: Frame dtype
+            name: Shared memory block to attach to (None creates a new one)
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.num_slots = num_slots
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        header_bytes = (_HEADER_FIELDS + 2 * num_slots) * 8
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + num_slots * frame_bytes)
+        elif sys.version_info >= (3, 13):
+            # The creating process owns (and unlinks) the block
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Registers with the creator's resource tracker (started before
+            # the capture process), so the owner's unlink clears it
+            self.shm = shared_memory.SharedMemory(name=name)
+        
+        buf = self.shm.buf
+        self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+        self.slot_seq = np.ndarray((num_slots,), dtype=np.int64, buffer=buf, offset=_HEADER_FIELDS * 8)
+        self.slot_time = np.ndarray(
+            (num_slots,), dtype=np.float64, buffer=buf, offset=(_HEADER_FIELDS + num_slots) * 8
+        )
+        self.slots = np.ndarray(
+            (num_slots,) + self.frame_shape, dtype=self.dtype, buffer=buf, offset=header_bytes
+        )
+        if self.owner:
+            self.header[:] = 0
+            self.slot_seq[:] = 0
+    
+    @property
+    def name(self) -> str:
+        return self.shm.name
+    
+    def spec(self) -> Dict:
+        """Arguments to attach to this ring from another process."""
+        return {
+            'frame_shape': self.frame_shape,
+            'num_slots': self.num_slots,
+            'dtype': self.dtype.str,
+            'name': self.name
+        }
+    
+    @property
+    def write_seq(self) -> int:
+        return int(self.header[_WRITE_SEQ])
+    
+    @property
+    def closed(self) -> bool:
+        return bool(self.header[_CLOSED])
+    
+    @property
+    def dropped(self) -> int:
+        """Frames never read: overwritten by the producer or skipped by latest reads."""
+        return int(self.header[_DROPPED] + self.header[_SKIPPED])
+    
+    def put(
+        self,
+        frame: np.ndarray,
+        timestamp: Optional[float] = None,
+        block: bool = False,
+        timeout: Optional[float] = None
+    ) -> int:
+        """
+        Copy a frame into the next slot (producer side).
+        
+        Args:
+            frame: Frame with the ring's shape
+            timestamp: Capture time (default: now)
+            block: Wait for the consumer instead of overwriting unread frames
+            timeout: Maximum wait in seconds when blocking
+        
+        Returns:
+            Sequence number of the frame (0 if the ring closed or timed out while waiting)
+        """
+        seq = self.write_seq + 1
+        deadline = None if timeout is None else time.time() + timeout
+        while block and seq - int(self.header[_READ_SEQ]) > self.num_slots:
+            if self.closed or (deadline is not None and time.time() > deadline):
+                return 0
+            time.sleep(0.0005)
+        
+        slot = seq % self.num_slots
+        if self.slot_seq[slot] // 2 > self.header[_READ_SEQ]:
+            self.header[_DROPPED] += 1
+        
+        self.slot_seq[slot] = 2 * seq - 1  # odd: being written
+        self.slots[slot][...] = frame
+        self.slot_time[slot] = time.time() if timestamp is None else timestamp
+        self.slot_seq[slot] = 2 * seq
+        self.header[_WRITE_SEQ] = seq
+        return seq
+    
+    def get(
+        self,
+        after_seq: Optional[int] = None,
+        latest: bool = False,
+        timeout: float = 1.0,
+        out: Optional[np.ndarray] = None
+    ) -> Tuple[int, Optional[np.ndarray], float]:
+        """
+        Copy the next unread frame out of the ring (consumer side).
+        
+        Args:
+            after_seq: Last sequence read (None continues after the last get)
+            latest: Skip to the newest frame instead of the oldest unread one
+            timeout: Seconds to wait for a new frame
+            out: Preallocated array to copy into
+        
+        Returns:
+            seq: Frame sequence number (0 if the ring closed or timed out)
+            frame: Copy of the frame
+            timestamp: Capture time of the frame
+        """
+        if after_seq is None:
+            after_seq = int(self.header[_READ_SEQ])
+        deadline = time.time() + timeout
+        
+        while True:
+            write_seq = self.write_seq
+            if write_seq > after_seq:
+                # Oldest frame still in the ring
+                oldest = max(after_seq + 1, write_seq - self.num_slots + 1)
+                seq = write_seq if latest else oldest
+                slot = seq % self.num_slots
+                
+                if self.slot_seq[slot] == 2 * seq:
+                    if out is None:
+                        frame = self.slots[slot].copy()
+                    else:
+                        frame = out
+                        np.copyto(frame, self.slots[slot])
+                    timestamp = float(self.slot_time[slot])
+                    if self.slot_seq[slot] == 2 * seq:
+                        # Frames still in the ring that were jumped over (the
+                        # producer counts the ones it overwrote)
+                        self.header[_SKIPPED] += seq - oldest
+                        self.header[_READ_SEQ] = seq
+                        return seq, frame, timestamp
+                # Overwritten by a newer frame (before or while copying): skip it
+                after_seq = seq
+                continue
+            
+            if self.closed or time.time() > deadline:
+                return 0, None, 0.0
+            time.sleep(0.0005)
+    
+    def close(self):
+        """Mark the stream as finished (consumers return once it is drained)."""
+        self.header[_CLOSED] = 1
+    
+    def release(self):
+        """Detach; the creating process also frees the shared memory."""
+        self.header = self.slot_seq = self.slot_time = self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _capture_worker(source, video_config: Dict, resolution, num_slots: int, block: bool, conn, stop_event):
+    """Capture process: open the source, report its properties, then fill the ring."""
+    cap = None
+    try:
+        try:
+            from .video_io import open_video_reader
+        except ImportError:
+            from python.detection.video_io import open_video_reader
+        
+        cap = open_video_reader(source, video_config)
+        if resolution and isinstance(source, int):
+            # Request the capture size from the camera driver
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+        ret, frame = cap.read() if cap.isOpened() else (False, None)
+    except Exception:
+        # The parent is waiting for the properties: report the failure
+        traceback.print_exc()
+        ret = False
+    
+    if not ret:
+        conn.send(None)
+        if cap is not None:
+            cap.release()
+        return
+    
+    conn.send({
+        'frame_shape': frame.shape,
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'frame_count': cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    })
+    spec = conn.recv()
+    ring = SharedFrameRing(**spec)
+    
+    try:
+        while ret and not stop_event.is_set():
+            if ring.put(frame, block=block, timeout=1.0):
+                ret, frame = cap.read()
+            elif ring.closed:
+                break
+    finally:
+        ring.close()
+        ring.release()
+        cap.release()
+
+
+class SharedFrameCapture:
+    """
+    Read a camera or video file in a separate process through a SharedFrameRing.
+    
+    Exposes the cv2.VideoCapture API (read, get, isOpened, release), so the
+    processing loops can use it in place of a capture.
+    """
+    
+    def __init__(
+        self,
+        source,
+        video_config: Optional[Dict] = None,
+        resolution=None,
+        num_slots: int = 4,
+        drop_oldest: bool = True,
+        latest: bool = False,
+        open_timeout: float = 30.0
+    ):
+        """
+        Start the capture process.
+        
+        Args:
+            source: Camera index or video path
+            video_config: config.yaml 'video' section (reader backend)
+            resolution: Camera capture [width, height] requested from the driver
+            num_slots: Frames buffered in shared memory
+            drop_oldest: Overwrite unread frames (live sources); False makes the
+                capture wait for the consumer (files)
+            latest: read() returns the newest frame, skipping older unread ones
+            open_timeout: Seconds to wait for the capture process to open the
+                source before giving up (isOpened() is then False)
+        """
+        self.latest = latest
+        self.ring = None
+        self._dropped = 0
+        self.info = None
+        self.last_timestamp = 0.0
+        self._stop = mp.Event()
+        
+        # The ring is created after the capture process starts; start the
+        # resource tracker first so both processes share it
+        resource_tracker.ensure_running()
+        parent_conn, child_conn = mp.Pipe()
+        self.process = mp.Process(
+            target=_capture_worker,
+            args=(source, video_config or {}, resolution, num_slots, not drop_oldest, child_conn, self._stop),
+            name='frame-capture',
+            daemon=True
+        )
+        self.process.start()
+        # Only the worker holds the child end, so its exit closes the pipe
+        child_conn.close()
+        
+        deadline = time.monotonic() + open_timeout
+        while not parent_conn.poll(0.5):
+            if not self.process.is_alive() or time.monotonic() > deadline:
+                break
+        try:
+            self.info = parent_conn.recv() if parent_conn.poll() else None
+        except EOFError:
+            self.info = None
+        if self.info is None:
+            self.release()
+            return
+        self.ring = SharedFrameRing(self.info['frame_shape'], num_slots)
+        parent_conn.send(self.ring.spec())
+    
+    def isOpened(self) -> bool:
+        return self.ring is not None
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Next frame (same contract as cv2.VideoCapture.read)."""
+        if self.ring is None:
+            return False, None
+        seq, frame, self.last_timestamp = self.ring.get(latest=self.latest, timeout=5.0)
+        return seq > 0, frame
+    
+    def get(self, prop: int) -> float:
+        """Subset of cv2.VideoCapture.get used by the processing loops."""
+        if self.info is None:
+            return 0.0
+        height, width = self.info['frame_shape'][:2]
+        return float({
+            cv2.CAP_PROP_FPS: self.info['fps'],
+            cv2.CAP_PROP_FRAME_WIDTH: width,
+            cv2.CAP_PROP_FRAME_HEIGHT: height,
+            cv2.CAP_PROP_FRAME_COUNT: self.info['frame_count']
+        }.get(prop, 0.0))
+    
+    def set(self, prop: int, value: float) -> bool:
+        # Capture properties are applied in the capture process (resolution argument)
+        return False
+    
+    @property
+    def frames_dropped(self) -> int:
+        return self.ring.dropped if self.ring is not None else self._dropped
+    
+    def release(self):
+        """Stop the capture process and free the shared memory."""
+        self._stop.set()
+        if self.ring is not None:
+            self.ring.close()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.ring is not None:
+            self._dropped = self.ring.dropped
+            self.ring.release()
+            self.ring = None
@@ -0,0 +1,297 @@
+"""
+Multi-Stream Capture
+Read several cameras, RTSP streams or video files concurrently, one thread
+per source, and hand the processing loop a batch with the newest frame of
+every stream that has one ready, so a single detector/segmenter serves all
+of them.
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    from .video_io import open_video_reader
+except ImportError:
+    from python.detection.video_io import open_video_reader
+
+# URL schemes read as live streams (frames dropped when processing falls behind)
+LIVE_SCHEMES = ('rtsp://', 'rtmp://', 'http://', 'https://', 'udp://')
+
+
+def parse_source(source: Union[int, str]) -> Union[int, str]:
+    """Camera IDs given as strings ("0", "1", ...) become ints."""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def is_live_source(source: Union[int, str]) -> bool:
+    """Cameras and network streams are live; anything else is a file."""
+    return isinstance(source, int) or str(source).lower().startswith(LIVE_SCHEMES)
+
+
+class StreamSource:
+    """
+    Capture one source on a daemon thread into a small frame queue.
+    
+    Live sources keep only the newest queue_size frames (older ones are
+    dropped); files block the thread until the consumer catches up, so every
+    frame is processed.
+    """
+    
+    def __init__(
+        self,
+        stream_id: int,
+        source: Union[int, str],
+        video_config: Optional[Dict] = None,
+        queue_size: int = 2,
+        max_frames: Optional[int] = None,
+        frame_ready: Optional[threading.Event] = None
+    ):
+        """
+        Open the source.
+        
+        Args:
+            stream_id: Index of the stream (used in outputs and metrics)
+            source: Camera ID, stream URL or video path
+            video_config: config.yaml 'video' section (reader backend, camera resolution)
+            queue_size: Frames buffered per stream
+            max_frames: Stop after this many frames (None for the whole source)
+            frame_ready: Event set whenever a frame is queued (shared by all streams)
+        """
+        self.stream_id = stream_id
+        self.source = parse_source(source)
+        self.live = is_live_source(self.source)
+        self.video_config = video_config or {}
+        self.resolution = self.video_config.get('resolution')
+        self.max_frames = max_frames
+        self.frame_ready = frame_ready or threading.Event()
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._running = False
+        self._done = False
+        self._thread = None
+        
+        self.cap = open_video_reader(self.source, self.video_config)
+        if self.live and self.resolution and self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        self.fps = (self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0) or 30
+    
+    @property
+    def name(self) -> str:
+        return f"stream_{self.stream_id}"
+    
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+    
+    def start(self) -> 'StreamSource':
+        """Start capturing in a daemon thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f'capture-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        try:
+            while self._running:
+                if self.max_frames and self.frames_captured >= self.max_frames:
+                    break
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                item = (frame, time.time())
+                self.frames_captured += 1
+                
+                if self.live:
+                    # Keep the newest frames: drop the oldest queued one
+                    while True:
+                        try:
+                            self._queue.put_nowait(item)
+                            break
+                        except queue.Full:
+                            try:
+                                self._queue.get_nowait()
+                                self.frames_dropped += 1
+                            except queue.Empty:
+                                pass
+                else:
+                    while self._running:
+                        try:
+                            self._queue.put(item, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                self.frame_ready.set()
+        finally:
+            self._running = False
+            self._done = True
+            self.frame_ready.set()
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray], float]:
+        """
+        Take the next queued frame without waiting.
+        
+        Returns:
+            ret: False when no frame is ready
+            frame: Frame as captured
+            timestamp: Capture time (time.time()) of the frame
+        """
+        try:
+            frame, timestamp = self._queue.get_nowait()
+        except queue.Empty:
+            return False, None, 0.0
+        return True, frame, timestamp
+    
+    @property
+    def finished(self) -> bool:
+        """The source ended and every captured frame was read."""
+        return self._done and self._queue.empty()
+    
+    def stop(self):
+        """Stop the capture thread and release the source."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.cap.release()
+
+
+class StreamBatcher:
+    """
+    Collect frames from several StreamSources into batches.
+    
+    A batch holds at most one frame per stream. After the first frame is
+    ready, the batcher waits up to batch_wait_ms for the other streams so
+    unsynchronized cameras still share detector passes.
+    """
+    
+    def __init__(
+        self,
+        sources: List[Union[int, str]],
+        video_config: Optional[Dict] = None,
+        queue_size: int = 2,
+        batch_wait_ms: float = 10.0,
+        max_batch: Optional[int] = None,
+        max_frames: Optional[int] = None
+    ):
+        """
+        Open every source.
+        
+        Args:
+            sources: Camera IDs, stream URLs or video paths
+            video_config: config.yaml 'video' section
+            queue_size: Frames buffered per stream
+            batch_wait_ms: Time to wait for the remaining streams once one has a frame
+            max_batch: Maximum frames per batch (None for one per stream); streams
+                are served round-robin when there are more
+            max_frames: Frames read per source (None for all)
+        """
+        self.frame_ready = threading.Event()
+        self.streams = [
+            StreamSource(i, source, video_config, queue_size, max_frames, self.frame_ready)
+            for i, source in enumerate(sources)
+        ]
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_batch = max_batch
+        self._next = 0
+    
+    def start(self) -> 'StreamBatcher':
+        for stream in self.streams:
+            if stream.isOpened():
+                stream.start()
+        return self
+    
+    @property
+    def active(self) -> List[StreamSource]:
+        """Streams that opened and still have frames to deliver."""
+        return [s for s in self.streams if s.isOpened() and not s.finished]
+    
+    def _collect(self, batch: List[Tuple], pending: List[StreamSource]):
+        for stream in list(pending):
+            if self.max_batch and len(batch) >= self.max_batch:
+                break
+            ret, frame, timestamp = stream.read()
+            if ret:
+                batch.append((stream, frame, timestamp))
+                pending.remove(stream)
+    
+    def next_batch(self, timeout: float = 1.0) -> List[Tuple[StreamSource, np.ndarray, float]]:
+        """
+        Wait for frames and return one batch.
+        
+        Args:
+            timeout: Seconds to wait for the first frame
+        
+        Returns:
+            List of (stream, frame, timestamp); empty when every source ended
+            or nothing arrived within the timeout
+        """
+        deadline = time.time() + timeout
+        batch = []
+        
+        while True:
+            active = self.active
+            if not active:
+                return []
+            # Rotate the starting stream so max_batch cannot starve the last ones
+            start = self._next % len(active)
+            pending = active[start:] + active[:start]
+            
+            self.frame_ready.clear()
+            self._collect(batch, pending)
+            if batch:
+                break
+            if time.time() > deadline:
+                return []
+            self.frame_ready.wait(timeout=max(0.0, deadline - time.time()))
+        
+        # Give the other streams a moment to deliver their frame
+        batch_deadline = time.time() + self.batch_wait
+        while pending and (not self.max_batch or len(batch) < self.max_batch):
+            remaining = batch_deadline - time.time()
+            if remaining <= 0:
+                break
+            self.frame_ready.clear()
+            self._collect(batch, pending)
+            if pending and not any(s.finished for s in pending):
+                self.frame_ready.wait(timeout=remaining)
+            pending = [s for s in pending if not s.finished]
+        
+        self._next += 1
+        return batch
+    
+    def stop(self):
+        for stream in self.streams:
+            stream.stop()
+
+
+def mosaic(frames: List[np.ndarray], tile_width: int = 640) -> np.ndarray:
+    """
+    Tile frames in a grid for display (each resized to tile_width wide).
+    
+    Args:
+        frames: BGR frames, possibly of different sizes
+        tile_width: Width of every tile
+    
+    Returns:
+        Grid image
+    """
+    cols = int(np.ceil(np.sqrt(len(frames))))
+    rows = int(np.ceil(len(frames) / cols))
+    tile_height = max(
+        int(round(f.shape[0] * tile_width / f.shape[1])) for f in frames
+    )
+    grid = np.zeros((rows * tile_height, cols * tile_width, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        h = int(round(frame.shape[0] * tile_width / frame.shape[1]))
+        r, c = divmod(i, cols)
+        grid[r * tile_height:r * tile_height + h, c * tile_width:(c + 1) * tile_width] = cv2.resize(
+            frame, (tile_width, h)
+        )
+    return grid
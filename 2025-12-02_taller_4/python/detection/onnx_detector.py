@@ -0,0 +1,285 @@
+"""
+ONNX Runtime YOLO Detector
+Run YOLOv8 models exported to ONNX (scripts/download_models.py) with
+ONNX Runtime. Much faster than PyTorch on CPU-only hosts.
+"""
+import ast
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import time
+import sys
+
+# Handle imports for both module and standalone execution
+try:
+    from .yolo_detector import YOLODetector
+except ImportError:
+    # Running as standalone script
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from python.detection.yolo_detector import YOLODetector
+
+
+def letterbox(
+    image: np.ndarray,
+    new_shape: Tuple[int, int],
+    color: Tuple[int, int, int] = (114, 114, 114)
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to new_shape (same as ultralytics).
+    
+    Args:
+        image: Input image
+        new_shape: Target (height, width)
+        color: Padding color
+    
+    Returns:
+        padded: Letterboxed image
+        ratio: Scale factor applied to the image
+        pad: (left, top) padding in pixels
+    """
+    h, w = image.shape[:2]
+    ratio = min(new_shape[0] / h, new_shape[1] / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    
+    pad_w = (new_shape[1] - new_w) / 2
+    pad_h = (new_shape[0] - new_h) / 2
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    
+    return padded, ratio, (left, top)
+
+
+class ONNXDetector(YOLODetector):
+    """
+    YOLOv8 detector running an exported ONNX model with ONNX Runtime.
+    
+    Same API and detection dictionaries as YOLODetector.
+    """
+    
+    def __init__(
+        self,
+        model_path: str = "data/models/yolov8n.onnx",
+        confidence: float = 0.5,
+        iou_threshold: float = 0.45,
+        device: str = "cpu",
+        imgsz: int = 640,
+        max_detections: int = 100,
+        classes: Optional[List[int]] = None,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1
+    ):
+        """
+        Initialize ONNX Runtime detector.
+        
+        Args:
+            model_path: Path to the exported .onnx model
+            confidence: Confidence threshold for detections
+            iou_threshold: IoU threshold for NMS
+            device: 'cuda' or 'cpu' (falls back to CPU if CUDA provider is missing)
+            imgsz: Input size, used when the model has dynamic input shape
+            max_detections: Maximum detections kept after NMS
+            classes: Default class indices to detect (None for all)
+            intra_op_threads: Threads inside one operator (0 = one per physical core)
+            inter_op_threads: Threads running independent operators in parallel
+        """
+        import onnxruntime as ort
+        
+        self.model_path = model_path
+        self.confidence = confidence
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.classes = classes
+        
+        if not Path(model_path).exists():
+            raise FileNotFoundError(
+                f"ONNX model not found: {model_path}. Export it with scripts/download_models.py "
+                "(INT8: scripts/quantize_models.py yolo)"
+            )
+        
+        # Execution provider (CUDA only if this onnxruntime build has it)
+        providers = ['CPUExecutionProvider']
+        self.device = 'cpu'
+        if str(device).startswith('cuda'):
+            if 'CUDAExecutionProvider' in ort.get_available_providers():
+                providers.insert(0, 'CUDAExecutionProvider')
+                self.device = device
+            else:
+                print("⚠ CUDAExecutionProvider not available, falling back to CPU")
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        
+        print(f"Loading ONNX model: {model_path}")
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        
+        # Static input shape from the model, otherwise imgsz
+        input_shape = self.session.get_inputs()[0].shape
+        self.static_input = isinstance(input_shape[2], int) and isinstance(input_shape[3], int)
+        self.static_batch = isinstance(input_shape[0], int)
+        if self.static_input:
+            self.imgsz = max(input_shape[2], input_shape[3])
+            self.input_size = (input_shape[2], input_shape[3])
+        else:
+            self.set_imgsz(imgsz)
+        
+        # Class names are stored in the metadata by the ultralytics exporter
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if 'names' in metadata:
+            self.class_names = ast.literal_eval(metadata['names'])
+        else:
+            num_classes = self.session.get_outputs()[0].shape[1] - 4
+            self.class_names = {i: str(i) for i in range(num_classes)}
+        
+        print(f"✓ Model loaded on {self.device} ({', '.join(self.session.get_providers())})")
+        print(f"✓ Input size: {self.input_size[1]}x{self.input_size[0]}")
+        print(f"✓ Total classes: {len(self.class_names)}")
+    
+    def set_imgsz(self, imgsz: int) -> int:
+        """
+        Set the inference size; models exported with a static input keep theirs.
+        
+        Returns:
+            Size actually used
+        """
+        if getattr(self, 'static_input', False):
+            return self.imgsz
+        self.imgsz = max(32, int(round(imgsz / 32)) * 32)
+        self.input_size = (self.imgsz, self.imgsz)
+        return self.imgsz
+    
+    def preprocess(self, image: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        """
+        Letterbox a BGR image into a normalized NCHW RGB blob.
+        
+        Returns:
+            blob: Float32 array (1, 3, H, W)
+            ratio: Letterbox scale factor
+            pad: (left, top) padding
+        """
+        padded, ratio, pad = letterbox(image, self.input_size)
+        blob = cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)
+        return blob, ratio, pad
+    
+    def postprocess(
+        self,
+        output: np.ndarray,
+        ratio: float,
+        pad: Tuple[int, int],
+        image_shape: Tuple[int, int],
+        classes: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """
+        Decode raw YOLOv8 output (1, 4 + num_classes, num_anchors) with per-class NMS.
+        
+        Returns:
+            List of detection dictionaries (same format as YOLODetector.detect)
+        """
+        if classes is None:
+            classes = self.classes
+        preds = output[0]
+        if preds.shape[0] > preds.shape[1]:
+            preds = preds.T
+        
+        class_scores = preds[4:]
+        class_ids = class_scores.argmax(axis=0)
+        scores = class_scores[class_ids, np.arange(class_scores.shape[1])]
+        
+        keep = scores > self.confidence
+        if classes is not None:
+            keep &= np.isin(class_ids, classes)
+        if not keep.any():
+            return []
+        
+        cx, cy, w, h = preds[:4, keep]
+        scores = scores[keep]
+        class_ids = class_ids[keep]
+        
+        # Undo letterbox: center xywh in model input -> x1y1wh in original image
+        x1 = (cx - w / 2 - pad[0]) / ratio
+        y1 = (cy - h / 2 - pad[1]) / ratio
+        boxes = np.stack([x1, y1, w / ratio, h / ratio], axis=1)
+        
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes.tolist(), scores.tolist(), class_ids.tolist(),
+            self.confidence, self.iou_threshold
+        )
+        indices = np.array(indices, dtype=int).reshape(-1)
+        indices = indices[np.argsort(-scores[indices])][:self.max_detections]
+        
+        img_h, img_w = image_shape
+        detections = []
+        for i in indices:
+            bx, by, bw, bh = boxes[i]
+            cls_id = int(class_ids[i])
+            detections.append({
+                'bbox': [
+                    int(np.clip(bx, 0, img_w)),
+                    int(np.clip(by, 0, img_h)),
+                    int(np.clip(bx + bw, 0, img_w)),
+                    int(np.clip(by + bh, 0, img_h))
+                ],
+                'confidence': float(scores[i]),
+                'class_id': cls_id,
+                'class_name': self.class_names[cls_id]
+            })
+        
+        return detections
+    
+    def detect(
+        self,
+        image: np.ndarray,
+        classes: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """
+        Perform object detection on an image.
+        
+        Args:
+            image: Input image (BGR format)
+            classes: List of class indices to detect (None for the default classes)
+        
+        Returns:
+            Same structure as YOLODetector.detect
+        """
+        start_time = time.time()
+        
+        blob, ratio, pad = self.preprocess(image)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        detections = self.postprocess(output, ratio, pad, image.shape[:2], classes)
+        
+        inference_time = time.time() - start_time
+        
+        return detections, inference_time
+    
+    def detect_batch(
+        self,
+        images: List[np.ndarray],
+        classes: Optional[List[int]] = None
+    ) -> List[List[Dict]]:
+        """
+        Detect objects on several images in one session run.
+        
+        Models exported with a fixed batch size of 1 (the default export)
+        run the images one by one.
+        
+        Returns:
+            One detection list per image (same format as detect)
+        """
+        if self.static_batch:
+            return [self.detect(image, classes)[0] for image in images]
+        
+        prepared = [self.preprocess(image) for image in images]
+        blob = np.concatenate([blob for blob, _, _ in prepared])
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return [
+            self.postprocess(output[i:i + 1], ratio, pad, image.shape[:2], classes)
+            for i, (image, (_, ratio, pad)) in enumerate(zip(images, prepared))
+        ]
@@ -15,11 +15,23 @@ import sys
 try:
     from .yolo_detector import YOLODetector
     from .sam_segmenter import SAMSegmenter
+    from .backends import create_detector, create_segmenter
+    from .adaptive_resolution import AdaptiveResolution
+    from .video_io import open_video_reader, open_video_writer
+    from .frame_ring import SharedFrameCapture
+    from .display import open_display
+    from .undistort import Undistorter
 except ImportError:
     # Running as standalone script
     sys.path.insert(0, str(Path(__file__).parent.parent.parent))
     from python.detection.yolo_detector import YOLODetector
     from python.detection.sam_segmenter import SAMSegmenter
+    from python.detection.backends import create_detector, create_segmenter
+    from python.detection.adaptive_resolution import AdaptiveResolution
+    from python.detection.video_io import open_video_reader, open_video_writer
+    from python.detection.frame_ring import SharedFrameCapture
+    from python.detection.display import open_display
+    from python.detection.undistort import Undistorter
 
 
 class DetectionSegmentationPipeline:
@@ -28,12 +40,19 @@ class DetectionSegmentationPipeline:
     Combines YOLO for fast detection and SAM for precise segmentation.
     """
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(
+        self,
+        config_path: str = "config.yaml",
+        detector: Optional[YOLODetector] = None,
+        segmenter: Optional[SAMSegmenter] = None
+    ):
         """
         Initialize the pipeline.
         
         Args:
             config_path: Path to configuration file
+            detector: Already initialized detector (skips loading YOLO)
+            segmenter: Already initialized segmenter (skips loading SAM)
         """
         # Load configuration
         with open(config_path, 'r') as f:
@@ -43,23 +62,26 @@ class DetectionSegmentationPipeline:
         print("INITIALIZING DETECTION & SEGMENTATION PIPELINE")
         print("=" * 60)
         
-        # Initialize YOLO detector
-        yolo_config = self.config['models']['yolo']
-        self.detector = YOLODetector(
-            model_path=yolo_config['model_name'],
-            confidence=yolo_config['confidence'],
-            iou_threshold=yolo_config['iou_threshold'],
-            device=yolo_config['device']
+        # Initialize detector (YOLO or configured backend)
+        self.detector = detector or create_detector(self.config)
+        
+        # Initialize segmenter (SAM or configured backend)
+        self.segmenter = segmenter or create_segmenter(self.config)
+        
+        # Inference size controller for video (None unless enabled in config)
+        self.adaptive_resolution = AdaptiveResolution.from_config(
+            self.detector, self.config['models']['yolo']
         )
+        if self.adaptive_resolution:
+            print(f"✓ Adaptive resolution: target {1000 / self.adaptive_resolution.budget_ms:.0f} FPS, "
+                  f"sizes {self.adaptive_resolution.sizes}")
         
-        # Initialize SAM segmenter
-        sam_config = self.config['models']['sam']
-        checkpoint_path = Path(self.config['io']['models_dir']) / sam_config['checkpoint']
-        self.segmenter = SAMSegmenter(
-            model_type=sam_config['model_type'],
-            checkpoint_path=str(checkpoint_path),
-            device=sam_config['device']
+        # Lens distortion correction for video frames (None unless enabled in config)
+        self.undistorter = Undistorter.from_config(
+            self.config.get('video', {}), base_dir=Path(config_path).resolve().parent
         )
+        if self.undistorter:
+            print(f"✓ Undistortion: remap tables cached in {self.undistorter.cache_dir}")
         
         print("=" * 60)
         print("PIPELINE READY")
@@ -70,7 +92,8 @@ class DetectionSegmentationPipeline:
         image_path: str,
         output_path: Optional[str] = None,
         save_masks: bool = True,
-        save_json: bool = True
+        save_json: bool = True,
+        tiling: Optional[str] = None
     ) -> Dict:
         """
         Process a single image through the complete pipeline.
@@ -80,6 +103,7 @@ class DetectionSegmentationPipeline:
             output_path: Path to save annotated image
             save_masks: Whether to save individual masks
             save_json: Whether to save detection data as JSON
+            tiling: Tiled detection mode ('auto', 'always', 'never'; None uses config)
             
         Returns:
             Dictionary with results and metrics
@@ -97,16 +121,19 @@ class DetectionSegmentationPipeline:
         
         # Step 1: Detect objects
         print("Step 1/3: Detecting objects with YOLO...")
-        detections, det_time = self.detector.detect(image)
-        print(f"  ✓ Found {len(detections)} objects in {det_time*1000:.2f} ms")
+        detections, det_time, num_tiles = self.detector.detect_image(image, tiling=tiling)
+        tiles_info = f" ({num_tiles} tiles)" if num_tiles else ""
+        print(f"  ✓ Found {len(detections)} objects in {det_time*1000:.2f} ms{tiles_info}")
         
         # Step 2: Segment objects
         if len(detections) > 0:
             print("Step 2/3: Segmenting objects with SAM...")
-            detections, seg_time = self.segmenter.segment_detections(image, detections)
-            print(f"  ✓ Segmented in {seg_time*1000:.2f} ms/object")
+            detections, seg_time, num_masks = self.segmenter.segment_detections(image, detections)
+            skipped_info = f" ({len(detections) - num_masks} over budget kept as boxes)" if num_masks < len(detections) else ""
+            print(f"  ✓ Segmented {num_masks} objects in {seg_time*1000:.2f} ms/object{skipped_info}")
         else:
             seg_time = 0
+            num_masks = 0
             print("Step 2/3: No objects to segment")
         
         # Step 3: Visualize results
@@ -138,8 +165,10 @@ class DetectionSegmentationPipeline:
             'image_path': image_path,
             'image_size': (w, h),
             'num_detections': len(detections),
+            'num_tiles': num_tiles,
+            'num_masks': num_masks,
             'detection_time': det_time,
-            'segmentation_time': seg_time * len(detections) if detections else 0,
+            'segmentation_time': seg_time * num_masks,
             'total_time': total_time,
             'fps': 1 / total_time,
             'detections': detections
@@ -150,7 +179,7 @@ class DetectionSegmentationPipeline:
         print(f"{'='*60}")
         print(f"Total objects: {len(detections)}")
         print(f"Detection time: {det_time*1000:.2f} ms")
-        print(f"Segmentation time: {seg_time*len(detections)*1000:.2f} ms" if detections else "Segmentation time: 0 ms")
+        print(f"Segmentation time: {seg_time*num_masks*1000:.2f} ms")
         print(f"Total time: {total_time*1000:.2f} ms")
         print(f"FPS: {results['fps']:.2f}")
         print(f"{'='*60}")
@@ -163,7 +192,10 @@ class DetectionSegmentationPipeline:
         output_path: Optional[str] = None,
         display: bool = False,
         process_every_n_frames: int = 1,
-        max_frames: Optional[int] = None
+        max_frames: Optional[int] = None,
+        capture_process: Optional[bool] = None,
+        headless: Optional[bool] = None,
+        preview_port: Optional[int] = None
     ) -> Dict:
         """
         Process video through the pipeline.
@@ -174,6 +206,11 @@ class DetectionSegmentationPipeline:
             display: Whether to display video during processing
             process_every_n_frames: Process every nth frame
             max_frames: Maximum frames to process
+            capture_process: Decode in a separate process and pass frames through
+                shared memory (None uses video.capture_process)
+            headless: Never open a window; display then only feeds snapshots/preview
+                (None uses video.headless.enabled)
+            preview_port: Serve an MJPEG preview on this port in headless mode
             
         Returns:
             Dictionary with statistics
@@ -182,7 +219,14 @@ class DetectionSegmentationPipeline:
         print(f"PROCESSING VIDEO")
         print(f"{'='*60}")
         
-        cap = cv2.VideoCapture(video_path)
+        video_config = self.config.get('video', {})
+        if capture_process is None:
+            capture_process = video_config.get('capture_process', False)
+        if capture_process:
+            # Every frame of a file matters: the capture process waits instead of dropping
+            cap = SharedFrameCapture(video_path, video_config, drop_oldest=False)
+        else:
+            cap = open_video_reader(video_path, video_config)
         
         # Video properties
         fps = int(cap.get(cv2.CAP_PROP_FPS))
@@ -204,8 +248,10 @@ class DetectionSegmentationPipeline:
         if output_path:
             output_path = Path(output_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            writer = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+            writer = open_video_writer(str(output_path), fps, (width, height), video_config)
+        
+        # Window, or headless controls (stdin/signals, snapshots, preview)
+        view = open_display('Detection & Segmentation', video_config, display, headless, preview_port)
         
         frame_count = 0
         processed_count = 0
@@ -220,24 +266,34 @@ class DetectionSegmentationPipeline:
                 if not ret or (max_frames and frame_count >= max_frames):
                     break
                 
+                frame = self.prepare_frame(frame)
+                
                 # Process frame
                 if frame_count % process_every_n_frames == 0:
+                    frame_start = time.time()
+                    
                     # Detect
                     detections, det_time = self.detector.detect(frame)
                     total_det_time += det_time
                     total_detections += len(detections)
                     
                     # Segment
+                    seg_time, num_masks = 0, 0
                     if len(detections) > 0:
-                        detections, seg_time = self.segmenter.segment_detections(frame, detections)
-                        total_seg_time += seg_time * len(detections)
+                        detections, seg_time, num_masks = self.segmenter.segment_detections(frame, detections)
+                        total_seg_time += seg_time * num_masks
                     
-                    # Visualize
-                    annotated = self._create_visualization(frame, detections)
+                    # Visualize (skipped when neither the writer nor the display uses it)
+                    annotated = None
+                    if writer or view.wants_frame():
+                        annotated = self._create_visualization(frame, detections)
+                        
+                        # Add info overlay
+                        current_fps = 1 / (det_time + seg_time * num_masks)
+                        self._add_info_overlay(annotated, len(detections), current_fps, frame_count)
                     
-                    # Add info overlay
-                    current_fps = 1 / (det_time + seg_time * len(detections)) if detections else 1 / det_time
-                    self._add_info_overlay(annotated, len(detections), current_fps, frame_count)
+                    if self.adaptive_resolution:
+                        self.adaptive_resolution.update(time.time() - frame_start)
                     
                     processed_count += 1
                 else:
@@ -248,10 +304,10 @@ class DetectionSegmentationPipeline:
                     writer.write(annotated)
                 
                 # Display
-                if display:
-                    cv2.imshow('Detection & Segmentation', annotated)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                if annotated is not None:
+                    view.show(annotated)
+                if view.poll() == 'quit':
+                    break
                 
                 frame_count += 1
                 if frame_count % 30 == 0:
@@ -263,8 +319,7 @@ class DetectionSegmentationPipeline:
             cap.release()
             if writer:
                 writer.release()
-            if display:
-                cv2.destroyAllWindows()
+            view.close()
         
         total_time = time.time() - start_time
         
@@ -279,6 +334,7 @@ class DetectionSegmentationPipeline:
             'total_segmentation_time': total_seg_time,
             'total_processing_time': total_time,
             'avg_fps': processed_count / total_time if total_time > 0 else 0,
+            'imgsz': self.detector.imgsz,
             'output_path': str(output_path) if output_path else None
         }
         
@@ -296,6 +352,24 @@ class DetectionSegmentationPipeline:
         
         return stats
     
+    def prepare_frame(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Video preprocessing: undistort.
+        
+        Frames keep their captured size; the detector letterboxes them to
+        its imgsz and maps the boxes back, so results and the output video
+        stay in source coordinates.
+        
+        Args:
+            frame: Captured frame
+        
+        Returns:
+            Frame ready for detection
+        """
+        if self.undistorter:
+            frame = self.undistorter(frame)
+        return frame
+    
     def _create_visualization(
         self,
         image: np.ndarray,
@@ -305,8 +379,8 @@ class DetectionSegmentationPipeline:
         # Start with detection boxes
         result = self.detector.draw_detections(image, detections)
         
-        # Add segmentation masks if available
-        if detections and 'mask' in detections[0]:
+        # Add segmentation masks if available (detections over the budget have none)
+        if any('mask' in det for det in detections):
             result = self.segmenter.visualize_detections_with_masks(
                 result, detections, alpha=0.3
             )
@@ -352,7 +426,7 @@ class DetectionSegmentationPipeline:
         json_data = {
             'num_detections': len(detections),
             'detection_time_ms': det_time * 1000,
-            'segmentation_time_ms': seg_time * 1000 * len(detections) if detections else 0,
+            'segmentation_time_ms': seg_time * 1000 * sum('mask' in det for det in detections),
             'detections': []
         }
         
@@ -376,18 +450,30 @@ class DetectionSegmentationPipeline:
 
 def main():
     """Demo usage of the pipeline."""
+    import argparse
+    from python.utils.profiling import PROFILE_MODES, profile_run
+    
+    parser = argparse.ArgumentParser(description="Detection & segmentation pipeline demo")
+    parser.add_argument('--image', default="data/input/test.jpg", help='Input image')
+    parser.add_argument('--output', default="results/images/pipeline_output.jpg", help='Output image')
+    parser.add_argument('--config', default="config.yaml", help='Path to configuration file')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profile the run and save it to results/profiles')
+    args = parser.parse_args()
+    
     # Initialize pipeline
-    pipeline = DetectionSegmentationPipeline(config_path="config.yaml")
+    pipeline = DetectionSegmentationPipeline(config_path=args.config)
     
     # Process test image
-    test_image = "data/input/test.jpg"
+    test_image = args.image
     if Path(test_image).exists():
-        results = pipeline.process_image(
-            test_image,
-            output_path="results/images/pipeline_output.jpg",
-            save_masks=True,
-            save_json=True
-        )
+        with profile_run(args.profile, 'pipeline'):
+            results = pipeline.process_image(
+                test_image,
+                output_path=args.output,
+                save_masks=True,
+                save_json=True
+            )
         
         print("\nDetected objects:")
         for i, det in enumerate(results['detections'], 1):
@@ -0,0 +1,247 @@
+"""
+Real-time Helpers
+Latest-frame grabbing and per-frame work scheduling so live sources stay in
+sync with the camera when detection + segmentation is slower than it.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class LatestFrameGrabber:
+    """
+    Read a capture in a background thread and keep only the newest frame.
+    
+    cv2.VideoCapture buffers frames, so a slow consumer sees older and older
+    images; here frames that arrive while the consumer is busy are dropped.
+    """
+    
+    def __init__(self, cap: cv2.VideoCapture):
+        """
+        Initialize grabber.
+        
+        Args:
+            cap: Opened capture (webcam, RTSP, ...)
+        """
+        self.cap = cap
+        self.frames_grabbed = 0
+        self.frames_read = 0
+        self._frame = None
+        self._frame_id = 0
+        self._timestamp = 0.0
+        self._last_read_id = 0
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def start(self) -> 'LatestFrameGrabber':
+        """Start grabbing in a daemon thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            with self._cond:
+                if not ret:
+                    self._running = False
+                else:
+                    self._frame = frame
+                    self._frame_id += 1
+                    self._timestamp = time.time()
+                    self.frames_grabbed += 1
+                self._cond.notify_all()
+    
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray], float]:
+        """
+        Wait for a frame newer than the last one returned.
+        
+        Args:
+            timeout: Seconds to wait before giving up
+        
+        Returns:
+            ret: False when the source ended or timed out
+            frame: Newest frame
+            timestamp: Capture time (time.time()) of the frame
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._frame_id > self._last_read_id or not self._running,
+                timeout=timeout
+            )
+            if self._frame_id <= self._last_read_id:
+                return False, None, 0.0
+            self._last_read_id = self._frame_id
+            self.frames_read += 1
+            return True, self._frame, self._timestamp
+    
+    @property
+    def frames_dropped(self) -> int:
+        return self.frames_grabbed - self.frames_read
+    
+    def stop(self):
+        """Stop the grabbing thread (the capture is not released)."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+class FrameScheduler:
+    """
+    Decide per frame which stages fit in the latency budget.
+    
+    Actions:
+        full     detect + segment the new frame
+        detect   detect only; masks from the previous pass are carried over
+                 to matching boxes
+        segment  segment the new frame with the cached boxes
+        redraw   draw the cached results on the new frame
+    
+    Each frame earns 1000 / target_fps ms of credit and every action spends
+    its measured cost, so the average work per frame stays within the
+    budget. Masks older than mask_refresh seconds take priority over new
+    detections so segmentation is never starved by a cheap detector.
+    """
+    
+    ACTIONS = ('full', 'detect', 'segment', 'redraw')
+    
+    def __init__(
+        self,
+        target_fps: float = 15.0,
+        mask_refresh: float = 0.5,
+        smoothing: float = 0.3
+    ):
+        """
+        Initialize scheduler.
+        
+        Args:
+            target_fps: Displayed frames per second to sustain
+            mask_refresh: Maximum mask age in seconds before segmentation takes priority
+            smoothing: Weight of the newest sample in the cost estimates (EMA)
+        """
+        self.budget_ms = 1000.0 / target_fps
+        self.mask_refresh = mask_refresh
+        self.smoothing = smoothing
+        self.cost_ms = {'detect': None, 'segment': None, 'draw': 0.0}
+        self.credit_ms = 0.0
+        self.last_segment = 0.0
+        self.counts = {action: 0 for action in self.ACTIONS}
+    
+    def _estimate(self, stage: str) -> float:
+        return self.cost_ms[stage] or 0.0
+    
+    def next_action(self, num_cached: int) -> str:
+        """
+        Choose the action for the next frame.
+        
+        Args:
+            num_cached: Number of cached detections (segmentation is free without them)
+        
+        Returns:
+            One of ACTIONS
+        """
+        # Measure both stages on the first frames
+        if self.cost_ms['detect'] is None:
+            return 'full'
+        
+        det_ms = self._estimate('detect')
+        seg_ms = self._estimate('segment') if num_cached else 0.0
+        
+        # Unused credit is capped so a quiet period cannot fund a burst of full passes
+        self.credit_ms = min(self.credit_ms + self.budget_ms, det_ms + seg_ms + self.budget_ms)
+        
+        if self.credit_ms >= det_ms + seg_ms:
+            return 'full'
+        if num_cached and time.time() - self.last_segment >= self.mask_refresh:
+            return 'segment' if self.credit_ms >= seg_ms else 'redraw'
+        if self.credit_ms >= det_ms:
+            return 'detect'
+        return 'redraw'
+    
+    def record(
+        self,
+        action: str,
+        det_time: Optional[float] = None,
+        seg_time: Optional[float] = None,
+        draw_time: float = 0.0
+    ):
+        """
+        Record the time spent on a frame (seconds) and update cost estimates.
+        
+        Args:
+            action: Action executed
+            det_time: Detection time (None if detection did not run)
+            seg_time: Total segmentation time (None if segmentation did not run)
+            draw_time: Visualization time
+        """
+        for stage, spent in (('detect', det_time), ('segment', seg_time), ('draw', draw_time)):
+            if spent is None:
+                continue
+            spent_ms = spent * 1000
+            previous = self.cost_ms[stage]
+            self.cost_ms[stage] = spent_ms if previous is None else (
+                self.smoothing * spent_ms + (1 - self.smoothing) * previous
+            )
+            self.credit_ms -= spent_ms
+        
+        if action in ('full', 'segment'):
+            self.last_segment = time.time()
+        self.counts[action] += 1
+    
+    def stats(self) -> Dict:
+        """Action counts and current cost estimates."""
+        return {
+            'budget_ms': self.budget_ms,
+            'actions': dict(self.counts),
+            'cost_ms': dict(self.cost_ms)
+        }
+
+
+def carry_masks(
+    detections: List[Dict],
+    previous: List[Dict],
+    iou_threshold: float = 0.5
+) -> List[Dict]:
+    """
+    Copy masks from previous detections to new boxes of the same class.
+    
+    Args:
+        detections: New detections (without masks)
+        previous: Cached detections with masks
+        iou_threshold: Minimum box IoU to reuse a mask
+    
+    Returns:
+        Detections, with 'mask' and 'seg_score' where a match was found
+    """
+    candidates = [p for p in previous if 'mask' in p]
+    if not candidates or not detections:
+        return detections
+    
+    old_boxes = np.array([p['bbox'] for p in candidates], dtype=np.float32)
+    old_areas = (old_boxes[:, 2] - old_boxes[:, 0]) * (old_boxes[:, 3] - old_boxes[:, 1])
+    used = set()
+    
+    for det in detections:
+        x1, y1, x2, y2 = det['bbox']
+        inter_w = np.clip(np.minimum(x2, old_boxes[:, 2]) - np.maximum(x1, old_boxes[:, 0]), 0, None)
+        inter_h = np.clip(np.minimum(y2, old_boxes[:, 3]) - np.maximum(y1, old_boxes[:, 1]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / np.maximum((x2 - x1) * (y2 - y1) + old_areas - inter, 1e-6)
+        
+        for j in np.argsort(-iou):
+            if iou[j] < iou_threshold:
+                break
+            if j in used or candidates[j]['class_id'] != det['class_id']:
+                continue
+            det['mask'] = candidates[j]['mask']
+            det['seg_score'] = candidates[j].get('seg_score', 0.0)
+            used.add(j)
+            break
+    
+    return detections
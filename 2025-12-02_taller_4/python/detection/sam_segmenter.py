@@ -4,52 +4,171 @@ Handles semantic segmentation using Meta's SAM model.
 """
 import cv2
 import numpy as np
-import torch
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from segment_anything import sam_model_registry, SamPredictor
+from typing import Callable, List, Dict, Optional, Tuple
 import time
 
 
+def _load_segment_anything(model_type: str, checkpoint_path: str):
+    from segment_anything import sam_model_registry, SamPredictor
+    return sam_model_registry[model_type](checkpoint=checkpoint_path), SamPredictor
+
+
+def _load_mobile_sam(model_type: str, checkpoint_path: str):
+    # TinyViT encoder (~5M params) distilled from vit_h; prompt encoder and
+    # mask decoder are SAM's, so predictor and ONNX decoder export are unchanged
+    from mobile_sam import sam_model_registry, SamPredictor
+    return sam_model_registry[model_type](checkpoint=checkpoint_path), SamPredictor
+
+
+# model_type -> loader returning (sam_model, predictor_class) and default checkpoint.
+# Any encoder packaged as a SAM model with a SamPredictor-compatible predictor
+# can be added with register_sam_model.
+SAM_MODEL_REGISTRY: Dict[str, Dict] = {
+    'vit_h': {'loader': _load_segment_anything, 'checkpoint': 'sam_vit_h_4b8939.pth'},
+    'vit_l': {'loader': _load_segment_anything, 'checkpoint': 'sam_vit_l_0b3195.pth'},
+    'vit_b': {'loader': _load_segment_anything, 'checkpoint': 'sam_vit_b_01ec64.pth'},
+    'vit_t': {'loader': _load_mobile_sam, 'checkpoint': 'mobile_sam.pt'},  # MobileSAM
+}
+
+
+def register_sam_model(model_type: str, loader: Callable, checkpoint: str):
+    """
+    Register a SAM-compatible image encoder.
+    
+    Args:
+        model_type: Name used in config.yaml models.sam.model_type
+        loader: Function (model_type, checkpoint_path) -> (sam_model, predictor_class)
+        checkpoint: Default checkpoint file name in the models directory
+    """
+    SAM_MODEL_REGISTRY[model_type] = {'loader': loader, 'checkpoint': checkpoint}
+
+
+MASK_PRIORITIES = ('confidence', 'area')
+
+
 class SAMSegmenter:
     """
     Segment Anything Model for precise segmentation.
     """
     
+    # Per-frame segmentation budget (see configure_budget)
+    max_masks = None
+    mask_priority = 'confidence'
+    
     def __init__(
         self,
         model_type: str = "vit_b",
         checkpoint_path: str = "data/models/sam_vit_b_01ec64.pth",
-        device: str = "cuda"
+        device: str = "cuda",
+        precision: str = "fp32",
+        decoder_path: Optional[str] = None
     ):
         """
         Initialize SAM segmenter.
         
         Args:
-            model_type: Type of SAM model ('vit_h', 'vit_l', or 'vit_b')
+            model_type: Type of SAM model ('vit_h', 'vit_l', 'vit_b' or 'vit_t' for MobileSAM)
             checkpoint_path: Path to SAM checkpoint
             device: Device to run inference on ('cuda' or 'cpu')
+            precision: 'fp32' or 'int8' (dynamic INT8 image encoder, CPU only)
+            decoder_path: Optional ONNX mask decoder (e.g. the INT8 one from
+                scripts/quantize_models.py) run with ONNX Runtime
         """
         self.model_type = model_type
         self.checkpoint_path = checkpoint_path
         self.device = device
+        self.precision = precision
         
         print(f"Loading SAM model: {model_type}")
         
+        if model_type not in SAM_MODEL_REGISTRY:
+            raise ValueError(
+                f"Unknown SAM model type '{model_type}'. Available: {', '.join(SAM_MODEL_REGISTRY)}"
+            )
+        
         if not Path(checkpoint_path).exists():
             raise FileNotFoundError(
                 f"SAM checkpoint not found: {checkpoint_path}\n"
                 "Please run download_models.py first."
             )
         
+        # Loaders import their package lazily so fake backends work without them
+        loader = SAM_MODEL_REGISTRY[model_type]['loader']
+        
         # Load SAM model
-        self.sam = sam_model_registry[model_type](checkpoint=checkpoint_path)
+        self.sam, predictor_class = loader(model_type, checkpoint_path)
+        if precision == 'int8':
+            self._quantize_encoder()
         self.sam.to(device=device)
         
         # Create predictor
-        self.predictor = SamPredictor(self.sam)
+        self.predictor = predictor_class(self.sam)
+        
+        # Optional ONNX Runtime mask decoder
+        self.decoder_session = None
+        self._embedding = None
+        if decoder_path:
+            self._load_onnx_decoder(decoder_path)
+        
+        print(f"✓ SAM model loaded on {device} ({self.precision})")
+    
+    def _quantize_encoder(self):
+        """Quantize the ViT image encoder Linear layers to INT8 (dynamic, CPU only)."""
+        if self.device != 'cpu':
+            print(f"⚠ INT8 SAM encoder runs on CPU only, keeping FP32 on {self.device}")
+            self.precision = 'fp32'
+            return
+        
+        import torch
+        self.sam.image_encoder = torch.ao.quantization.quantize_dynamic(
+            self.sam.image_encoder, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    
+    def _load_onnx_decoder(self, decoder_path: str):
+        """Load an exported SAM prompt encoder + mask decoder with ONNX Runtime."""
+        import onnxruntime as ort
+        
+        if not Path(decoder_path).exists():
+            raise FileNotFoundError(
+                f"SAM ONNX decoder not found: {decoder_path}\n"
+                "Please run scripts/quantize_models.py sam-decoder first."
+            )
+        self.decoder_session = ort.InferenceSession(str(decoder_path), providers=['CPUExecutionProvider'])
+        print(f"✓ SAM mask decoder: {decoder_path} (ONNX Runtime)")
+    
+    def _predict_onnx(
+        self,
+        point_coords: np.ndarray,
+        point_labels: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run the ONNX mask decoder on the current image embedding.
+        
+        Args:
+            point_coords: Prompt points (N, 2) in original image coordinates
+            point_labels: Labels (N,) (1=fg, 0=bg, 2/3=box corners, -1=padding)
         
-        print(f"✓ SAM model loaded on {device}")
+        Returns:
+            masks: Binary masks (1, H, W)
+            scores: Predicted IoU scores (1,)
+        """
+        if self._embedding is None:
+            self._embedding = self.predictor.get_image_embedding().cpu().numpy()
+        
+        original_size = self.predictor.original_size
+        coords = self.predictor.transform.apply_coords(point_coords, original_size)
+        
+        masks, scores, _ = self.decoder_session.run(None, {
+            'image_embeddings': self._embedding,
+            'point_coords': coords[None].astype(np.float32),
+            'point_labels': point_labels[None].astype(np.float32),
+            'mask_input': np.zeros((1, 1, 256, 256), dtype=np.float32),
+            'has_mask_input': np.zeros(1, dtype=np.float32),
+            'orig_im_size': np.array(original_size, dtype=np.float32)
+        })
+        
+        return masks[0] > self.sam.mask_threshold, scores[0]
     
     def set_image(self, image: np.ndarray):
         """
@@ -59,6 +178,7 @@ class SAMSegmenter:
             image: Input image in RGB format
         """
         self.predictor.set_image(image)
+        self._embedding = None
     
     def segment_from_bbox(
         self,
@@ -87,10 +207,15 @@ class SAMSegmenter:
         input_box = np.array([x1, y1, x2, y2])
         
         # Predict mask
-        masks, scores, logits = self.predictor.predict(
-            box=input_box,
-            multimask_output=False
-        )
+        if self.decoder_session is not None:
+            masks, scores = self._predict_onnx(
+                input_box.reshape(2, 2), np.array([2, 3])
+            )
+        else:
+            masks, scores, logits = self.predictor.predict(
+                box=input_box,
+                multimask_output=False
+            )
         
         inference_time = time.time() - start_time
         
@@ -124,11 +249,18 @@ class SAMSegmenter:
             self.set_image(image)
         
         # Predict mask
-        masks, scores, logits = self.predictor.predict(
-            point_coords=points,
-            point_labels=labels,
-            multimask_output=False
-        )
+        if self.decoder_session is not None:
+            # Padding point required by the ONNX decoder when there is no box
+            masks, scores = self._predict_onnx(
+                np.concatenate([points, [[0.0, 0.0]]]),
+                np.concatenate([labels, [-1]])
+            )
+        else:
+            masks, scores, logits = self.predictor.predict(
+                point_coords=points,
+                point_labels=labels,
+                multimask_output=False
+            )
         
         inference_time = time.time() - start_time
         
@@ -137,38 +269,85 @@ class SAMSegmenter:
         
         return mask, score, inference_time
     
+    def configure_budget(
+        self,
+        max_masks: Optional[int] = None,
+        priority: str = 'confidence'
+    ):
+        """
+        Bound the SAM work per frame in segment_detections.
+        
+        Every detection costs one decoder pass, so crowded frames are capped
+        at max_masks; the remaining detections keep their boxes without a mask.
+        
+        Args:
+            max_masks: Maximum detections segmented per frame (None for all)
+            priority: Which detections get masks: 'confidence' or 'area' (largest first)
+        """
+        if priority not in MASK_PRIORITIES:
+            raise ValueError(f"Unknown mask priority '{priority}'. Available: {', '.join(MASK_PRIORITIES)}")
+        self.max_masks = max_masks
+        self.mask_priority = priority
+    
+    def select_for_segmentation(self, detections: List[Dict]) -> List[int]:
+        """
+        Indices of the detections to segment under the configured budget.
+        
+        Args:
+            detections: List of detection dictionaries with 'bbox' and 'confidence'
+        
+        Returns:
+            Selected indices, in detection order
+        """
+        if self.max_masks is None or len(detections) <= self.max_masks:
+            return list(range(len(detections)))
+        
+        if self.mask_priority == 'area':
+            keys = [(d['bbox'][2] - d['bbox'][0]) * (d['bbox'][3] - d['bbox'][1]) for d in detections]
+        else:
+            keys = [d['confidence'] for d in detections]
+        ranked = sorted(range(len(detections)), key=lambda i: keys[i], reverse=True)
+        return sorted(ranked[:self.max_masks])
+    
     def segment_detections(
         self,
         image: np.ndarray,
         detections: List[Dict]
-    ) -> List[Dict]:
+    ) -> Tuple[List[Dict], float, int]:
         """
-        Generate segmentation masks for all detections.
+        Generate segmentation masks for the detections within the budget.
         
         Args:
-            image: Input image (RGB)
+            image: Input image (BGR)
             detections: List of detection dictionaries with 'bbox' key
             
         Returns:
-            List of detections with added 'mask' and 'seg_score' keys
+            detections: Detections with added 'mask' and 'seg_score' keys
+                (detections over max_masks keep only their box)
+            avg_time: Average time per segmented detection
+            num_masks: Number of detections segmented
         """
+        selected = self.select_for_segmentation(detections)
+        if not selected:
+            return detections, 0, 0
+        
         # Preprocess image once
         rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         self.set_image(rgb_image)
         
         total_time = 0
         
-        for detection in detections:
-            bbox = detection['bbox']
-            mask, score, inference_time = self.segment_from_bbox(bbox)
+        for i in selected:
+            detection = detections[i]
+            mask, score, inference_time = self.segment_from_bbox(detection['bbox'])
             
             detection['mask'] = mask
             detection['seg_score'] = score
             total_time += inference_time
         
-        avg_time = total_time / len(detections) if detections else 0
+        avg_time = total_time / len(selected)
         
-        return detections, avg_time
+        return detections, avg_time, len(selected)
     
     def visualize_mask(
         self,
@@ -259,6 +438,7 @@ class SAMSegmenter:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        num_saved = 0
         for i, det in enumerate(detections):
             if 'mask' not in det:
                 continue
@@ -268,8 +448,9 @@ class SAMSegmenter:
             
             filename = f"mask_{i:03d}_{class_name}.png"
             cv2.imwrite(str(output_path / filename), mask)
+            num_saved += 1
         
-        print(f"Saved {len(detections)} masks to {output_dir}")
+        print(f"Saved {num_saved} masks to {output_dir}")
 
 
 def main():
@@ -304,7 +485,7 @@ def main():
         
         # Segment detections
         print("Segmenting objects...")
-        detections_with_masks, seg_time = segmenter.segment_detections(
+        detections_with_masks, seg_time, _ = segmenter.segment_detections(
             image, detections
         )
         print(f"Segmented in {seg_time*1000:.2f} ms/object")
@@ -0,0 +1,128 @@
+"""
+Lens Undistortion
+Correct lens distortion with precomputed remap tables, as a preprocessing
+stage for video and webcam frames.
+
+The implementation (remap tables built once per frame size and cached as
+undistort_maps_<w>x<h>_alpha<a>.npz) lives in the chessboard calibration
+project, which also writes the calibration files. It is loaded from there
+the first time an Undistorter is created, so the rest of the pipeline
+imports without that project when undistortion is disabled.
+"""
+import importlib.util
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+# Calibration project next to this workshop in the repository
+CALIBRATION_PROJECT = Path(__file__).resolve().parents[3] / '2025-09-20-P1-Calibracion_Camaras'
+
+_calibration_undistorter = None
+
+
+def _load_calibration_undistorter():
+    """The calibration project's Undistorter class (loaded once)."""
+    global _calibration_undistorter
+    if _calibration_undistorter is None:
+        path = CALIBRATION_PROJECT / 'undistorter.py'
+        if not path.exists():
+            raise FileNotFoundError(
+                f"video.undistort needs the calibration project's undistorter.py, not found at {path}"
+            )
+        spec = importlib.util.spec_from_file_location('_calibration_undistorter', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _calibration_undistorter = module.Undistorter
+    return _calibration_undistorter
+
+
+def _resolve(path: Union[str, Path], base_dir: Optional[Path]) -> Path:
+    path = Path(path)
+    return base_dir / path if base_dir is not None and not path.is_absolute() else path
+
+
+class Undistorter:
+    """
+    Undistort frames of any size from one camera calibration.
+    
+    Frame sizes with a different aspect ratio than the calibration images
+    raise ValueError (the scaled intrinsics would be wrong).
+    """
+    
+    def __init__(
+        self,
+        camera_matrix: np.ndarray,
+        dist_coeffs: np.ndarray,
+        calibration_size: Optional[Tuple[int, int]] = None,
+        alpha: float = 0.0,
+        cache_dir: Optional[str] = None
+    ):
+        """
+        Initialize undistorter.
+        
+        Args:
+            camera_matrix: 3x3 intrinsic matrix
+            dist_coeffs: Distortion coefficients (k1, k2, p1, p2[, k3, ...])
+            calibration_size: (width, height) of the calibration images; the
+                intrinsics are scaled for other frame sizes (None uses them as is)
+            alpha: 0 keeps only valid pixels (no black borders), 1 keeps the whole field of view
+            cache_dir: Directory where remap tables are cached (None keeps them in memory only)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._impl = _load_calibration_undistorter()(
+            camera_matrix, dist_coeffs, calibration_size, alpha, str(self.cache_dir) if self.cache_dir else None
+        )
+    
+    @classmethod
+    def from_directory(cls, calibration_dir: str, alpha: float = 0.0, cache_dir: Optional[str] = None) -> 'Undistorter':
+        """
+        Load camera_matrix.npy, distortion_coeffs.npy and (optionally) image_size.npy.
+        
+        Args:
+            calibration_dir: Directory with the calibration results
+            alpha: See __init__
+            cache_dir: Remap table cache (None uses calibration_dir)
+        """
+        calibration_dir = Path(calibration_dir)
+        size_path = calibration_dir / 'image_size.npy'
+        return cls(
+            np.load(calibration_dir / 'camera_matrix.npy'),
+            np.load(calibration_dir / 'distortion_coeffs.npy'),
+            np.load(size_path) if size_path.exists() else None,
+            alpha,
+            cache_dir or calibration_dir
+        )
+    
+    @classmethod
+    def from_config(cls, video_config: Dict, base_dir: Optional[Union[str, Path]] = None) -> Optional['Undistorter']:
+        """
+        Create from video.undistort (None if disabled).
+        
+        Args:
+            video_config: config.yaml 'video' section
+            base_dir: Directory relative calibration_dir / cache_dir paths are
+                resolved against (the config file's; None uses the working directory)
+        """
+        settings = (video_config or {}).get('undistort') or {}
+        if not settings.get('enabled', False):
+            return None
+        base_dir = Path(base_dir) if base_dir is not None else None
+        cache_dir = settings.get('cache_dir')
+        return cls.from_directory(
+            _resolve(settings['calibration_dir'], base_dir),
+            alpha=settings.get('alpha', 0.0),
+            cache_dir=_resolve(cache_dir, base_dir) if cache_dir else None
+        )
+    
+    def camera_matrix_for(self, size: Tuple[int, int]) -> np.ndarray:
+        """Intrinsics scaled to a frame size (ValueError if the aspect ratio differs)."""
+        return self._impl.matriz_para(size)
+    
+    def maps(self, size: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Tuple[int, int, int, int]]:
+        """Remap tables for a frame (width, height): map1, map2, new camera matrix, valid ROI."""
+        return self._impl.mapas(size)
+    
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """Undistort a frame (same size as the input)."""
+        return self._impl.corregir(frame)
@@ -0,0 +1,304 @@
+"""
+Video I/O
+Readers and writers selected by config.yaml video.codec: OpenCV
+(cv2.VideoCapture / cv2.VideoWriter with a fourcc) or FFmpeg subprocess
+pipes with multithreaded libx264/libx265 encoding and decoding on CPU.
+
+Readers and writers follow the cv2.VideoCapture / cv2.VideoWriter API
+(read, get, isOpened, write, release), so the processing loops do not
+depend on the backend.
+"""
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+# Codecs encoded through an FFmpeg pipe; anything else is an OpenCV fourcc
+FFMPEG_CODECS = ('libx264', 'libx265', 'libvpx-vp9')
+
+FFMPEG_DEFAULTS = {
+    'binary': 'ffmpeg',
+    'preset': 'veryfast',  # libx264/libx265 speed/size trade-off
+    'crf': 23,  # constant quality (lower = better, larger files)
+    'threads': 0,  # encoder threads (0 = auto)
+    'decode': True,  # also decode video files through FFmpeg
+    'decode_threads': 0  # decoder threads (0 = auto)
+}
+
+
+def _ffmpeg_settings(video_config: Optional[Dict]) -> Dict:
+    settings = dict(FFMPEG_DEFAULTS)
+    settings.update((video_config or {}).get('ffmpeg') or {})
+    return settings
+
+
+def ffmpeg_available(binary: str = 'ffmpeg', probe: bool = False) -> bool:
+    """Check whether the FFmpeg binary (and optionally ffprobe next to it) is installed."""
+    if shutil.which(binary) is None:
+        return False
+    return not probe or shutil.which(_ffprobe_binary(binary)) is not None
+
+
+def _ffprobe_binary(binary: str) -> str:
+    path = Path(binary)
+    return str(path.with_name(path.name.replace('ffmpeg', 'ffprobe')))
+
+
+def probe_video(path: str, binary: str = 'ffmpeg') -> Dict:
+    """
+    Read stream properties with ffprobe.
+    
+    Width and height are those of the decoded frames: FFmpeg auto-rotates
+    streams with a rotation tag or display matrix (phone videos), so 90/270
+    degree rotations swap the coded dimensions.
+    
+    Returns:
+        Dictionary with width, height, fps, frame_count (0 if unknown) and
+        rotation (degrees)
+    """
+    result = subprocess.run(
+        [
+            _ffprobe_binary(binary), '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries',
+            'stream=width,height,avg_frame_rate,nb_frames:stream_tags=rotate:'
+            'stream_side_data=rotation:format=duration',
+            '-of', 'json', str(path)
+        ],
+        capture_output=True, text=True, check=True
+    )
+    info = json.loads(result.stdout)
+    stream = info['streams'][0]
+    num, _, den = stream.get('avg_frame_rate', '0/1').partition('/')
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    
+    frame_count = int(stream.get('nb_frames') or 0)
+    if not frame_count and fps:
+        frame_count = int(float(info.get('format', {}).get('duration') or 0) * fps)
+    
+    # Older files carry a 'rotate' tag, newer FFmpeg reports the display matrix
+    rotation = stream.get('tags', {}).get('rotate')
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            rotation = side_data['rotation']
+    rotation = int(float(rotation or 0)) % 360
+    
+    width, height = int(stream['width']), int(stream['height'])
+    if rotation in (90, 270):
+        width, height = height, width
+    
+    return {
+        'width': width,
+        'height': height,
+        'fps': fps,
+        'frame_count': frame_count,
+        'rotation': rotation
+    }
+
+
+class FFmpegVideoReader:
+    """Decode a video file to BGR frames through an FFmpeg pipe."""
+    
+    def __init__(self, path: str, binary: str = 'ffmpeg', threads: int = 0):
+        """
+        Start decoding.
+        
+        Args:
+            path: Video file
+            binary: FFmpeg executable
+            threads: Decoder threads (0 = auto)
+        """
+        self.path = str(path)
+        self.info = probe_video(self.path, binary)
+        self.width = self.info['width']
+        self.height = self.info['height']
+        self.frame_size = self.width * self.height * 3
+        self.process = subprocess.Popen(
+            [
+                binary, '-v', 'error', '-threads', str(threads), '-i', self.path,
+                '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-'
+            ],
+            stdout=subprocess.PIPE,
+            bufsize=self.frame_size
+        )
+    
+    def isOpened(self) -> bool:
+        return self.process is not None and self.process.poll() in (None, 0)
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next frame (same contract as cv2.VideoCapture.read)."""
+        if self.process is None:
+            return False, None
+        data = self.process.stdout.read(self.frame_size)
+        if len(data) < self.frame_size:
+            return False, None
+        return True, np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3).copy()
+    
+    def get(self, prop: int) -> float:
+        """Subset of cv2.VideoCapture.get used by the pipeline."""
+        return float({
+            cv2.CAP_PROP_FPS: self.info['fps'],
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FRAME_COUNT: self.info['frame_count']
+        }.get(prop, 0.0))
+    
+    def release(self):
+        if self.process is None:
+            return
+        self.process.stdout.close()
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.wait()
+        self.process = None
+
+
+class FFmpegVideoWriter:
+    """Encode BGR frames through an FFmpeg pipe (libx264 by default)."""
+    
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        size: Tuple[int, int],
+        codec: str = 'libx264',
+        binary: str = 'ffmpeg',
+        preset: str = 'veryfast',
+        crf: int = 23,
+        threads: int = 0
+    ):
+        """
+        Start encoding.
+        
+        Args:
+            path: Output file
+            fps: Frame rate
+            size: Frame (width, height); every frame must have this size
+            codec: FFmpeg video encoder
+            binary: FFmpeg executable
+            preset: Encoder preset (ultrafast ... veryslow)
+            crf: Constant rate factor (quality)
+            threads: Encoder threads (0 = auto)
+        """
+        self.path = str(path)
+        self.size = tuple(size)
+        width, height = self.size
+        command = [
+            binary, '-y', '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', '-',
+            '-c:v', codec, '-crf', str(crf), '-threads', str(threads),
+            # yuv420p needs even dimensions
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p'
+        ]
+        if codec in ('libx264', 'libx265'):
+            command += ['-preset', preset]
+        elif codec == 'libvpx-vp9':
+            # Without a zero bitrate target libvpx treats crf as a quality cap
+            # on top of its default bitrate instead of constant quality
+            command += ['-b:v', '0']
+        if Path(self.path).suffix.lower() in ('.mp4', '.mov'):
+            command += ['-movflags', '+faststart']
+        command.append(self.path)
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    
+    def isOpened(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def write(self, frame: np.ndarray):
+        """Encode one frame (same contract as cv2.VideoWriter.write)."""
+        if frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size)
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        except BrokenPipeError:
+            raise RuntimeError(f"FFmpeg exited while writing {self.path}")
+    
+    def release(self):
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        self.process.wait()
+        self.process = None
+
+
+def open_video_reader(source: Union[int, str], video_config: Optional[Dict] = None):
+    """
+    Open a camera or video file with the configured backend.
+    
+    Cameras always use OpenCV; files use FFmpeg when video.codec is an
+    FFmpeg encoder, video.ffmpeg.decode is true and FFmpeg is installed.
+    Files ffprobe cannot read (missing, corrupt, no video stream) fall back
+    to OpenCV, so callers see an unopened reader instead of an exception.
+    
+    Args:
+        source: Camera index or video path
+        video_config: config.yaml 'video' section
+    
+    Returns:
+        Reader with the cv2.VideoCapture API
+    """
+    video_config = video_config or {}
+    settings = _ffmpeg_settings(video_config)
+    use_ffmpeg = (
+        not isinstance(source, int)
+        and video_config.get('codec') in FFMPEG_CODECS
+        and settings['decode']
+        and ffmpeg_available(settings['binary'], probe=True)
+    )
+    if use_ffmpeg:
+        try:
+            return FFmpegVideoReader(source, settings['binary'], settings['decode_threads'])
+        except (subprocess.CalledProcessError, OSError, ValueError, KeyError, IndexError):
+            pass
+    return cv2.VideoCapture(source)
+
+
+def open_video_writer(
+    path: str,
+    fps: float,
+    size: Tuple[int, int],
+    video_config: Optional[Dict] = None
+):
+    """
+    Create a writer for video.codec.
+    
+    FFmpeg encoders fall back to OpenCV 'mp4v' when FFmpeg is not installed.
+    
+    Args:
+        path: Output file
+        fps: Frame rate
+        size: Frame (width, height)
+        video_config: config.yaml 'video' section
+    
+    Returns:
+        Writer with the cv2.VideoWriter API
+    """
+    video_config = video_config or {}
+    codec = video_config.get('codec') or 'mp4v'
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    
+    if codec in FFMPEG_CODECS:
+        settings = _ffmpeg_settings(video_config)
+        if ffmpeg_available(settings['binary']):
+            return FFmpegVideoWriter(
+                path, fps, size,
+                codec=codec,
+                binary=settings['binary'],
+                preset=settings['preset'],
+                crf=settings['crf'],
+                threads=settings['threads']
+            )
+        print(f"⚠ {settings['binary']} not found, falling back to OpenCV mp4v for {path}")
+        codec = 'mp4v'
+    
+    if len(codec) != 4:
+        raise ValueError(
+            f"Unknown video codec '{codec}'. Use an OpenCV fourcc (e.g. mp4v) "
+            f"or one of: {', '.join(FFMPEG_CODECS)}"
+        )
+    return cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*codec), fps, tuple(size))
@@ -5,15 +5,23 @@ Process videos with webcam support using detection and segmentation pipeline.
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Union
 import argparse
+import json
 import sys
 import os
+import time
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from detection.pipeline import DetectionSegmentationPipeline
+from detection.realtime import LatestFrameGrabber, FrameScheduler, carry_masks
+from detection.video_io import open_video_reader, open_video_writer
+from detection.frame_ring import SharedFrameCapture
+from detection.multi_stream import StreamBatcher, mosaic
+from detection.display import WindowDisplay, open_display
+from utils.profiling import PROFILE_MODES, profile_run
 
 
 class VideoProcessor:
@@ -32,7 +40,11 @@ class VideoProcessor:
         self,
         camera_id: int = 0,
         output_path: Optional[str] = None,
-        max_duration: Optional[int] = None
+        max_duration: Optional[int] = None,
+        realtime: Optional[bool] = None,
+        capture_process: Optional[bool] = None,
+        headless: Optional[bool] = None,
+        preview_port: Optional[int] = None
     ):
         """
         Process webcam stream in real-time.
@@ -41,27 +53,69 @@ class VideoProcessor:
             camera_id: Camera device ID
             output_path: Path to save output video
             max_duration: Maximum duration in seconds
+            realtime: Grab frames in a background thread and schedule
+                detection/segmentation per frame to a target FPS
+                (None uses video.realtime.enabled)
+            capture_process: Capture in a separate process and pass frames through
+                a shared-memory ring (None uses video.capture_process)
+            headless: Run without a window, controlled from stdin/signals
+                (None uses video.headless.enabled)
+            preview_port: Serve an MJPEG preview on this port in headless mode
         """
+        video_config = self.pipeline.config.get('video', {})
+        realtime_config = video_config.get('realtime') or {}
+        if realtime is None:
+            realtime = realtime_config.get('enabled', False)
+        if capture_process is None:
+            capture_process = video_config.get('capture_process', False)
+        resolution = video_config.get('resolution')
+        
         print(f"\nOpening webcam (ID: {camera_id})...")
-        cap = cv2.VideoCapture(camera_id)
+        if capture_process:
+            # Live source: the ring overwrites unread frames; real-time mode reads the newest
+            cap = SharedFrameCapture(camera_id, video_config, resolution, drop_oldest=True, latest=realtime)
+        else:
+            cap = open_video_reader(camera_id, video_config)
         
         if not cap.isOpened():
             print(f"Error: Could not open camera {camera_id}")
             return
         
+        # Request the configured capture size (drivers may pick the nearest mode)
+        if resolution and not capture_process:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+        
         # Get camera properties
         fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         print(f"Camera: {width}x{height} @ {fps} FPS")
-        print("Press 'q' to quit, 's' to save screenshot")
+        view = open_display(
+            'Webcam - Detection & Segmentation', video_config, headless=headless, preview_port=preview_port
+        )
+        if isinstance(view, WindowDisplay):
+            print("Press 'q' to quit, 's' to save screenshot")
+        
+        # Real-time mode: newest frame only, stages scheduled to the target FPS
+        grabber = None
+        scheduler = None
+        cached = []
+        if realtime:
+            scheduler = FrameScheduler(
+                target_fps=realtime_config.get('target_fps', 15),
+                mask_refresh=realtime_config.get('mask_refresh', 0.5)
+            )
+            # The shared-memory ring already keeps the newest frame
+            grabber = None if capture_process else LatestFrameGrabber(cap).start()
+            fps = int(realtime_config.get('target_fps', 15))
+            print(f"Real-time mode: target {fps} FPS, budget {scheduler.budget_ms:.0f} ms/frame")
         
         # Video writer
         writer = None
         if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            writer = open_video_writer(output_path, fps, (width, height), video_config)
             print(f"Recording to: {output_path}")
         
         frame_count = 0
@@ -70,7 +124,11 @@ class VideoProcessor:
         
         try:
             while True:
-                ret, frame = cap.read()
+                if grabber:
+                    ret, frame, captured_at = grabber.read()
+                else:
+                    ret, frame = cap.read()
+                    captured_at = cap.last_timestamp if capture_process else time.time()
                 if not ret:
                     break
                 
@@ -79,17 +137,35 @@ class VideoProcessor:
                     print(f"\nReached max duration: {max_duration}s")
                     break
                 
-                # Process frame
-                detections, det_time = self.pipeline.detector.detect(frame)
+                frame = self.pipeline.prepare_frame(frame)
+                frame_start = time.time()
                 
-                # Segment if detections found
-                if len(detections) > 0:
-                    detections, _ = self.pipeline.segmenter.segment_detections(
-                        frame, detections
-                    )
+                if scheduler:
+                    action = scheduler.next_action(len(cached))
+                    detections, det_time, seg_time = self._run_scheduled(action, frame, cached)
+                    cached = detections
+                else:
+                    action = 'full'
+                    
+                    # Process frame
+                    detections, det_time = self.pipeline.detector.detect(frame)
+                    
+                    # Segment if detections found
+                    if len(detections) > 0:
+                        detections, _, _ = self.pipeline.segmenter.segment_detections(
+                            frame, detections
+                        )
+                
+                # Visualize (headless runs skip it unless the frame is consumed)
+                draw_start = time.time()
+                result = None
+                if writer or view.wants_frame():
+                    result = self.pipeline._create_visualization(frame, detections)
                 
-                # Visualize
-                result = self.pipeline._create_visualization(frame, detections)
+                if scheduler:
+                    scheduler.record(action, det_time, seg_time, time.time() - draw_start)
+                elif self.pipeline.adaptive_resolution:
+                    self.pipeline.adaptive_resolution.update(time.time() - frame_start)
                 
                 # Add info
                 elapsed = time.time() - start_time
@@ -98,29 +174,31 @@ class VideoProcessor:
                 info_text = [
                     f"FPS: {current_fps:.1f}",
                     f"Detections: {len(detections)}",
-                    f"Time: {elapsed:.1f}s"
+                    f"Time: {elapsed:.1f}s",
+                    f"Input: {self.pipeline.detector.imgsz}"
                 ]
+                if scheduler:
+                    # Capture-to-display delay, bounded by one full pass in real-time mode
+                    info_text.append(f"Latency: {(time.time() - captured_at) * 1000:.0f} ms ({action})")
                 
-                y_offset = 30
-                for text in info_text:
-                    cv2.putText(
-                        result, text, (10, y_offset),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                        (0, 255, 0), 2
-                    )
-                    y_offset += 35
+                if result is not None:
+                    self._draw_info(result, info_text)
                 
                 # Save frame
                 if writer:
                     writer.write(result)
                 
                 # Display
-                cv2.imshow('Webcam - Detection & Segmentation', result)
+                if result is not None:
+                    view.show(result)
                 
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
+                command = view.poll()
+                if command == 'quit':
                     break
-                elif key == ord('s'):
+                elif command == 'screenshot':
+                    if result is None:
+                        result = self.pipeline._create_visualization(frame, detections)
+                        self._draw_info(result, info_text)
                     # Save screenshot
                     screenshot_path = f"results/images/webcam_screenshot_{frame_count}.jpg"
                     cv2.imwrite(screenshot_path, result)
@@ -129,21 +207,278 @@ class VideoProcessor:
                 frame_count += 1
         
         finally:
+            if grabber:
+                grabber.stop()
             cap.release()
             if writer:
                 writer.release()
-            cv2.destroyAllWindows()
+            view.close()
             
             elapsed = time.time() - start_time
             print(f"\nProcessed {frame_count} frames in {elapsed:.2f}s")
             print(f"Average FPS: {frame_count/elapsed:.2f}")
+            if scheduler or capture_process:
+                dropped = cap.frames_dropped if capture_process else grabber.frames_dropped
+                print(f"Frames dropped: {dropped}")
+            if scheduler:
+                stats = scheduler.stats()
+                print(f"Actions: {stats['actions']}")
+                print("Estimated cost: " + ", ".join(
+                    f"{stage} {cost:.1f} ms" for stage, cost in stats['cost_ms'].items() if cost is not None
+                ))
+    
+    @staticmethod
+    def _draw_info(image: np.ndarray, info_text: List[str]):
+        """Draw the status lines on a frame."""
+        y_offset = 30
+        for text in info_text:
+            cv2.putText(
+                image, text, (10, y_offset),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                (0, 255, 0), 2
+            )
+            y_offset += 35
+    
+    def _run_scheduled(self, action: str, frame: np.ndarray, cached: list):
+        """
+        Run the stages chosen by FrameScheduler on a frame.
+        
+        Returns:
+            detections: Detections to draw
+            det_time: Detection time (None if skipped)
+            seg_time: Total segmentation time (None if skipped)
+        """
+        det_time, seg_time = None, None
+        
+        if action in ('full', 'detect'):
+            detections, det_time = self.pipeline.detector.detect(frame)
+        else:
+            # Cached boxes; copies so new masks do not overwrite the cache
+            detections = [dict(det) for det in cached]
+        
+        if action in ('full', 'segment') and detections:
+            for det in detections:
+                det.pop('mask', None)
+                det.pop('seg_score', None)
+            seg_start = time.time()
+            detections, _, _ = self.pipeline.segmenter.segment_detections(frame, detections)
+            seg_time = time.time() - seg_start
+        elif action == 'detect':
+            detections = carry_masks(detections, cached)
+        
+        return detections, det_time, seg_time
+    
+    def process_streams(
+        self,
+        sources: List[Union[int, str]],
+        output_dir: Optional[str] = None,
+        display: bool = True,
+        max_duration: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        headless: Optional[bool] = None,
+        preview_port: Optional[int] = None
+    ) -> Dict:
+        """
+        Process several cameras, RTSP streams or video files with shared models.
+        
+        Each source is captured on its own thread; the newest frame of every
+        stream goes through one batched detector pass, then the segmenter.
+        
+        Args:
+            sources: Camera IDs, stream URLs or video paths
+            output_dir: Directory for one annotated video per stream and metrics.json
+            display: Show all streams in a grid
+            max_duration: Maximum duration in seconds
+            max_frames: Frames read per source (None uses video.max_frames)
+            headless: Run without a window (None uses video.headless.enabled)
+            preview_port: Serve an MJPEG preview of the grid in headless mode
+        
+        Returns:
+            Dictionary with overall and per-stream statistics
+        """
+        video_config = self.pipeline.config.get('video', {})
+        multi_config = video_config.get('multi_stream') or {}
+        if max_frames is None:
+            max_frames = video_config.get('max_frames')
+        
+        batcher = StreamBatcher(
+            sources,
+            video_config,
+            queue_size=multi_config.get('queue_size', 2),
+            batch_wait_ms=multi_config.get('batch_wait_ms', 10),
+            max_batch=multi_config.get('max_batch'),
+            max_frames=max_frames
+        )
+        for stream in batcher.streams:
+            kind = 'live' if stream.live else 'file'
+            status = f"{stream.fps:.0f} FPS ({kind})" if stream.isOpened() else "could not be opened"
+            print(f"{stream.name}: {stream.source} - {status}")
+        
+        if not batcher.active:
+            print("Error: No stream could be opened")
+            batcher.stop()
+            return {}
+        
+        if output_dir:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            print(f"Recording to: {output_dir}")
+        view = open_display(
+            'Streams - Detection & Segmentation', video_config, display, headless, preview_port
+        )
+        if isinstance(view, WindowDisplay):
+            print("Press 'q' to quit, 's' to save screenshot")
+        
+        metrics = {
+            stream.stream_id: {
+                'source': str(stream.source),
+                'frames': 0,
+                'detections': 0,
+                'detection_time': 0.0,
+                'segmentation_time': 0.0,
+                'latency': 0.0,
+                'output_path': None
+            }
+            for stream in batcher.streams
+        }
+        writers = {}
+        latest = {}
+        batch_sizes = []
+        start_time = time.time()
+        
+        batcher.start()
+        try:
+            while True:
+                if max_duration and (time.time() - start_time) > max_duration:
+                    print(f"\nReached max duration: {max_duration}s")
+                    break
+                
+                batch = batcher.next_batch()
+                if not batch:
+                    if batcher.active:
+                        continue
+                    break
+                batch_sizes.append(len(batch))
+                
+                # Same preprocessing as prepare_frame
+                if self.pipeline.undistorter:
+                    batch = [(stream, self.pipeline.undistorter(frame), captured_at)
+                             for stream, frame, captured_at in batch]
+                
+                # One detector pass for every stream in the batch
+                det_start = time.time()
+                batch_detections = self.pipeline.detector.detect_batch([frame for _, frame, _ in batch])
+                det_share = (time.time() - det_start) / len(batch)
+                
+                # Drawing is skipped when neither a writer nor the display uses it
+                render = bool(output_dir) or view.wants_frame()
+                
+                for (stream, frame, captured_at), detections in zip(batch, batch_detections):
+                    stream_metrics = metrics[stream.stream_id]
+                    
+                    seg_time = 0.0
+                    if detections:
+                        detections, seg_time, num_masks = self.pipeline.segmenter.segment_detections(frame, detections)
+                        seg_time *= num_masks
+                    
+                    stream_metrics['frames'] += 1
+                    stream_metrics['detections'] += len(detections)
+                    stream_metrics['detection_time'] += det_share
+                    stream_metrics['segmentation_time'] += seg_time
+                    if not render:
+                        stream_metrics['latency'] += time.time() - captured_at
+                        continue
+                    
+                    result = self.pipeline._create_visualization(frame, detections)
+                    cv2.putText(
+                        result, f"{stream.name} | Detections: {len(detections)}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2
+                    )
+                    
+                    if output_dir:
+                        writer = writers.get(stream.stream_id)
+                        if writer is None:
+                            path = output_dir / f"{stream.name}.mp4"
+                            writer = open_video_writer(
+                                str(path), stream.fps, (result.shape[1], result.shape[0]), video_config
+                            )
+                            writers[stream.stream_id] = writer
+                            stream_metrics['output_path'] = str(path)
+                        writer.write(result)
+                    
+                    stream_metrics['latency'] += time.time() - captured_at
+                    latest[stream.stream_id] = result
+                
+                grid = mosaic([latest[i] for i in sorted(latest)]) if render and latest else None
+                if grid is not None:
+                    view.show(grid)
+                
+                command = view.poll()
+                if command == 'quit':
+                    break
+                elif command == 'screenshot' and grid is not None:
+                    screenshot_path = f"results/images/streams_screenshot_{len(batch_sizes)}.jpg"
+                    cv2.imwrite(screenshot_path, grid)
+                    print(f"Screenshot saved: {screenshot_path}")
+        
+        finally:
+            batcher.stop()
+            for writer in writers.values():
+                writer.release()
+            view.close()
+        
+        elapsed = time.time() - start_time
+        streams = []
+        for stream in batcher.streams:
+            stream_metrics = metrics[stream.stream_id]
+            frames = stream_metrics['frames']
+            stream_metrics.update({
+                'stream': stream.name,
+                'frames_captured': stream.frames_captured,
+                'frames_dropped': stream.frames_dropped,
+                'avg_fps': frames / elapsed if elapsed > 0 else 0,
+                'avg_detections_per_frame': stream_metrics['detections'] / frames if frames else 0,
+                'avg_latency_ms': stream_metrics['latency'] / frames * 1000 if frames else 0
+            })
+            del stream_metrics['latency']
+            streams.append(stream_metrics)
+        
+        total_frames = sum(s['frames'] for s in streams)
+        stats = {
+            'num_streams': len(streams),
+            'total_frames': total_frames,
+            'total_processing_time': elapsed,
+            'avg_fps': total_frames / elapsed if elapsed > 0 else 0,
+            'avg_batch_size': float(np.mean(batch_sizes)) if batch_sizes else 0,
+            'streams': streams
+        }
+        
+        print(f"\nProcessed {total_frames} frames from {len(streams)} streams in {elapsed:.2f}s")
+        print(f"Aggregate FPS: {stats['avg_fps']:.2f} | Avg batch size: {stats['avg_batch_size']:.2f}")
+        for s in streams:
+            print(
+                f"  {s['stream']}: {s['frames']} frames, {s['avg_fps']:.2f} FPS, "
+                f"{s['avg_detections_per_frame']:.2f} det/frame, latency {s['avg_latency_ms']:.0f} ms, "
+                f"dropped {s['frames_dropped']}"
+            )
+        
+        if output_dir:
+            metrics_path = output_dir / 'metrics.json'
+            with open(metrics_path, 'w') as f:
+                json.dump(stats, f, indent=2)
+            print(f"Metrics saved: {metrics_path}")
+        
+        return stats
     
     def process_file(
         self,
         video_path: str,
         output_path: Optional[str] = None,
         display: bool = True,
-        process_every_n_frames: int = 1
+        process_every_n_frames: int = 1,
+        capture_process: Optional[bool] = None,
+        headless: Optional[bool] = None,
+        preview_port: Optional[int] = None
     ):
         """
         Process video file.
@@ -153,12 +488,18 @@ class VideoProcessor:
             output_path: Path to save output
             display: Show video during processing
             process_every_n_frames: Process every nth frame
+            capture_process: Decode in a separate process (None uses video.capture_process)
+            headless: Run without a window (None uses video.headless.enabled)
+            preview_port: Serve an MJPEG preview on this port in headless mode
         """
         return self.pipeline.process_video(
             video_path=video_path,
             output_path=output_path,
             display=display,
-            process_every_n_frames=process_every_n_frames
+            process_every_n_frames=process_every_n_frames,
+            capture_process=capture_process,
+            headless=headless,
+            preview_port=preview_port
         )
 
 
@@ -175,6 +516,21 @@ def main():
         help='Video source: "webcam", camera ID (0, 1, ...), or path to video file'
     )
     
+    parser.add_argument(
+        '--sources',
+        type=str,
+        nargs='+',
+        default=None,
+        help='Several sources processed together (camera IDs, RTSP URLs or video files)'
+    )
+    
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help='Output directory for --sources (one video per stream + metrics.json)'
+    )
+    
     parser.add_argument(
         '--output',
         type=str,
@@ -206,35 +562,95 @@ def main():
         '--max-duration',
         type=int,
         default=None,
-        help='Maximum recording duration in seconds (webcam only)'
+        help='Maximum recording duration in seconds (webcam and --sources)'
+    )
+    
+    parser.add_argument(
+        '--realtime',
+        action='store_true',
+        help='Webcam: drop stale frames and schedule detection/segmentation to video.realtime.target_fps'
+    )
+    
+    parser.add_argument(
+        '--capture-process',
+        action='store_true',
+        help='Capture/decode in a separate process, frames shared through shared memory'
+    )
+    
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='Run without a window: stop with q + Enter or Ctrl+C (default: auto, no DISPLAY)'
+    )
+    
+    parser.add_argument(
+        '--preview-port',
+        type=int,
+        default=None,
+        help='Headless: serve an MJPEG preview at http://localhost:PORT/'
+    )
+    
+    parser.add_argument(
+        '--preview-host',
+        default=None,
+        help='Address the preview binds to (default: video.headless.preview_host, 127.0.0.1; '
+             '0.0.0.0 exposes the unauthenticated feed to the network)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        default=None,
+        help='Profile the run (cprofile or sampling) and save it to results/profiles'
     )
     
     args = parser.parse_args()
     
     # Initialize processor
     processor = VideoProcessor(config_path=args.config)
+    if args.preview_host:
+        video_config = processor.pipeline.config.setdefault('video', {})
+        video_config['headless'] = {**(video_config.get('headless') or {}), 'preview_host': args.preview_host}
     
-    # Determine source
-    if args.source == 'webcam' or args.source.isdigit():
-        # Webcam mode
-        camera_id = 0 if args.source == 'webcam' else int(args.source)
-        processor.process_webcam(
-            camera_id=camera_id,
-            output_path=args.output,
-            max_duration=args.max_duration
-        )
-    else:
-        # Video file mode
-        if not Path(args.source).exists():
-            print(f"Error: Video file not found: {args.source}")
-            return
-        
-        processor.process_file(
-            video_path=args.source,
-            output_path=args.output,
-            display=not args.no_display,
-            process_every_n_frames=args.process_every
-        )
+    with profile_run(args.profile, 'video'):
+        # Determine source
+        if args.sources:
+            # Multi-stream mode
+            processor.process_streams(
+                sources=args.sources,
+                output_dir=args.output_dir,
+                display=not args.no_display,
+                max_duration=args.max_duration,
+                headless=args.headless or None,
+                preview_port=args.preview_port
+            )
+        elif args.source == 'webcam' or args.source.isdigit():
+            # Webcam mode
+            camera_id = 0 if args.source == 'webcam' else int(args.source)
+            processor.process_webcam(
+                camera_id=camera_id,
+                output_path=args.output,
+                max_duration=args.max_duration,
+                realtime=args.realtime or None,
+                capture_process=args.capture_process or None,
+                headless=args.headless or None,
+                preview_port=args.preview_port
+            )
+        else:
+            # Video file mode
+            if not Path(args.source).exists():
+                print(f"Error: Video file not found: {args.source}")
+                return
+            
+            processor.process_file(
+                video_path=args.source,
+                output_path=args.output,
+                display=not args.no_display,
+                process_every_n_frames=args.process_every,
+                capture_process=args.capture_process or None,
+                headless=args.headless or None,
+                preview_port=args.preview_port
+            )
 
 
 if __name__ == "__main__":
@@ -6,8 +6,121 @@ import cv2
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from ultralytics import YOLO
 import time
+import sys
+
+# Handle imports for both module and standalone execution
+try:
+    from .video_io import open_video_reader, open_video_writer
+    from .display import open_display
+except ImportError:
+    # Running as standalone script
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from python.detection.video_io import open_video_reader, open_video_writer
+    from python.detection.display import open_display
+
+
+TILING_MODES = ('auto', 'always', 'never')
+
+
+def compute_tiles(
+    image_shape: Tuple[int, int],
+    tile_size: int,
+    overlap: float = 0.2
+) -> List[List[int]]:
+    """
+    Split an image into overlapping square tiles.
+    
+    The last tile of each row/column is aligned to the image border, so every
+    tile has the full size (unless the image itself is smaller).
+    
+    Args:
+        image_shape: (height, width) of the image
+        tile_size: Tile side in pixels
+        overlap: Overlap between neighbouring tiles, fraction of tile_size
+    
+    Returns:
+        List of tiles [x1, y1, x2, y2]
+    """
+    h, w = image_shape
+    stride = max(1, int(tile_size * (1 - overlap)))
+    
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+    
+    return [
+        [x, y, min(x + tile_size, w), min(y + tile_size, h)]
+        for y in starts(h) for x in starts(w)
+    ]
+
+
+def merge_detections(
+    detections: List[Dict],
+    match_threshold: float = 0.5,
+    metric: str = 'ios'
+) -> List[Dict]:
+    """
+    Cross-tile non-maximum merging (greedy, per class).
+    
+    Boxes of an object cut by a tile border only partly overlap the box from
+    the neighbouring tile, so matching uses intersection over the smaller box
+    ('ios') by default; matched boxes are merged into their union and keep
+    the highest confidence.
+    
+    Args:
+        detections: Detections in full-image coordinates
+        match_threshold: Minimum overlap to treat two boxes as one object
+        metric: 'ios' (intersection over smaller) or 'iou'
+    
+    Returns:
+        Merged detections sorted by confidence
+    """
+    if metric not in ('ios', 'iou'):
+        raise ValueError(f"Unknown match metric '{metric}'. Available: ios, iou")
+    
+    detections = sorted(detections, key=lambda d: d['confidence'], reverse=True)
+    if len(detections) < 2:
+        return detections
+    
+    boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+    class_ids = np.array([d['class_id'] for d in detections])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    suppressed = np.zeros(len(detections), dtype=bool)
+    
+    merged = []
+    for i in range(len(detections)):
+        if suppressed[i]:
+            continue
+        
+        # Overlap of box i with all lower-confidence boxes of the same class
+        x1 = np.maximum(boxes[i, 0], boxes[:, 0])
+        y1 = np.maximum(boxes[i, 1], boxes[:, 1])
+        x2 = np.minimum(boxes[i, 2], boxes[:, 2])
+        y2 = np.minimum(boxes[i, 3], boxes[:, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[i], areas), 1e-6)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas - inter, 1e-6)
+        
+        matches = (overlap >= match_threshold) & (class_ids == class_ids[i]) & ~suppressed
+        matches[:i + 1] = False
+        suppressed |= matches
+        
+        detection = dict(detections[i])
+        if matches.any():
+            group = boxes[np.append(np.flatnonzero(matches), i)]
+            detection['bbox'] = [
+                int(group[:, 0].min()), int(group[:, 1].min()),
+                int(group[:, 2].max()), int(group[:, 3].max())
+            ]
+        merged.append(detection)
+    
+    return merged
 
 
 class YOLODetector:
@@ -15,12 +128,24 @@ class YOLODetector:
     YOLO-based object detector for real-time detection.
     """
     
+    # Tiled inference for large stills used by detect_image (see configure_tiling)
+    tiling_mode = 'auto'
+    tile_size = None
+    tile_overlap = 0.2
+    tiling_min_scale = 6.0
+    tiling_include_full = True
+    tiling_batch_size = 8
+    tiling_match_threshold = 0.5
+    
     def __init__(
         self,
         model_path: str = "yolov8n.pt",
         confidence: float = 0.5,
         iou_threshold: float = 0.45,
-        device: str = "cuda"
+        device: str = "cuda",
+        imgsz: int = 640,
+        max_detections: int = 100,
+        classes: Optional[List[int]] = None
     ):
         """
         Initialize YOLO detector.
@@ -30,11 +155,20 @@ class YOLODetector:
             confidence: Confidence threshold for detections
             iou_threshold: IoU threshold for NMS
             device: Device to run inference on ('cuda' or 'cpu')
+            imgsz: Inference size (long side, multiple of 32)
+            max_detections: Maximum detections per image (highest confidence kept)
+            classes: Default class indices to detect (None for all)
         """
         self.model_path = model_path
         self.confidence = confidence
         self.iou_threshold = iou_threshold
         self.device = device
+        self.max_detections = max_detections
+        self.classes = classes
+        self.set_imgsz(imgsz)
+        
+        # Imported here so fake backends work without ultralytics installed
+        from ultralytics import YOLO
         
         print(f"Loading YOLO model: {model_path}")
         self.model = YOLO(model_path)
@@ -55,7 +189,7 @@ class YOLODetector:
         
         Args:
             image: Input image (BGR format)
-            classes: List of class indices to detect (None for all)
+            classes: List of class indices to detect (None for the default classes)
             
         Returns:
             List of detection dictionaries containing:
@@ -66,12 +200,14 @@ class YOLODetector:
         """
         start_time = time.time()
         
-        # Run inference
+        # Run inference (letterboxed to imgsz, boxes returned in original coordinates)
         results = self.model.predict(
             image,
+            imgsz=self.imgsz,
             conf=self.confidence,
             iou=self.iou_threshold,
-            classes=classes,
+            classes=self.classes if classes is None else classes,
+            max_det=self.max_detections,
             verbose=False
         )
         
@@ -99,12 +235,189 @@ class YOLODetector:
         
         return detections, inference_time
     
+    def detect_batch(
+        self,
+        images: List[np.ndarray],
+        classes: Optional[List[int]] = None
+    ) -> List[List[Dict]]:
+        """
+        Detect objects on several images in one forward pass.
+        
+        Args:
+            images: Input images (BGR format)
+            classes: List of class indices to detect (None for the default classes)
+        
+        Returns:
+            One detection list per image (same format as detect)
+        """
+        results = self.model.predict(
+            images,
+            imgsz=self.imgsz,
+            conf=self.confidence,
+            iou=self.iou_threshold,
+            classes=self.classes if classes is None else classes,
+            max_det=self.max_detections,
+            verbose=False
+        )
+        
+        batch_detections = []
+        for result in results:
+            boxes = result.boxes
+            xyxy = boxes.xyxy.cpu().numpy().astype(int)
+            confs = boxes.conf.cpu().numpy()
+            cls_ids = boxes.cls.cpu().numpy().astype(int)
+            batch_detections.append([
+                {
+                    'bbox': [int(v) for v in box],
+                    'confidence': float(conf),
+                    'class_id': int(cls_id),
+                    'class_name': self.class_names[int(cls_id)]
+                }
+                for box, conf, cls_id in zip(xyxy, confs, cls_ids)
+            ])
+        
+        return batch_detections
+    
+    def configure_tiling(
+        self,
+        mode: str = 'auto',
+        tile_size: Optional[int] = None,
+        overlap: float = 0.2,
+        min_scale: float = 6.0,
+        include_full: bool = True,
+        batch_size: int = 8,
+        match_threshold: float = 0.5
+    ):
+        """
+        Configure tiled inference for detect_image.
+        
+        A 4K image letterboxed to 640 px shrinks 6x and small objects drop
+        below a few pixels; detecting on overlapping full-resolution tiles
+        keeps them, at the cost of one forward pass per tile.
+        
+        Args:
+            mode: 'auto' (tile when should_tile says so), 'always' or 'never'
+            tile_size: Tile side in pixels (None uses imgsz)
+            overlap: Overlap between tiles, fraction of tile_size
+            min_scale: In auto mode, tile when the long side is at least
+                min_scale times the inference size (6 = 4K at 640)
+            include_full: Also run the whole image, for objects larger than a tile
+            batch_size: Tiles per forward pass
+            match_threshold: Overlap (intersection over smaller box) at which
+                detections from different tiles are merged
+        """
+        if mode not in TILING_MODES:
+            raise ValueError(f"Unknown tiling mode '{mode}'. Available: {', '.join(TILING_MODES)}")
+        self.tiling_mode = mode
+        self.tile_size = tile_size
+        self.tile_overlap = overlap
+        self.tiling_min_scale = min_scale
+        self.tiling_include_full = include_full
+        self.tiling_batch_size = batch_size
+        self.tiling_match_threshold = match_threshold
+    
+    def should_tile(self, image_shape: Tuple[int, int], mode: Optional[str] = None) -> bool:
+        """
+        Decide whether an image needs tiled inference.
+        
+        Args:
+            image_shape: (height, width) of the image
+            mode: Override of the configured tiling mode
+        
+        Returns:
+            True to tile
+        """
+        mode = mode or self.tiling_mode
+        if mode not in TILING_MODES:
+            raise ValueError(f"Unknown tiling mode '{mode}'. Available: {', '.join(TILING_MODES)}")
+        if mode != 'auto':
+            return mode == 'always'
+        # Downscale factor of the letterboxed image
+        return max(image_shape[:2]) >= self.tiling_min_scale * self.imgsz
+    
+    def detect_tiled(
+        self,
+        image: np.ndarray,
+        classes: Optional[List[int]] = None
+    ) -> Tuple[List[Dict], float, int]:
+        """
+        Detect on overlapping tiles (batched) and merge across tiles.
+        
+        Args:
+            image: Input image (BGR format)
+            classes: List of class indices to detect (None for the default classes)
+        
+        Returns:
+            Same structure as detect_image
+        """
+        start_time = time.time()
+        
+        tiles = compute_tiles(image.shape[:2], self.tile_size or self.imgsz, self.tile_overlap)
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        
+        tile_detections = []
+        for i in range(0, len(crops), self.tiling_batch_size):
+            tile_detections.extend(self.detect_batch(crops[i:i + self.tiling_batch_size], classes))
+        
+        # Back to full-image coordinates
+        detections = []
+        for (x1, y1, _, _), dets in zip(tiles, tile_detections):
+            for det in dets:
+                bx1, by1, bx2, by2 = det['bbox']
+                det['bbox'] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                detections.append(det)
+        
+        if self.tiling_include_full:
+            detections.extend(self.detect(image, classes)[0])
+        
+        detections = merge_detections(detections, self.tiling_match_threshold)[:self.max_detections]
+        
+        inference_time = time.time() - start_time
+        
+        return detections, inference_time, len(tiles)
+    
+    def detect_image(
+        self,
+        image: np.ndarray,
+        classes: Optional[List[int]] = None,
+        tiling: Optional[str] = None
+    ) -> Tuple[List[Dict], float, int]:
+        """
+        Detect on a still image, tiling it when it is much larger than the
+        inference size.
+        
+        Args:
+            image: Input image (BGR format)
+            classes: List of class indices to detect (None for the default classes)
+            tiling: 'auto', 'always' or 'never' (None uses the configured mode)
+        
+        Returns:
+            detections: Same as detect
+            inference_time: Time taken for inference
+            num_tiles: Tiles detected on (0 if the image was not tiled)
+        """
+        if self.should_tile(image.shape[:2], tiling):
+            return self.detect_tiled(image, classes)
+        detections, inference_time = self.detect(image, classes)
+        return detections, inference_time, 0
+    
+    def set_imgsz(self, imgsz: int) -> int:
+        """
+        Set the inference size (rounded to a multiple of 32).
+        
+        Returns:
+            Size actually used
+        """
+        self.imgsz = max(32, int(round(imgsz / 32)) * 32)
+        return self.imgsz
+    
     def detect_video(
         self,
         video_path: str,
         output_path: Optional[str] = None,
         display: bool = True,
-        classes: Optional[List[int]] = None
+        classes: Optional[List[int]] = None,
+        video_config: Optional[Dict] = None
     ) -> Dict:
         """
         Perform detection on video.
@@ -114,11 +427,13 @@ class YOLODetector:
             output_path: Path to save output video (optional)
             display: Whether to display video during processing
             classes: List of class indices to detect
+            video_config: config.yaml 'video' section (codec/FFmpeg and headless
+                settings; None uses OpenCV with mp4v)
             
         Returns:
             Dictionary with statistics
         """
-        cap = cv2.VideoCapture(video_path)
+        cap = open_video_reader(video_path, video_config)
         
         # Get video properties
         fps = int(cap.get(cv2.CAP_PROP_FPS))
@@ -132,8 +447,9 @@ class YOLODetector:
         # Video writer
         writer = None
         if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            writer = open_video_writer(output_path, fps, (width, height), video_config)
+        
+        view = open_display('YOLO Detection', video_config, display)
         
         frame_count = 0
         total_detections = 0
@@ -150,30 +466,31 @@ class YOLODetector:
                 total_time += inference_time
                 total_detections += len(detections)
                 
-                # Annotate frame
-                annotated_frame = self.draw_detections(frame, detections)
-                
-                # Add FPS info
-                current_fps = 1 / inference_time if inference_time > 0 else 0
-                cv2.putText(
-                    annotated_frame,
-                    f"FPS: {current_fps:.1f} | Detections: {len(detections)}",
-                    (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    1,
-                    (0, 255, 0),
-                    2
-                )
-                
-                # Save frame
-                if writer:
-                    writer.write(annotated_frame)
+                # Annotate frame (only when written or shown)
+                if writer or view.wants_frame():
+                    annotated_frame = self.draw_detections(frame, detections)
+                    
+                    # Add FPS info
+                    current_fps = 1 / inference_time if inference_time > 0 else 0
+                    cv2.putText(
+                        annotated_frame,
+                        f"FPS: {current_fps:.1f} | Detections: {len(detections)}",
+                        (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        1,
+                        (0, 255, 0),
+                        2
+                    )
+                    
+                    # Save frame
+                    if writer:
+                        writer.write(annotated_frame)
+                    
+                    view.show(annotated_frame)
                 
                 # Display
-                if display:
-                    cv2.imshow('YOLO Detection', annotated_frame)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
+                if view.poll() == 'quit':
+                    break
                 
                 frame_count += 1
                 if frame_count % 30 == 0:
@@ -183,8 +500,7 @@ class YOLODetector:
             cap.release()
             if writer:
                 writer.release()
-            if display:
-                cv2.destroyAllWindows()
+            view.close()
         
         # Statistics
         avg_fps = frame_count / total_time if total_time > 0 else 0
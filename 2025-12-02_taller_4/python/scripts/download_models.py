@@ -2,6 +2,7 @@
 Download required models for detection and segmentation.
 """
 import os
+import shutil
 import urllib.request
 from pathlib import Path
 from ultralytics import YOLO
@@ -15,7 +16,7 @@ print("DOWNLOADING DETECTION AND SEGMENTATION MODELS")
 print("=" * 60)
 
 # 1. Download YOLO models
-print("\n[1/3] Downloading YOLOv8 models...")
+print("\n[1/4] Downloading YOLOv8 models...")
 print("-" * 60)
 
 yolo_models = [
@@ -33,12 +34,35 @@ for model_name in yolo_models:
     except Exception as e:
         print(f"✗ Error downloading {model_name}: {e}")
 
-# 2. Download SAM models
-print("\n[2/3] Downloading SAM (Segment Anything) models...")
+# 2. Export YOLO to ONNX (backend: "onnx" in config.yaml, fast CPU inference)
+print("\n[2/4] Exporting YOLOv8 to ONNX...")
+print("-" * 60)
+
+onnx_models = [
+    "yolov8n.pt",
+]
+
+for model_name in onnx_models:
+    onnx_path = MODELS_DIR / Path(model_name).with_suffix('.onnx').name
+    if onnx_path.exists():
+        print(f"✓ {onnx_path.name} already exists (skipping)")
+        continue
+    try:
+        print(f"\nExporting {model_name} -> {onnx_path}...")
+        # Static 640x640 input lets ONNX Runtime fold shapes and pre-plan memory
+        exported = YOLO(model_name).export(format="onnx", imgsz=640, opset=12, dynamic=False, simplify=True)
+        shutil.move(str(exported), onnx_path)
+        print(f"✓ {onnx_path.name} ready")
+    except Exception as e:
+        print(f"✗ Error exporting {model_name}: {e}")
+
+# 3. Download SAM models
+print("\n[3/4] Downloading SAM (Segment Anything) models...")
 print("-" * 60)
 
 sam_models = {
     "sam_vit_b_01ec64.pth": "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_b_01ec64.pth",
+    "mobile_sam.pt": "https://github.com/ChaoningZhang/MobileSAM/raw/master/weights/mobile_sam.pt",  # vit_t (~40 MB)
     # Uncomment if you want larger models:
     # "sam_vit_l_0b3195.pth": "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_l_0b3195.pth",
     # "sam_vit_h_4b8939.pth": "https://dl.fbaipublicfiles.com/segment_anything/sam_vit_h_4b8939.pth",
@@ -52,7 +76,7 @@ for model_name, url in sam_models.items():
         try:
             print(f"\nDownloading {model_name}...")
             print(f"URL: {url}")
-            print("This may take a few minutes (~375 MB)...")
+            print("This may take a few minutes (up to ~375 MB)...")
             
             def progress(block_num, block_size, total_size):
                 downloaded = block_num * block_size
@@ -67,8 +91,8 @@ for model_name, url in sam_models.items():
         except Exception as e:
             print(f"\n✗ Error downloading {model_name}: {e}")
 
-# 3. Verify installations
-print("\n[3/3] Verifying installations...")
+# 4. Verify installations
+print("\n[4/4] Verifying installations...")
 print("-" * 60)
 
 try:
@@ -83,6 +107,12 @@ try:
 except ImportError:
     print("✗ Ultralytics not installed")
 
+try:
+    import onnxruntime
+    print(f"✓ ONNX Runtime: {onnxruntime.__version__} ({', '.join(onnxruntime.get_available_providers())})")
+except ImportError:
+    print("✗ ONNX Runtime not installed")
+
 try:
     from segment_anything import sam_model_registry
     print("✓ Segment Anything (SAM) installed")
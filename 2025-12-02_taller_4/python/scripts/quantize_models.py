@@ -0,0 +1,403 @@
+"""
+Quantize models to INT8 for CPU inference and compare them against FP32.
+
+Steps:
+    yolo         INT8 YOLO from the ONNX export: static (calibrated on an
+                 image folder) or dynamic (weights only)
+    sam-decoder  export the SAM prompt encoder + mask decoder to ONNX and
+                 quantize it (the image encoder is quantized at load time)
+    report       accuracy vs speed of FP32 and INT8 models on an image folder
+
+Examples:
+    python scripts/download_models.py                   # FP32 ONNX export first
+    python scripts/quantize_models.py yolo --calib-dir data/input --num-calib 200
+    python scripts/quantize_models.py sam-decoder
+    python scripts/quantize_models.py report --images data/input
+"""
+import argparse
+import copy
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+import psutil
+import yaml
+from onnxruntime.quantization import (
+    CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+    quantize_dynamic, quantize_static
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from python.detection.backends import create_detector, create_segmenter
+from python.detection.onnx_detector import letterbox
+from python.detection.sam_segmenter import SAM_MODEL_REGISTRY
+from python.utils.metrics import detection_map, mask_iou
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def load_config() -> Dict:
+    with open(CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def list_images(folder: str, limit: int = None) -> List[Path]:
+    """Sorted image files of a folder (optionally the first `limit`)."""
+    images = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return images[:limit] if limit else images
+
+
+def yolo_paths(config: Dict):
+    """FP32 and INT8 YOLO ONNX paths from config.yaml."""
+    models_dir = Path(config['io']['models_dir'])
+    yolo_config = config['models']['yolo']
+    onnx_config = yolo_config.get('onnx') or {}
+    stem = Path(yolo_config['model_name']).stem
+    fp32_path = models_dir / onnx_config.get('model_path', f"{stem}.onnx")
+    int8_path = models_dir / onnx_config.get('model_path_int8', f"{stem}_int8.onnx")
+    return fp32_path, int8_path
+
+
+def file_size_mb(path: Path) -> float:
+    return Path(path).stat().st_size / 1024 / 1024
+
+
+# ============================================================================
+# YOLO
+# ============================================================================
+
+class ImageFolderCalibrationReader(CalibrationDataReader):
+    """Feed letterboxed images to the ONNX Runtime calibrator."""
+    
+    def __init__(self, image_paths: List[Path], input_name: str, input_size: int):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.input_size = (input_size, input_size)
+        self._index = 0
+    
+    def get_next(self):
+        while self._index < len(self.image_paths):
+            image = cv2.imread(str(self.image_paths[self._index]))
+            self._index += 1
+            if image is None:
+                continue
+            # Same preprocessing as ONNXDetector.preprocess
+            padded, _, _ = letterbox(image, self.input_size)
+            blob = cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)
+            return {self.input_name: blob}
+        return None
+    
+    def rewind(self):
+        self._index = 0
+
+
+def head_nodes(model) -> List[str]:
+    """
+    Nodes after the last Conv (box decoding, sigmoid, concat).
+    
+    These mix pixel coordinates and probabilities in one tensor, which a
+    single INT8 scale cannot represent well, so they stay in float.
+    """
+    nodes = list(model.graph.node)
+    last_conv = max(i for i, node in enumerate(nodes) if node.op_type == 'Conv')
+    return [node.name for node in nodes[last_conv + 1:]]
+
+
+def quantize_yolo(args):
+    """Quantize the YOLO ONNX export to INT8."""
+    import onnx
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    config = load_config()
+    fp32_path, int8_path = yolo_paths(config)
+    if not fp32_path.exists():
+        print(f"✗ FP32 ONNX model not found: {fp32_path}")
+        print("  Run scripts/download_models.py first.")
+        sys.exit(1)
+    
+    # Shape inference + graph optimization makes quantization more complete
+    # (the export has a static input, so symbolic shape inference is not needed)
+    prep_path = fp32_path.with_name(f"{fp32_path.stem}_prep.onnx")
+    quant_pre_process(str(fp32_path), str(prep_path), skip_symbolic_shape=True)
+    
+    print(f"Quantizing {fp32_path} ({args.mode})...")
+    start_time = time.time()
+    try:
+        if args.mode == 'dynamic':
+            quantize_dynamic(str(prep_path), str(int8_path), weight_type=QuantType.QUInt8)
+        else:
+            images = list_images(args.calib_dir, args.num_calib)
+            if not images:
+                print(f"✗ No calibration images in {args.calib_dir}")
+                sys.exit(1)
+            print(f"Calibrating on {len(images)} images from {args.calib_dir} ({args.calib_method})")
+            
+            model = onnx.load(str(prep_path))
+            input_name = model.graph.input[0].name
+            # Calibrate at the exported input size
+            imgsz = model.graph.input[0].type.tensor_type.shape.dim[2].dim_value or config['models']['yolo'].get('imgsz', 640)
+            
+            quantize_static(
+                str(prep_path),
+                str(int8_path),
+                ImageFolderCalibrationReader(images, input_name, imgsz),
+                quant_format=QuantFormat.QDQ,
+                per_channel=True,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                calibrate_method=CalibrationMethod[args.calib_method],
+                nodes_to_exclude=head_nodes(model) if not args.quantize_head else []
+            )
+    finally:
+        prep_path.unlink(missing_ok=True)
+    
+    print(f"✓ {int8_path} ({file_size_mb(fp32_path):.1f} MB -> {file_size_mb(int8_path):.1f} MB, "
+          f"{time.time() - start_time:.1f}s)")
+    print('  Enable with models.yolo.backend: "onnx" and precision: "int8"')
+
+
+# ============================================================================
+# SAM
+# ============================================================================
+
+def quantize_sam_decoder(args):
+    """Export the SAM prompt encoder + mask decoder to ONNX and quantize it."""
+    import torch
+    from segment_anything.utils.onnx import SamOnnxModel
+    
+    config = load_config()
+    sam_config = config['models']['sam']
+    models_dir = Path(config['io']['models_dir'])
+    int8_path = models_dir / sam_config['decoder_int8']
+    fp32_path = int8_path.with_name(int8_path.name.replace('_int8', ''))
+    
+    # Any registered encoder (vit_b, vit_t, ...) shares the SAM decoder
+    loader = SAM_MODEL_REGISTRY[sam_config['model_type']]['loader']
+    sam, _ = loader(sam_config['model_type'], str(models_dir / sam_config['checkpoint']))
+    onnx_model = SamOnnxModel(sam, return_single_mask=True)
+    
+    embed_dim = sam.prompt_encoder.embed_dim
+    embed_size = sam.prompt_encoder.image_embedding_size
+    mask_input_size = [4 * x for x in embed_size]
+    dummy_inputs = {
+        'image_embeddings': torch.randn(1, embed_dim, *embed_size, dtype=torch.float),
+        'point_coords': torch.randint(low=0, high=1024, size=(1, 5, 2), dtype=torch.float),
+        'point_labels': torch.randint(low=0, high=4, size=(1, 5), dtype=torch.float),
+        'mask_input': torch.randn(1, 1, *mask_input_size, dtype=torch.float),
+        'has_mask_input': torch.tensor([1], dtype=torch.float),
+        'orig_im_size': torch.tensor([1500, 2250], dtype=torch.float)
+    }
+    
+    print(f"Exporting SAM decoder ({sam_config['model_type']}) -> {fp32_path}")
+    torch.onnx.export(
+        onnx_model,
+        tuple(dummy_inputs.values()),
+        str(fp32_path),
+        export_params=True,
+        opset_version=17,
+        do_constant_folding=True,
+        input_names=list(dummy_inputs.keys()),
+        output_names=['masks', 'iou_predictions', 'low_res_masks'],
+        dynamic_axes={
+            'point_coords': {1: 'num_points'},
+            'point_labels': {1: 'num_points'}
+        }
+    )
+    
+    quantize_dynamic(str(fp32_path), str(int8_path), per_channel=False, weight_type=QuantType.QUInt8)
+    print(f"✓ {int8_path} ({file_size_mb(fp32_path):.1f} MB -> {file_size_mb(int8_path):.1f} MB)")
+    print('  Enable with models.sam.precision: "int8" (image encoder is quantized at load time)')
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def latency_stats(times: List[float]) -> Dict:
+    ms = np.array(times) * 1000
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95))
+    }
+
+
+def load_models(config: Dict, precision: str, yolo_baseline: str, with_sam: bool) -> Dict:
+    """Build detector (and segmenter) at a given precision, measuring RSS growth."""
+    config = copy.deepcopy(config)
+    yolo_config = config['models']['yolo']
+    yolo_config['precision'] = precision
+    yolo_config['backend'] = 'onnx' if precision == 'int8' else yolo_baseline
+    yolo_config['device'] = 'cpu'
+    config['models']['sam']['precision'] = precision
+    config['models']['sam']['device'] = 'cpu'
+    
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    models = {'detector': create_detector(config)}
+    rss_detector = process.memory_info().rss
+    models['detector_memory_mb'] = (rss_detector - rss_before) / 1024 / 1024
+    if with_sam:
+        models['segmenter'] = create_segmenter(config)
+        models['segmenter_memory_mb'] = (process.memory_info().rss - rss_detector) / 1024 / 1024
+    return models
+
+
+def run_models(models: Dict, image: np.ndarray, boxes: List[List[int]] = None) -> Dict:
+    """Detect on an image and segment the given boxes (or its own detections)."""
+    start = time.perf_counter()
+    detections, _ = models['detector'].detect(image)
+    result = {'detections': detections, 'detect_time': time.perf_counter() - start}
+    
+    if 'segmenter' in models:
+        segmenter = models['segmenter']
+        start = time.perf_counter()
+        segmenter.set_image(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        result['encode_time'] = time.perf_counter() - start
+        
+        masks = []
+        decode_times = []
+        for bbox in (boxes if boxes is not None else [d['bbox'] for d in detections]):
+            start = time.perf_counter()
+            mask, _, _ = segmenter.segment_from_bbox(bbox)
+            decode_times.append(time.perf_counter() - start)
+            masks.append(mask)
+        result['masks'] = masks
+        result['decode_times'] = decode_times
+    
+    return result
+
+
+def quantization_report(args):
+    """Accuracy vs speed of INT8 models relative to FP32."""
+    config = load_config()
+    images = list_images(args.images, args.max_images)
+    if not images:
+        print(f"✗ No images in {args.images}")
+        sys.exit(1)
+    
+    with_sam = not args.skip_sam
+    fp32 = load_models(config, 'fp32', args.yolo_baseline, with_sam)
+    int8 = load_models(config, 'int8', args.yolo_baseline, with_sam)
+    
+    runs = {'fp32': [], 'int8': []}
+    mask_ious = []
+    for path in images:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        ref = run_models(fp32, image)
+        # INT8 SAM segments the FP32 boxes so mask IoU only reflects SAM
+        test = run_models(int8, image, boxes=[d['bbox'] for d in ref['detections']])
+        runs['fp32'].append(ref)
+        runs['int8'].append(test)
+        if with_sam:
+            mask_ious.extend(mask_iou(a, b) for a, b in zip(ref['masks'], test['masks']))
+    
+    references = [r['detections'] for r in runs['fp32']]
+    predictions = [r['detections'] for r in runs['int8']]
+    map_by_iou = {
+        f"{t:.2f}": detection_map(predictions, references, iou_threshold=t)['map']
+        for t in np.arange(0.5, 0.96, 0.05)
+    }
+    fp32_path, int8_path = yolo_paths(config)
+    
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'num_images': len(runs['fp32']),
+        'yolo': {
+            'baseline': args.yolo_baseline,
+            'map50_vs_fp32': map_by_iou['0.50'],
+            'map50_95_vs_fp32': float(np.mean(list(map_by_iou.values()))),
+            'detections_fp32': sum(len(d) for d in references),
+            'detections_int8': sum(len(d) for d in predictions),
+            'model_size_mb': {
+                'fp32': file_size_mb(fp32_path) if fp32_path.exists() else None,
+                'int8': file_size_mb(int8_path)
+            }
+        }
+    }
+    for precision, models in [('fp32', fp32), ('int8', int8)]:
+        report['yolo'][precision] = latency_stats([r['detect_time'] for r in runs[precision]])
+        report['yolo'][precision]['memory_mb'] = models['detector_memory_mb']
+    
+    if with_sam:
+        ious = np.array(mask_ious) if mask_ious else np.array([1.0])
+        report['sam'] = {
+            'num_masks': len(mask_ious),
+            'mask_iou_mean': float(ious.mean()),
+            'mask_iou_p5': float(np.percentile(ious, 5)),
+            'mask_iou_min': float(ious.min())
+        }
+        for precision, models in [('fp32', fp32), ('int8', int8)]:
+            decode_times = [t for r in runs[precision] for t in r['decode_times']] or [0.0]
+            report['sam'][precision] = {
+                'encoder': latency_stats([r['encode_time'] for r in runs[precision]]),
+                'decoder_per_mask': latency_stats(decode_times),
+                'memory_mb': models['segmenter_memory_mb']
+            }
+    
+    print("\n" + "=" * 60)
+    print("QUANTIZATION REPORT (INT8 vs FP32, CPU)")
+    print("=" * 60)
+    yolo = report['yolo']
+    print(f"Images: {report['num_images']}")
+    print(f"YOLO  latency: {yolo['fp32']['mean_ms']:.1f} -> {yolo['int8']['mean_ms']:.1f} ms | "
+          f"mAP50 {yolo['map50_vs_fp32']:.3f} | mAP50-95 {yolo['map50_95_vs_fp32']:.3f}")
+    if with_sam:
+        sam = report['sam']
+        print(f"SAM   encoder: {sam['fp32']['encoder']['mean_ms']:.1f} -> {sam['int8']['encoder']['mean_ms']:.1f} ms | "
+              f"decoder: {sam['fp32']['decoder_per_mask']['mean_ms']:.1f} -> "
+              f"{sam['int8']['decoder_per_mask']['mean_ms']:.1f} ms/mask")
+        print(f"SAM   mask IoU: mean {sam['mask_iou_mean']:.3f} | p5 {sam['mask_iou_p5']:.3f} | "
+              f"min {sam['mask_iou_min']:.3f}")
+    print("=" * 60)
+    
+    output_path = Path(args.output or f"results/metrics/quantization_report_{datetime.now():%Y%m%d_%H%M%S}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to: {output_path}")
+
+
+def main():
+    """Command-line interface."""
+    parser = argparse.ArgumentParser(description="INT8 quantization for CPU inference")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    p = subparsers.add_parser('yolo', help='Quantize the YOLO ONNX model')
+    p.add_argument('--mode', choices=['static', 'dynamic'], default='static',
+                   help='static: calibrated weights + activations; dynamic: weights only')
+    p.add_argument('--calib-dir', default='data/input', help='Calibration image folder')
+    p.add_argument('--num-calib', type=int, default=100, help='Maximum calibration images')
+    p.add_argument('--calib-method', choices=['MinMax', 'Entropy', 'Percentile'], default='MinMax',
+                   help='Activation range estimation')
+    p.add_argument('--quantize-head', action='store_true',
+                   help='Also quantize the box decoding head (faster, less accurate)')
+    p.set_defaults(func=quantize_yolo)
+    
+    p = subparsers.add_parser('sam-decoder', help='Export and quantize the SAM mask decoder')
+    p.set_defaults(func=quantize_sam_decoder)
+    
+    p = subparsers.add_parser('report', help='Accuracy vs speed of INT8 vs FP32')
+    p.add_argument('--images', default='data/input', help='Evaluation image folder')
+    p.add_argument('--max-images', type=int, default=50, help='Maximum evaluation images')
+    p.add_argument('--yolo-baseline', choices=['onnx', 'ultralytics'], default='onnx',
+                   help='FP32 YOLO backend used as reference')
+    p.add_argument('--skip-sam', action='store_true', help='Only evaluate YOLO')
+    p.add_argument('--output', default=None, help='JSON report path')
+    p.set_defaults(func=quantization_report)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""
+Benchmark Suite
+Measure per-stage cost of the pipeline (decode, detection, segmentation,
+drawing, encoding). With the fake backends model cost is fixed, so the
+numbers isolate orchestration, I/O and visualization overhead.
+
+Examples:
+    # Overhead only: fake models with zero latency on a synthetic 1080p frame
+    python tests/benchmark.py pipeline --size 1920x1080 --runs 50
+    
+    # Models from config.yaml on a real image
+    python tests/benchmark.py pipeline --backend config --image data/input/test.jpg
+    
+    # CPU detector throughput: PyTorch vs ONNX Runtime
+    python tests/benchmark.py detector --backends ultralytics onnx --device cpu
+    
+    # SAM encoders: vit_b vs MobileSAM (vit_t), 5 boxes per frame
+    python tests/benchmark.py sam --model-types vit_b vit_t --device cpu --num-boxes 5
+    
+    # Import-time budgets (--strict exits with status 1 when a module is over budget)
+    python tests/benchmark.py importtime --strict --budget python.api.server=4
+"""
+import argparse
+import copy
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from python.detection.pipeline import DetectionSegmentationPipeline
+from python.detection.fake_backends import FakeDetector, FakeSegmenter
+from python.detection.backends import create_detector, create_segmenter
+from python.detection.sam_segmenter import SAM_MODEL_REGISTRY
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Cumulative import time budgets for `importtime`, as multiples of the
+# baseline import (cv2, which pulls in numpy) measured in the same run, so
+# they hold on slower machines. Heavy libraries (torch, pandas, matplotlib,
+# model packages) must only load when a feature uses them. The factors
+# leave about 2x headroom over typical runs (pipeline ~1.8x, server ~3x),
+# while pandas alone costs ~3x and torch far more.
+IMPORT_BASELINE = 'cv2'
+IMPORT_BUDGETS = {
+    'python.detection': 0.3,
+    'python.detection.display': 2.5,
+    'python.detection.pipeline': 3.5,
+    'python.utils.metrics': 2.5,
+    'python.utils.visualization': 2.5,
+    'python.api.server': 6.0,
+}
+
+
+def summarize_times(times: List[float]) -> Dict:
+    """Latency statistics in milliseconds."""
+    ms = np.array(times) * 1000
+    return {
+        'runs': len(ms),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'min_ms': float(ms.min()),
+        'max_ms': float(ms.max())
+    }
+
+
+def time_stages(stages: List[tuple], runs: int, warmup: int) -> Dict[str, Dict]:
+    """
+    Run a chain of stages and time each one.
+    
+    Args:
+        stages: List of (name, fn) where fn receives the previous stage output
+        runs: Number of measured runs
+        warmup: Number of unmeasured runs
+    
+    Returns:
+        Dictionary stage name -> latency statistics (plus 'total')
+    """
+    times = {name: [] for name, _ in stages}
+    times['total'] = []
+    
+    for i in range(warmup + runs):
+        value = None
+        total = 0.0
+        for name, fn in stages:
+            start = time.perf_counter()
+            value = fn(value)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            if i >= warmup:
+                times[name].append(elapsed)
+        if i >= warmup:
+            times['total'].append(total)
+    
+    return {name: summarize_times(values) for name, values in times.items()}
+
+
+def load_test_image(image_path: str = None, size: str = '1280x720') -> np.ndarray:
+    """Load an image or create a synthetic one of the given WxH size."""
+    if image_path:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        return image
+    
+    w, h = [int(v) for v in size.lower().split('x')]
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 255, (h // 8, w // 8, 3), dtype=np.uint8), (w, h))
+    return image
+
+
+def print_table(title: str, results: Dict[str, Dict]):
+    """Print stage statistics."""
+    print(f"\n{title}")
+    print("-" * 60)
+    print(f"{'Stage':<16}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}  (ms)")
+    for name, stats in results.items():
+        print(f"{name:<16}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+
+def save_report(name: str, report: Dict, output: str = None) -> Path:
+    """Save a benchmark report as JSON."""
+    output_path = Path(output or f"results/metrics/benchmark_{name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to: {output_path}")
+    return output_path
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_pipeline(args) -> Dict:
+    """Per-stage timing of a full image pass through the pipeline."""
+    if args.backend == 'fake':
+        pipeline = DetectionSegmentationPipeline(
+            config_path=str(CONFIG_PATH),
+            detector=FakeDetector(num_objects=args.num_objects, latency_ms=args.det_latency_ms),
+            segmenter=FakeSegmenter(
+                encoder_latency_ms=args.enc_latency_ms,
+                decoder_latency_ms=args.dec_latency_ms
+            )
+        )
+    else:
+        pipeline = DetectionSegmentationPipeline(config_path=str(CONFIG_PATH))
+    
+    image = load_test_image(args.image, args.size)
+    encoded = cv2.imencode('.jpg', image)[1]
+    state = {}
+    
+    def decode(_):
+        return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    
+    def detect(frame):
+        state['frame'] = frame
+        detections, _ = pipeline.detector.detect(frame)
+        return detections
+    
+    def segment(detections):
+        if detections:
+            detections, _, _ = pipeline.segmenter.segment_detections(state['frame'], detections)
+        return detections
+    
+    def visualize(detections):
+        state['detections'] = detections
+        return pipeline._create_visualization(state['frame'], detections)
+    
+    def encode(annotated):
+        return cv2.imencode('.jpg', annotated)[1]
+    
+    def serialize(_):
+        return json.dumps([
+            {'bbox': d['bbox'], 'confidence': float(d['confidence']), 'class_name': d['class_name']}
+            for d in state['detections']
+        ])
+    
+    stages = [
+        ('decode', decode),
+        ('detect', detect),
+        ('segment', segment),
+        ('visualize', visualize),
+        ('encode', encode),
+        ('serialize', serialize)
+    ]
+    
+    results = time_stages(stages, args.runs, args.warmup)
+    h, w = image.shape[:2]
+    print_table(f"Pipeline stages ({args.backend} backend, {w}x{h}, {args.runs} runs)", results)
+    
+    return {
+        'benchmark': 'pipeline',
+        'backend': args.backend,
+        'image_size': [w, h],
+        'num_objects': len(state['detections']),
+        'stages': results
+    }
+
+
+def bench_detector(args) -> Dict:
+    """Detector latency and throughput for each backend on the same image."""
+    with open(CONFIG_PATH, 'r') as f:
+        base_config = yaml.safe_load(f)
+    
+    image = load_test_image(args.image, args.size)
+    results = {}
+    for backend in args.backends:
+        config = copy.deepcopy(base_config)
+        config['models']['yolo']['backend'] = backend
+        config['models']['yolo']['device'] = args.device
+        detector = create_detector(config)
+        
+        stats = time_stages(
+            [('detect', lambda _: detector.detect_image(image, tiling=args.tiling)[0])],
+            args.runs, args.warmup
+        )
+        results[backend] = stats['detect']
+        results[backend]['fps'] = 1000 / results[backend]['mean_ms']
+        results[backend]['num_tiles'] = detector.detect_image(image, tiling=args.tiling)[2]
+    
+    h, w = image.shape[:2]
+    print_table(f"Detector backends ({args.device}, {w}x{h}, {args.runs} runs)", results)
+    
+    return {
+        'benchmark': 'detector',
+        'device': args.device,
+        'tiling': args.tiling,
+        'image_size': [w, h],
+        'backends': results
+    }
+
+
+def bench_sam(args) -> Dict:
+    """Image encoder and mask decoder latency for each SAM model type."""
+    with open(CONFIG_PATH, 'r') as f:
+        base_config = yaml.safe_load(f)
+    
+    image = load_test_image(args.image, args.size)
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    h, w = image.shape[:2]
+    
+    # Boxes spread along the diagonal, a quarter of the frame each
+    boxes = []
+    for i in range(args.num_boxes):
+        x1 = int(i * w * 0.75 / max(1, args.num_boxes - 1)) if args.num_boxes > 1 else w // 4
+        y1 = int(i * h * 0.75 / max(1, args.num_boxes - 1)) if args.num_boxes > 1 else h // 4
+        boxes.append([x1, y1, min(w, x1 + w // 4), min(h, y1 + h // 4)])
+    
+    results = {}
+    for model_type in args.model_types:
+        config = copy.deepcopy(base_config)
+        sam_config = config['models']['sam']
+        if model_type != sam_config['model_type']:
+            sam_config['checkpoint'] = SAM_MODEL_REGISTRY.get(model_type, {}).get('checkpoint', sam_config['checkpoint'])
+        sam_config['model_type'] = model_type
+        sam_config['device'] = args.device
+        sam_config['precision'] = args.precision
+        segmenter = create_segmenter(config)
+        
+        stats = time_stages([
+            ('encoder', lambda _: segmenter.set_image(rgb_image)),
+            ('decoder', lambda _: [segmenter.segment_from_bbox(bbox) for bbox in boxes])
+        ], args.runs, args.warmup)
+        stats['fps'] = 1000 / stats['total']['mean_ms']
+        stats['decoder_per_box_ms'] = stats['decoder']['mean_ms'] / max(1, len(boxes))
+        results[model_type] = stats
+    
+    print_table(
+        f"SAM model types ({args.device}, {args.precision}, {w}x{h}, {len(boxes)} boxes, {args.runs} runs)",
+        {f"{model_type}/{stage}": stats[stage]
+         for model_type, stats in results.items() for stage in ('encoder', 'decoder', 'total')}
+    )
+    
+    return {
+        'benchmark': 'sam',
+        'device': args.device,
+        'precision': args.precision,
+        'image_size': [w, h],
+        'num_boxes': len(boxes),
+        'model_types': results
+    }
+
+
+def parse_importtime(stderr: str) -> Dict[str, tuple]:
+    """Parse `python -X importtime` output into module -> (self_us, cumulative_us)."""
+    entries = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries[name.strip()] = (int(self_us), int(cumulative_us))
+    return entries
+
+
+def measure_import(module: str, runs: int, warmup: int):
+    """
+    Cumulative import time of a module in fresh interpreters.
+    
+    Returns:
+        times (seconds per measured run), entries of the last run
+        (module -> (self_us, cumulative_us)) and the error, if the import failed
+    """
+    times = []
+    entries = {}
+    for i in range(warmup + runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return times, entries, proc.stderr.strip().splitlines()[-1]
+        entries = parse_importtime(proc.stderr)
+        if i >= warmup:
+            times.append(entries[module][1] / 1e6)
+    return times, entries, None
+
+
+def bench_importtime(args) -> Dict:
+    """Import time of package entry points in fresh interpreters, against budgets."""
+    budgets = dict(IMPORT_BUDGETS)
+    for item in args.budget:
+        module, _, factor = item.partition('=')
+        budgets[module] = float(factor)
+    modules = args.modules or list(budgets)
+    
+    # Budgets scale with the machine: measured against the baseline import
+    # in this same run
+    times, _, error = measure_import(IMPORT_BASELINE, args.runs, args.warmup)
+    if error:
+        raise RuntimeError(f"Baseline import {IMPORT_BASELINE} failed: {error}")
+    baseline_ms = summarize_times(times)['p50_ms']
+    print(f"Baseline: import {IMPORT_BASELINE} p50 {baseline_ms:.1f} ms")
+    
+    results = {}
+    report_modules = {}
+    for module in modules:
+        times, entries, error = measure_import(module, args.runs, args.warmup)
+        if error:
+            print(f"  {module}: import failed ({error})")
+            report_modules[module] = {'error': error}
+            continue
+        
+        # Heaviest top-level packages by self time (last run)
+        packages = {}
+        for name, (self_us, _) in entries.items():
+            top = name.split('.')[0]
+            packages[top] = packages.get(top, 0) + self_us / 1000
+        heaviest = sorted(packages.items(), key=lambda item: -item[1])[:5]
+        
+        stats = summarize_times(times)
+        factor = budgets.get(module)
+        budget = factor * baseline_ms if factor is not None else None
+        results[module] = stats
+        report_modules[module] = {
+            **stats,
+            'budget_factor': factor,
+            'budget_ms': budget,
+            'within_budget': budget is None or stats['p50_ms'] <= budget,
+            'heaviest_packages_ms': {name: round(ms, 1) for name, ms in heaviest}
+        }
+    
+    print_table(f"Import time ({args.runs} fresh interpreters per module)", results)
+    print("-" * 60)
+    for module, entry in report_modules.items():
+        if 'error' in entry:
+            continue
+        status = 'ok' if entry['within_budget'] else 'OVER BUDGET'
+        budget = f"{entry['budget_ms']:.0f}" if entry['budget_ms'] is not None else '-'
+        heaviest = ', '.join(f"{name} {ms:.0f}" for name, ms in entry['heaviest_packages_ms'].items())
+        print(f"{module:<28} p50 {entry['p50_ms']:7.1f} / {budget} ms  {status}  [{heaviest}]")
+    
+    return {
+        'benchmark': 'importtime',
+        'baseline_module': IMPORT_BASELINE,
+        'baseline_ms': baseline_ms,
+        'passed': all(entry.get('within_budget', True) for entry in report_modules.values()),
+        'modules': report_modules
+    }
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'pipeline': bench_pipeline,
+    'detector': bench_detector,
+    'sam': bench_sam,
+    'importtime': bench_importtime,
+}
+
+
+def main():
+    """Command-line interface."""
+    parser = argparse.ArgumentParser(description="Detection & segmentation benchmark suite")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    
+    p = subparsers.add_parser('pipeline', help='Per-stage pipeline timing')
+    p.add_argument('--backend', choices=['fake', 'config'], default='fake',
+                   help='fake: FakeDetector/FakeSegmenter; config: backends from config.yaml')
+    p.add_argument('--image', default=None, help='Test image (default: synthetic)')
+    p.add_argument('--size', default='1280x720', help='Synthetic image size WxH')
+    p.add_argument('--num-objects', type=int, default=5, help='Objects per frame (fake backend)')
+    p.add_argument('--det-latency-ms', type=float, default=0.0, help='Fake detector latency')
+    p.add_argument('--enc-latency-ms', type=float, default=0.0, help='Fake SAM encoder latency')
+    p.add_argument('--dec-latency-ms', type=float, default=0.0, help='Fake SAM decoder latency per object')
+    
+    p = subparsers.add_parser('detector', help='Detector backend comparison')
+    p.add_argument('--backends', nargs='+', default=['ultralytics', 'onnx'],
+                   help='Detector backends to compare (see detection/backends.py)')
+    p.add_argument('--device', default='cpu', help='Device for all backends')
+    p.add_argument('--tiling', choices=['auto', 'always', 'never'], default='never',
+                   help='Tiled inference mode (try --size 3840x2160 --tiling always)')
+    p.add_argument('--image', default=None, help='Test image (default: synthetic)')
+    p.add_argument('--size', default='1280x720', help='Synthetic image size WxH')
+    
+    p = subparsers.add_parser('sam', help='SAM encoder / decoder timing per model type')
+    p.add_argument('--model-types', nargs='+', default=['vit_b', 'vit_t'],
+                   help=f"SAM model types ({', '.join(SAM_MODEL_REGISTRY)})")
+    p.add_argument('--device', default='cpu', help='Device for all models')
+    p.add_argument('--precision', choices=['fp32', 'int8'], default='fp32', help='SAM precision')
+    p.add_argument('--num-boxes', type=int, default=5, help='Box prompts decoded per image')
+    p.add_argument('--image', default=None, help='Test image (default: synthetic)')
+    p.add_argument('--size', default='1280x720', help='Synthetic image size WxH')
+    
+    for sub in subparsers.choices.values():
+        sub.add_argument('--runs', type=int, default=30, help='Measured runs')
+        sub.add_argument('--warmup', type=int, default=3, help='Warmup runs')
+        sub.add_argument('--output', default=None, help='JSON report path')
+    
+    # Each run starts a new interpreter, so fewer runs by default
+    p = subparsers.add_parser('importtime', help='Import time of entry points against budgets')
+    p.add_argument('--modules', nargs='+', default=None,
+                   help=f"Modules to import (default: {', '.join(IMPORT_BUDGETS)})")
+    p.add_argument('--budget', action='append', default=[], metavar='MODULE=FACTOR',
+                   help=f'Override or add a budget, as a multiple of the {IMPORT_BASELINE} import (repeatable)')
+    p.add_argument('--strict', action='store_true', help='Exit with status 1 when a module is over budget')
+    p.add_argument('--runs', type=int, default=5, help='Measured runs')
+    p.add_argument('--warmup', type=int, default=1, help='Warmup runs (compile .pyc files)')
+    p.add_argument('--output', default=None, help='JSON report path')
+    
+    args = parser.parse_args()
+    
+    report = BENCHMARKS[args.benchmark](args)
+    report['timestamp'] = datetime.now().isoformat()
+    save_report(args.benchmark, report, args.output)
+    
+    if report.get('passed') is False and getattr(args, 'strict', False):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+Load Generator for the REST API
+Replays a corpus of images against /detect, /segment and /pipeline and
+records latency distribution, error rate and throughput per endpoint.
+
+Examples:
+    # Against a running server, 8 concurrent clients for 30 s per endpoint
+    python tests/load_test.py --url http://127.0.0.1:5000 --concurrency 8 --duration 30
+    
+    # Open-loop arrivals at 20 req/s against an in-process server with stub models
+    python tests/load_test.py --local --stub --rate 20 --duration 15
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.webp')
+ENDPOINTS = ('detect', 'segment', 'pipeline')
+
+
+def load_corpus(images_dir: str, max_images: Optional[int] = None) -> List[Dict]:
+    """
+    Read every image of a folder into memory so disk I/O stays out of the measurements.
+    
+    Args:
+        images_dir: Folder with test images
+        max_images: Maximum number of images to load
+    
+    Returns:
+        List of dicts with 'name', 'data' (encoded bytes) and 'size' (width, height)
+    """
+    import cv2
+    
+    paths = []
+    for pattern in IMAGE_EXTENSIONS:
+        paths.extend(Path(images_dir).glob(pattern))
+    paths = sorted(paths)[:max_images]
+    
+    corpus = []
+    for path in paths:
+        data = path.read_bytes()
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        h, w = image.shape[:2]
+        corpus.append({'name': path.name, 'data': data, 'size': (w, h)})
+    
+    return corpus
+
+
+class LoadGenerator:
+    """Send requests to the API in closed-loop or open-loop mode."""
+    
+    def __init__(
+        self,
+        base_url: str,
+        corpus: List[Dict],
+        return_image: bool = False,
+        timeout: float = 60.0
+    ):
+        """
+        Initialize load generator.
+        
+        Args:
+            base_url: API base URL (e.g. http://127.0.0.1:5000)
+            corpus: Images returned by load_corpus()
+            return_image: Ask the server for annotated images
+            timeout: Per-request timeout in seconds
+        """
+        self.base_url = base_url.rstrip('/')
+        self.corpus = corpus
+        self.return_image = return_image
+        self.timeout = timeout
+        self._local = threading.local()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+    
+    def _session(self) -> requests.Session:
+        """One keep-alive session per worker thread."""
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+    
+    def _next_image(self) -> Dict:
+        """Round-robin over the corpus."""
+        with self._counter_lock:
+            image = self.corpus[self._counter % len(self.corpus)]
+            self._counter += 1
+        return image
+    
+    def send(self, endpoint: str, scheduled_at: Optional[float] = None) -> Dict:
+        """
+        Send a single request.
+        
+        Args:
+            endpoint: 'detect', 'segment' or 'pipeline'
+            scheduled_at: Intended send time (open loop); latency is measured
+                from it so queueing delay in the client is not hidden
+        
+        Returns:
+            Sample dict with latency, status and error
+        """
+        image = self._next_image()
+        data = {'return_image': 'true' if self.return_image else 'false'}
+        
+        if endpoint == 'segment':
+            # One centered box covering half of the image
+            w, h = image['size']
+            data['bboxes'] = json.dumps([[w // 4, h // 4, 3 * w // 4, 3 * h // 4]])
+        
+        start = scheduled_at if scheduled_at is not None else time.perf_counter()
+        status = None
+        error = None
+        
+        try:
+            response = self._session().post(
+                f"{self.base_url}/{endpoint}",
+                files={'image': (image['name'], image['data'])},
+                data=data,
+                timeout=self.timeout
+            )
+            status = response.status_code
+            if status != 200:
+                error = response.text[:200]
+        except requests.RequestException as e:
+            error = str(e)
+        
+        return {
+            'endpoint': endpoint,
+            'latency': time.perf_counter() - start,
+            'status': status,
+            'error': error
+        }
+    
+    def run_closed_loop(
+        self,
+        endpoint: str,
+        concurrency: int,
+        duration: Optional[float] = None,
+        num_requests: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Keep `concurrency` requests in flight until duration or request count is reached.
+        
+        Args:
+            endpoint: Endpoint to hit
+            concurrency: Number of client workers
+            duration: Phase length in seconds
+            num_requests: Total number of requests
+        
+        Returns:
+            List of samples
+        """
+        samples = []
+        samples_lock = threading.Lock()
+        deadline = time.perf_counter() + duration if duration else None
+        remaining = [num_requests]
+        
+        def worker():
+            while True:
+                if deadline and time.perf_counter() >= deadline:
+                    return
+                with samples_lock:
+                    if remaining[0] is not None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                sample = self.send(endpoint)
+                with samples_lock:
+                    samples.append(sample)
+        
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        return samples
+    
+    def run_open_loop(
+        self,
+        endpoint: str,
+        rate: float,
+        duration: Optional[float] = None,
+        num_requests: Optional[int] = None,
+        arrival: str = 'poisson',
+        max_inflight: int = 256,
+        seed: int = 0
+    ) -> List[Dict]:
+        """
+        Issue requests at a fixed arrival rate independently of response times.
+        
+        Args:
+            endpoint: Endpoint to hit
+            rate: Arrival rate in requests per second
+            duration: Phase length in seconds
+            num_requests: Total number of requests
+            arrival: 'poisson' (exponential gaps) or 'constant'
+            max_inflight: Maximum concurrent requests
+            seed: Random seed for arrival times
+        
+        Returns:
+            List of samples
+        """
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        next_at = start
+        futures = []
+        
+        with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+            while True:
+                if num_requests is not None and len(futures) >= num_requests:
+                    break
+                if duration and next_at - start >= duration:
+                    break
+                
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                
+                futures.append(executor.submit(self.send, endpoint, next_at))
+                
+                gap = rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+                next_at += gap
+        
+        return [f.result() for f in futures]
+
+
+def summarize(samples: List[Dict], wall_time: float) -> Dict:
+    """
+    Compute latency distribution, error rate and throughput.
+    
+    Args:
+        samples: Samples returned by LoadGenerator
+        wall_time: Duration of the phase in seconds
+    
+    Returns:
+        Summary dictionary (latencies in ms)
+    """
+    total = len(samples)
+    ok = [s['latency'] * 1000 for s in samples if s['error'] is None]
+    errors = total - len(ok)
+    
+    status_counts = {}
+    for s in samples:
+        key = str(s['status']) if s['status'] is not None else 'connection_error'
+        status_counts[key] = status_counts.get(key, 0) + 1
+    
+    summary = {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0,
+        'throughput_rps': len(ok) / wall_time if wall_time > 0 else 0,
+        'offered_rps': total / wall_time if wall_time > 0 else 0,
+        'wall_time_s': wall_time,
+        'status_counts': status_counts
+    }
+    
+    if ok:
+        latencies = np.array(ok)
+        summary.update({
+            'latency_mean_ms': float(latencies.mean()),
+            'latency_min_ms': float(latencies.min()),
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p90_ms': float(np.percentile(latencies, 90)),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'latency_max_ms': float(latencies.max())
+        })
+    
+    first_errors = [s['error'] for s in samples if s['error']][:3]
+    if first_errors:
+        summary['sample_errors'] = first_errors
+    
+    return summary
+
+
+def print_summary(endpoint: str, summary: Dict):
+    """Print a phase summary to console."""
+    print(f"\n/{endpoint}")
+    print("-" * 60)
+    print(f"Requests: {summary['requests']} | Errors: {summary['errors']} "
+          f"({summary['error_rate']*100:.1f}%)")
+    print(f"Throughput: {summary['throughput_rps']:.2f} req/s "
+          f"(offered {summary['offered_rps']:.2f} req/s)")
+    if 'latency_p50_ms' in summary:
+        print(f"Latency ms: mean {summary['latency_mean_ms']:.1f} | "
+              f"p50 {summary['latency_p50_ms']:.1f} | "
+              f"p90 {summary['latency_p90_ms']:.1f} | "
+              f"p95 {summary['latency_p95_ms']:.1f} | "
+              f"p99 {summary['latency_p99_ms']:.1f} | "
+              f"max {summary['latency_max_ms']:.1f}")
+    for error in summary.get('sample_errors', []):
+        print(f"  ! {error}")
+
+
+# ============================================================================
+# LOCAL SERVER
+# ============================================================================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(stub: bool = False, latency_ms: float = 0.0) -> str:
+    """
+    Start api/server.py in a background thread.
+    
+    Args:
+        stub: Replace YOLO and SAM with fake backends (no GPU or weights needed)
+        latency_ms: Simulated YOLO inference and SAM encoder latency
+    
+    Returns:
+        Base URL of the server
+    """
+    from werkzeug.serving import make_server
+    
+    project_root = Path(__file__).resolve().parent.parent.parent
+    sys.path.insert(0, str(project_root))
+    
+    from python.api import server as api_server
+    
+    if stub:
+        from python.detection.pipeline import DetectionSegmentationPipeline
+        from python.detection.fake_backends import FakeDetector, FakeSegmenter
+        
+        detector = FakeDetector(num_objects=3, latency_ms=latency_ms)
+        segmenter = FakeSegmenter(encoder_latency_ms=latency_ms)
+        config_path = Path(__file__).resolve().parent.parent / 'config.yaml'
+        
+        api_server.yolo_detector = detector
+        api_server.sam_segmenter = segmenter
+        api_server.pipeline = DetectionSegmentationPipeline(
+            config_path=str(config_path),
+            detector=detector,
+            segmenter=segmenter
+        )
+    
+    port = _free_port()
+    httpd = make_server('127.0.0.1', port, api_server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    
+    return f"http://127.0.0.1:{port}"
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    """Command-line interface."""
+    parser = argparse.ArgumentParser(description="Load generator for the detection & segmentation API")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API base URL')
+    parser.add_argument('--local', action='store_true', help='Start api/server.py in-process on a free port')
+    parser.add_argument('--stub', action='store_true', help='With --local, use fake model backends (no GPU or weights)')
+    parser.add_argument('--stub-latency-ms', type=float, default=0.0, help='Simulated YOLO and SAM encoder latency of the fake backends')
+    parser.add_argument('--images', default='data/input', help='Folder with the image corpus')
+    parser.add_argument('--max-images', type=int, default=None, help='Maximum images to load')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Comma-separated endpoints to test')
+    parser.add_argument('--concurrency', type=int, default=4, help='Closed-loop concurrent clients')
+    parser.add_argument('--rate', type=float, default=None, help='Open-loop arrival rate (req/s); overrides --concurrency')
+    parser.add_argument('--arrival', choices=['poisson', 'constant'], default='poisson', help='Open-loop arrival process')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Open-loop maximum in-flight requests')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per endpoint')
+    parser.add_argument('--requests', type=int, default=None, help='Requests per endpoint (overrides --duration)')
+    parser.add_argument('--warmup', type=int, default=2, help='Warmup requests per endpoint (not recorded)')
+    parser.add_argument('--return-image', action='store_true', help='Request annotated images')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Request timeout in seconds')
+    parser.add_argument('--output', default=None, help='JSON report path')
+    
+    args = parser.parse_args()
+    
+    corpus = load_corpus(args.images, args.max_images)
+    if not corpus:
+        print(f"No images found in {args.images}/")
+        sys.exit(1)
+    
+    # Resolve before starting the local server, which changes the working directory
+    output_path = Path(args.output or f"results/metrics/load_test_{datetime.now():%Y%m%d_%H%M%S}.json").resolve()
+    
+    base_url = start_local_server(args.stub, args.stub_latency_ms) if args.local else args.url
+    endpoints = [e.strip().strip('/') for e in args.endpoints.split(',') if e.strip()]
+    duration = None if args.requests else args.duration
+    
+    print("=" * 60)
+    print("API LOAD TEST")
+    print("=" * 60)
+    print(f"Target: {base_url}")
+    print(f"Corpus: {len(corpus)} images from {args.images}")
+    if args.rate:
+        print(f"Mode: open loop, {args.rate} req/s ({args.arrival})")
+    else:
+        print(f"Mode: closed loop, concurrency {args.concurrency}")
+    print("=" * 60)
+    
+    try:
+        health = requests.get(f"{base_url}/health", timeout=5)
+        print(f"Server health: {health.json().get('status')}")
+    except requests.RequestException as e:
+        print(f"Error connecting to server: {e}")
+        sys.exit(1)
+    
+    generator = LoadGenerator(base_url, corpus, args.return_image, args.timeout)
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'url': base_url,
+        'mode': 'open_loop' if args.rate else 'closed_loop',
+        'concurrency': None if args.rate else args.concurrency,
+        'rate': args.rate,
+        'arrival': args.arrival if args.rate else None,
+        'corpus_size': len(corpus),
+        'stub': bool(args.local and args.stub),
+        'endpoints': {}
+    }
+    
+    for endpoint in endpoints:
+        if endpoint not in ENDPOINTS:
+            print(f"Skipping unknown endpoint: /{endpoint}")
+            continue
+        
+        for _ in range(args.warmup):
+            generator.send(endpoint)
+        
+        start = time.perf_counter()
+        if args.rate:
+            samples = generator.run_open_loop(
+                endpoint, args.rate, duration, args.requests,
+                arrival=args.arrival, max_inflight=args.max_inflight
+            )
+        else:
+            samples = generator.run_closed_loop(endpoint, args.concurrency, duration, args.requests)
+        wall_time = time.perf_counter() - start
+        
+        summary = summarize(samples, wall_time)
+        report['endpoints'][endpoint] = summary
+        print_summary(endpoint, summary)
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\nReport saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
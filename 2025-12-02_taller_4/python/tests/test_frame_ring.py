@@ -0,0 +1,97 @@
+"""
+Tests for the shared-memory frame ring in detection/frame_ring.py
+
+    python -m pytest tests/test_frame_ring.py -q
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from detection.frame_ring import SharedFrameRing
+
+FRAME_SHAPE = (4, 6, 3)
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full(FRAME_SHAPE, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(FRAME_SHAPE, num_slots=4)
+    yield ring
+    ring.release()
+
+
+def read_all(ring: SharedFrameRing, **kwargs) -> list:
+    """(seq, frame value) of every frame available now."""
+    read = []
+    while True:
+        seq, data, _ = ring.get(timeout=0.01, **kwargs)
+        if not seq:
+            return read
+        read.append((seq, int(data[0, 0, 0])))
+
+
+def test_frames_come_out_in_order(ring):
+    for value in (10, 20, 30):
+        ring.put(frame(value), timestamp=float(value))
+    
+    seq, data, timestamp = ring.get(timeout=0.01)
+    assert (seq, timestamp) == (1, 10.0)
+    assert np.array_equal(data, frame(10))
+    
+    assert read_all(ring) == [(2, 20), (3, 30)]
+    assert ring.dropped == 0
+
+
+def test_full_ring_drops_oldest(ring):
+    for value in range(1, 7):
+        ring.put(frame(value))
+    
+    # Four slots: frames 1 and 2 were overwritten before being read
+    assert read_all(ring) == [(3, 3), (4, 4), (5, 5), (6, 6)]
+    assert ring.dropped == 2
+
+
+def test_latest_skips_to_newest(ring):
+    for value in (1, 2, 3):
+        ring.put(frame(value))
+    
+    assert read_all(ring, latest=True) == [(3, 3)]
+    assert ring.dropped == 2
+
+
+def test_blocking_put_waits_instead_of_overwriting(ring):
+    for value in range(1, 5):
+        assert ring.put(frame(value), block=True, timeout=0.01)
+    
+    assert ring.put(frame(5), block=True, timeout=0.01) == 0
+    assert read_all(ring) == [(1, 1), (2, 2), (3, 3), (4, 4)]
+    assert ring.dropped == 0
+    
+    # Room again once the consumer has read
+    assert ring.put(frame(5), block=True, timeout=0.01) == 5
+
+
+def test_closed_ring_drains_then_stops(ring):
+    ring.put(frame(7))
+    ring.close()
+    
+    assert read_all(ring) == [(1, 7)]
+    seq, data, _ = ring.get(timeout=5.0)
+    assert (seq, data) == (0, None)
+
+
+def test_attached_ring_shares_frames(ring):
+    other = SharedFrameRing(**ring.spec())
+    try:
+        other.put(frame(42))
+        seq, data, _ = ring.get(timeout=0.01)
+        assert seq == 1 and np.array_equal(data, frame(42))
+    finally:
+        other.release()
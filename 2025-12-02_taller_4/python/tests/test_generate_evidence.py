@@ -0,0 +1,61 @@
+"""
+Tests for the GIF writer in utils/generate_evidence.py
+
+    python -m pytest tests/test_generate_evidence.py -q
+"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageSequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.generate_evidence import GifWriter, video_to_gif
+
+
+def write_ramp_clip(path: Path, num_frames: int = 40, fps: int = 20) -> list:
+    """Clip that brightens from 27 to 162 and drifts from red to blue; returns the RGB colors."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (96, 64))
+    colors = []
+    for i in range(num_frames):
+        t = i / (num_frames - 1)
+        gray = 27 + 135 * t
+        rgb = np.array([gray + 60 * (1 - t), gray, gray + 60 * t]).clip(0, 255)
+        frame = np.empty((64, 96, 3), dtype=np.uint8)
+        frame[:] = rgb[::-1].astype(np.uint8)  # BGR
+        writer.write(frame)
+        colors.append(rgb)
+    writer.release()
+    return colors
+
+
+def gif_frame_means(path: Path) -> list:
+    with Image.open(path) as gif:
+        return [np.asarray(frame.convert('RGB'), dtype=np.float64).mean(axis=(0, 1))
+                for frame in ImageSequence.Iterator(gif)]
+
+
+def test_global_palette_follows_changing_colors(tmp_path):
+    clip = tmp_path / 'ramp.mp4'
+    colors = write_ramp_clip(clip)
+    
+    output = tmp_path / 'ramp.gif'
+    video_to_gif(str(clip), str(output), duration=2, fps=5, scale=1.0, palette='global')
+    
+    means = gif_frame_means(output)
+    assert len(means) == 10
+    # GIF frame k is source frame 4k
+    for k, mean in enumerate(means):
+        assert np.abs(mean - colors[4 * k]).max() < 12, (k, mean, colors[4 * k])
+
+
+def test_adaptive_palette_follows_changing_colors(tmp_path):
+    output = tmp_path / 'adaptive.gif'
+    with GifWriter(output, fps=5) as writer:
+        for value in (20, 90, 160, 230):
+            writer.write(np.full((32, 48, 3), value, dtype=np.uint8))
+    
+    means = gif_frame_means(output)
+    assert [round(mean.mean()) for mean in means] == [20, 90, 160, 230]
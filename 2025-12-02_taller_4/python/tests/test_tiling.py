@@ -0,0 +1,90 @@
+"""
+Tests for tiled inference helpers in detection/yolo_detector.py
+
+    python -m pytest tests/test_tiling.py -q
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from detection.yolo_detector import compute_tiles, merge_detections
+
+
+def detection(bbox, confidence, class_id=0):
+    return {'bbox': bbox, 'confidence': confidence, 'class_id': class_id, 'class_name': str(class_id)}
+
+
+@pytest.mark.parametrize('shape', [(1080, 1920), (2160, 3840), (1000, 1000), (1300, 700)])
+def test_tiles_cover_image_and_end_at_border(shape):
+    h, w = shape
+    tiles = compute_tiles(shape, 640, overlap=0.2)
+    
+    covered = np.zeros(shape, dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        assert 0 <= x1 < x2 <= w and 0 <= y1 < y2 <= h
+        # Border tiles are shifted inwards rather than cut short
+        assert (x2 - x1, y2 - y1) == (min(640, w), min(640, h))
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    
+    assert max(t[2] for t in tiles) == w
+    assert max(t[3] for t in tiles) == h
+
+
+def test_neighbouring_tiles_overlap():
+    tiles = compute_tiles((640, 1920), 640, overlap=0.2)
+    starts = sorted(t[0] for t in tiles)
+    assert starts[0] == 0 and starts[-1] == 1920 - 640
+    # Every step is at most the stride, so neighbours share >= 20% of a tile
+    assert all(0 < b - a <= 512 for a, b in zip(starts, starts[1:]))
+
+
+def test_image_smaller_than_tile_is_one_tile():
+    assert compute_tiles((300, 500), 640) == [[0, 0, 500, 300]]
+
+
+def test_duplicate_across_tiles_is_merged():
+    # Same object: whole in one tile, cut by the border of the next one
+    full = detection([100, 100, 200, 200], 0.9)
+    cut = detection([150, 100, 210, 200], 0.6)
+    
+    merged = merge_detections([cut, full])
+    
+    assert len(merged) == 1
+    assert merged[0]['confidence'] == 0.9
+    assert merged[0]['bbox'] == [100, 100, 210, 200]
+
+
+def test_distinct_classes_are_kept():
+    person = detection([100, 100, 200, 200], 0.9, class_id=0)
+    bicycle = detection([100, 100, 200, 200], 0.8, class_id=1)
+    
+    merged = merge_detections([bicycle, person])
+    
+    assert [d['class_id'] for d in merged] == [0, 1]
+    assert all(d['bbox'] == [100, 100, 200, 200] for d in merged)
+
+
+def test_separate_objects_are_kept():
+    dets = [detection([0, 0, 50, 50], 0.7), detection([100, 0, 150, 50], 0.8)]
+    
+    merged = merge_detections(dets)
+    
+    assert [d['confidence'] for d in merged] == [0.8, 0.7]
+
+
+def test_iou_metric_does_not_merge_partial_box():
+    # Intersection over smaller is 1.0, IoU only 0.5
+    dets = [detection([100, 100, 200, 200], 0.9), detection([150, 100, 200, 200], 0.6)]
+    
+    assert len(merge_detections(dets, match_threshold=0.6, metric='ios')) == 1
+    assert len(merge_detections(dets, match_threshold=0.6, metric='iou')) == 2
+
+
+def test_unknown_metric_raises():
+    with pytest.raises(ValueError):
+        merge_detections([], metric='giou')
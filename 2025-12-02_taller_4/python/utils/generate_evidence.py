@@ -6,12 +6,13 @@ import cv2
 import numpy as np
 from pathlib import Path
 import sys
-from PIL import Image
-import imageio
+import time
+from PIL import Image, GifImagePlugin
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 from detection.pipeline import DetectionSegmentationPipeline
+from detection.video_io import open_video_reader, open_video_writer
 
 
 def create_demo_video(
@@ -35,10 +36,11 @@ def create_demo_video(
     pipeline = DetectionSegmentationPipeline()
     
     # Open video source
+    video_config = pipeline.config.get('video', {})
     if input_path == 'webcam':
-        cap = cv2.VideoCapture(0)
+        cap = open_video_reader(0, video_config)
     else:
-        cap = cv2.VideoCapture(input_path)
+        cap = open_video_reader(input_path, video_config)
     
     if not cap.isOpened():
         print(f"Error: Could not open video source: {input_path}")
@@ -49,10 +51,8 @@ def create_demo_video(
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
-    # Video writer
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # Video writer (codec from config.yaml video.codec)
+    writer = open_video_writer(output_path, fps, (width, height), video_config)
     
     frame_count = 0
     max_frames = duration * fps
@@ -70,7 +70,7 @@ def create_demo_video(
                 detections, det_time = pipeline.detector.detect(frame)
                 
                 if len(detections) > 0:
-                    detections, _ = pipeline.segmenter.segment_detections(frame, detections)
+                    detections, _, _ = pipeline.segmenter.segment_detections(frame, detections)
                 
                 result = pipeline._create_visualization(frame, detections)
                 
@@ -101,13 +101,129 @@ def create_demo_video(
     print(f"  Total frames: {frame_count}")
 
 
+class GifWriter:
+    """
+    Write an animated GIF one frame at a time.
+    
+    Frames are quantized and LZW-encoded as they arrive and written straight
+    to the file, so memory stays at one frame regardless of clip length
+    (imageio.mimsave needs every RGB frame in a list first). Only the region
+    that changed since the previous frame is stored.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        fps: float = 10,
+        palette: str = 'adaptive',
+        loop: int = 0,
+        dither: bool = True,
+        palette_samples: list = None
+    ):
+        """
+        Open the output file.
+        
+        Args:
+            path: Output GIF path
+            fps: Playback frame rate
+            palette: 'adaptive' builds a palette per frame; 'global' quantizes one
+                palette from palette_samples plus the first frame and maps every
+                frame onto it (smaller files, but colors missing from the samples
+                are lost, so sample across the whole clip)
+            loop: Number of loops (0 = forever)
+            dither: Floyd-Steinberg dithering when mapping colors
+            palette_samples: RGB frames spread over the clip for the 'global' palette
+        """
+        if palette not in ('global', 'adaptive'):
+            raise ValueError(f"Unknown palette mode: {palette}")
+        self.path = Path(path)
+        self.duration = int(round(1000 / fps))
+        self.palette = palette
+        self.loop = loop
+        self.dither = Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE
+        self.frames = 0
+        self.size = None
+        self._palette_image = None
+        self._palette_samples = list(palette_samples or [])
+        self._previous = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb')
+    
+    def _build_palette(self, first: np.ndarray) -> Image.Image:
+        """Median-cut palette over a mosaic of the sampled frames (each shrunk to 320 px wide)."""
+        tiles = []
+        for sample in [first] + self._palette_samples:
+            h, w = sample.shape[:2]
+            tile_w = min(w, 320)
+            tile_h = max(1, h * tile_w // w)
+            tile = cv2.resize(sample, (tile_w, tile_h), interpolation=cv2.INTER_AREA)
+            if tile_w < 320:
+                tile = cv2.copyMakeBorder(tile, 0, 0, 0, 320 - tile_w, cv2.BORDER_REPLICATE)
+            tiles.append(tile)
+        mosaic = Image.fromarray(np.ascontiguousarray(np.vstack(tiles)))
+        return mosaic.quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    
+    def _quantize(self, rgb: np.ndarray) -> Image.Image:
+        image = Image.fromarray(rgb)
+        if self._palette_image is None:
+            return image.quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=self.dither)
+        return image.quantize(palette=self._palette_image, dither=self.dither)
+    
+    def write(self, frame: np.ndarray):
+        """Append an RGB frame (resized to the first frame's size if needed)."""
+        if self.size is None:
+            self.size = (frame.shape[1], frame.shape[0])
+        elif (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        frame = np.ascontiguousarray(frame)
+        
+        if self.frames == 0:
+            if self.palette == 'global':
+                self._palette_image = self._build_palette(frame)
+                self._palette_samples = []
+            first = self._quantize(frame)
+            header, _ = GifImagePlugin.getheader(first, info={'loop': self.loop, 'duration': self.duration})
+            self._file.writelines(header)
+            region, offset = first, (0, 0)
+        else:
+            # Store only the bounding box of the pixels that changed
+            changed = np.any(frame != self._previous, axis=2)
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            else:
+                y0, y1, x0, x1 = 0, 1, 0, 1
+            region, offset = self._quantize(frame[y0:y1, x0:x1]), (int(x0), int(y0))
+        
+        self._file.writelines(GifImagePlugin.getdata(
+            region, offset, duration=self.duration, disposal=1,
+            include_color_table=self.palette == 'adaptive' and self.frames > 0
+        ))
+        self._previous = frame
+        self.frames += 1
+    
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(b';')  # GIF trailer
+        self._file.close()
+    
+    def __enter__(self) -> 'GifWriter':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
 def video_to_gif(
     video_path: str,
     output_path: str,
     start_time: float = 0,
     duration: float = 5,
     fps: int = 10,
-    scale: float = 0.5
+    scale: float = 0.5,
+    palette: str = 'global'
 ):
     """
     Convert video segment to GIF.
@@ -119,48 +235,72 @@ def video_to_gif(
         duration: Duration in seconds
         fps: GIF frame rate
         scale: Scale factor for size reduction
+        palette: 'global' (one palette sampled across the clip) or 'adaptive' (per frame)
     """
     print(f"Creating GIF from {video_path}")
     
     cap = cv2.VideoCapture(video_path)
-    original_fps = int(cap.get(cv2.CAP_PROP_FPS))
+    original_fps = cap.get(cv2.CAP_PROP_FPS) or 30
     
     # Calculate frame range
     start_frame = int(start_time * original_fps)
     end_frame = int((start_time + duration) * original_fps)
-    frame_step = max(1, original_fps // fps)
-    
-    # Set start position
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_step = max(1, int(original_fps // fps))
+    
+    # The global palette is built from frames spread over the segment
+    samples = []
+    if palette == 'global':
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        last = min(end_frame, total_frames) - 1 if total_frames > 0 else end_frame - 1
+        for index in np.unique(np.linspace(start_frame, max(start_frame, last), 8, dtype=int)):
+            if not cap.set(cv2.CAP_PROP_POS_FRAMES, int(index)):
+                break
+            ret, sample = cap.read()
+            if ret:
+                sample = cv2.resize(sample, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                samples.append(cv2.cvtColor(sample, cv2.COLOR_BGR2RGB))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    
+    # Seek straight to the start; decode forward if the backend cannot seek
+    if start_frame and not cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame):
+        for _ in range(start_frame):
+            if not cap.grab():
+                break
     
-    frames = []
     frame_count = start_frame
+    writer = None
     
-    while frame_count < end_frame:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if (frame_count - start_frame) % frame_step == 0:
-            # Resize frame
-            h, w = frame.shape[:2]
-            new_w = int(w * scale)
-            new_h = int(h * scale)
-            resized = cv2.resize(frame, (new_w, new_h))
+    try:
+        while frame_count < end_frame:
+            # Frames between GIF frames are grabbed but never decoded
+            if not cap.grab():
+                break
             
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-            frames.append(rgb_frame)
-        
-        frame_count += 1
-    
-    cap.release()
+            if (frame_count - start_frame) % frame_step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                
+                # Resize frame
+                h, w = frame.shape[:2]
+                new_w = int(w * scale)
+                new_h = int(h * scale)
+                resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+                
+                # Convert BGR to RGB and append to the GIF
+                if writer is None:
+                    writer = GifWriter(output_path, fps=fps, palette=palette, palette_samples=samples)
+                writer.write(cv2.cvtColor(resized, cv2.COLOR_BGR2RGB))
+            
+            frame_count += 1
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.close()
     
-    if frames:
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        imageio.mimsave(output_path, frames, fps=fps)
+    if writer is not None:
         print(f"✓ GIF saved: {output_path}")
-        print(f"  Frames: {len(frames)} | Duration: {len(frames)/fps:.1f}s")
+        print(f"  Frames: {writer.frames} | Duration: {writer.frames/fps:.1f}s")
     else:
         print("No frames extracted for GIF")
 
@@ -169,39 +309,76 @@ def create_screenshot_sequence(
     video_path: str,
     output_dir: str,
     num_screenshots: int = 6,
-    interval: str = 'uniform'
+    interval: str = 'uniform',
+    seed: int = None
 ):
     """
     Extract screenshots from video.
     
+    The target frames are sorted and read in one forward pass: frames in
+    between are grabbed and only the wanted ones are retrieved. grab() still
+    decodes, so a gap is skipped with a seek when that is cheaper; both costs
+    are measured as the pass goes (a seek is assumed to cost 30 frames until
+    one has been timed).
+    
     Args:
         video_path: Path to video file
         output_dir: Directory to save screenshots
         num_screenshots: Number of screenshots to extract
         interval: 'uniform' or 'random'
+        seed: Seed for 'random' (None for a different selection every run)
     """
     print(f"Extracting {num_screenshots} screenshots from {video_path}")
     
     cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    if total_frames <= 0:
+        cap.release()
+        print(f"Error: Could not read frames from {video_path}")
+        return
     
-    # Determine frame indices
+    # Determine frame indices (sorted, without repeats)
     if interval == 'uniform':
-        frame_indices = np.linspace(0, total_frames - 1, num_screenshots, dtype=int)
+        frame_indices = np.unique(np.linspace(0, total_frames - 1, num_screenshots, dtype=int))
     else:
-        frame_indices = np.random.randint(0, total_frames, num_screenshots)
-        frame_indices.sort()
+        rng = np.random.default_rng(seed)
+        frame_indices = np.sort(rng.choice(total_frames, min(num_screenshots, total_frames), replace=False))
     
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
-    for i, frame_idx in enumerate(frame_indices, 1):
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = cap.read()
+    position = 0  # Index of the frame the next grab() returns
+    grab_time, grabs = 0.0, 0
+    seek_time, seeks = 0.0, 0
+    
+    for i, target in enumerate(frame_indices, 1):
+        gap = int(target) - position
+        seek_frames = seek_time / seeks / (grab_time / grabs) if seeks and grabs else 30
+        start = time.perf_counter()
+        ok = False
         
+        if gap > seek_frames:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(target))
+            ok = cap.grab()
+            seek_time += time.perf_counter() - start
+            seeks += 1
+        else:
+            # Grab (without retrieving) up to and including the target
+            for _ in range(gap + 1):
+                ok = cap.grab()
+                if not ok:
+                    break
+            grab_time += time.perf_counter() - start
+            grabs += gap + 1
+        
+        if not ok:
+            break
+        position = int(target) + 1
+        
+        ret, frame = cap.retrieve()
         if ret:
-            output_path = Path(output_dir) / f"screenshot_{i:02d}_frame_{frame_idx:05d}.jpg"
+            output_path = Path(output_dir) / f"screenshot_{i:02d}_frame_{target:05d}.jpg"
             cv2.imwrite(str(output_path), frame)
-            print(f"  ✓ Screenshot {i}/{num_screenshots} saved")
+            print(f"  ✓ Screenshot {i}/{len(frame_indices)} saved")
     
     cap.release()
     print(f"✓ All screenshots saved to: {output_dir}")
@@ -222,17 +399,21 @@ def create_comparison_gif(
     """
     print(f"Creating comparison GIF with {len(image_paths)} images")
     
-    frames = []
-    for img_path in image_paths:
-        img = cv2.imread(img_path)
-        if img is not None:
-            rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            frames.append(rgb)
-    
-    if frames:
-        fps = 1 / duration_per_image
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        imageio.mimsave(output_path, frames, fps=fps)
+    # Unrelated images: one palette per frame
+    writer = None
+    try:
+        for img_path in image_paths:
+            img = cv2.imread(img_path)
+            if img is None:
+                continue
+            if writer is None:
+                writer = GifWriter(output_path, fps=1 / duration_per_image, palette='adaptive')
+            writer.write(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if writer is not None:
         print(f"✓ Comparison GIF saved: {output_path}")
     else:
         print("No valid images found")
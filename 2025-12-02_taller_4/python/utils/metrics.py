@@ -2,18 +2,17 @@
 Metrics and Performance Monitoring
 Track FPS, latency, resource usage, and other metrics.
 """
+import sys
 import time
 import psutil
-import pandas as pd
+import numpy as np
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 import json
 
-try:
-    import torch
-except ImportError:
-    torch = None
+# pandas is imported by the methods that build DataFrames; torch is never
+# imported here (see record_frame)
 
 
 class MetricsTracker:
@@ -54,7 +53,9 @@ class MetricsTracker:
         gpu_memory_mb = 0
         gpu_utilization = 0
         
-        if torch and torch.cuda.is_available():
+        # Only look at the GPU if a model already loaded torch
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
             gpu_memory_mb = torch.cuda.memory_allocated() / 1024 / 1024
             # Note: GPU utilization requires nvidia-ml-py3 for accurate readings
         
@@ -84,6 +85,8 @@ class MetricsTracker:
         if not self.metrics:
             return {}
         
+        import pandas as pd
+        
         df = pd.DataFrame(self.metrics)
         
         summary = {
@@ -120,6 +123,8 @@ class MetricsTracker:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        import pandas as pd
+        
         df = pd.DataFrame(self.metrics)
         df.to_csv(output_path, index=False)
         
@@ -288,6 +293,100 @@ class BenchmarkRunner:
         return results
 
 
+def box_iou(box: List[float], boxes: np.ndarray) -> np.ndarray:
+    """
+    IoU between one box and an array of boxes, all [x1, y1, x2, y2].
+    
+    Args:
+        box: Reference box
+        boxes: Array (N, 4)
+    
+    Returns:
+        Array (N,) of IoU values
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def mask_iou(mask_a: np.ndarray, mask_b: np.ndarray) -> float:
+    """IoU between two binary masks (1.0 if both are empty)."""
+    union = np.logical_or(mask_a, mask_b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(mask_a, mask_b).sum() / union)
+
+
+def detection_map(
+    predictions: List[List[Dict]],
+    references: List[List[Dict]],
+    iou_threshold: float = 0.5
+) -> Dict:
+    """
+    Mean average precision of predictions against reference detections.
+    
+    References can be ground truth or the output of a baseline model
+    (e.g. FP32 vs INT8 agreement).
+    
+    Args:
+        predictions: Per image, detections with 'bbox', 'confidence', 'class_id'
+        references: Per image, detections with 'bbox' and 'class_id'
+        iou_threshold: Minimum IoU for a true positive
+    
+    Returns:
+        Dictionary with 'map' and per-class 'ap'; a class that is predicted
+        but absent from the references scores 0 (all false positives), and
+        'map' is 1.0 only when both sides are empty
+    """
+    class_ids = sorted({d['class_id'] for dets in list(references) + list(predictions) for d in dets})
+    ap_per_class = {}
+    
+    for cls_id in class_ids:
+        num_refs = sum(1 for dets in references for d in dets if d['class_id'] == cls_id)
+        if num_refs == 0:
+            ap_per_class[cls_id] = 0.0
+            continue
+        
+        # All predictions of this class, highest confidence first
+        scored = [
+            (d['confidence'], img_idx, d['bbox'])
+            for img_idx, dets in enumerate(predictions)
+            for d in dets if d['class_id'] == cls_id
+        ]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        
+        matched = {}
+        tp = np.zeros(len(scored))
+        for i, (_, img_idx, bbox) in enumerate(scored):
+            refs = [d['bbox'] for d in references[img_idx] if d['class_id'] == cls_id]
+            if not refs:
+                continue
+            ious = box_iou(bbox, np.array(refs))
+            best = int(ious.argmax())
+            used = matched.setdefault(img_idx, set())
+            if ious[best] >= iou_threshold and best not in used:
+                used.add(best)
+                tp[i] = 1
+        
+        # All-point interpolated area under the precision/recall curve
+        tp_cum = np.cumsum(tp)
+        recall = np.concatenate([[0], tp_cum / num_refs, [1]])
+        precision = np.concatenate([[1], tp_cum / np.arange(1, len(scored) + 1), [0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        ap_per_class[cls_id] = float(np.sum(np.diff(recall) * precision[1:]))
+    
+    return {
+        'map': float(np.mean(list(ap_per_class.values()))) if ap_per_class else 1.0,
+        'ap': ap_per_class
+    }
+
+
 def main():
     """Demo metrics tracking."""
     tracker = MetricsTracker()
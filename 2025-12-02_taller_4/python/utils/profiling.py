@@ -0,0 +1,283 @@
+"""
+Profiling Hooks
+Wrap a pipeline run or single API requests in a profiler and dump the
+result to results/profiles.
+
+Two modes:
+    cprofile  deterministic, pstats file (.prof) + top functions (.txt)
+              open with: python -m pstats file.prof  or  snakeviz file.prof
+    sampling  low-overhead stack sampler, collapsed stacks (.collapsed)
+              open with: flamegraph.pl file.collapsed > out.svg  or speedscope
+"""
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+PROFILE_MODES = ('cprofile', 'sampling')
+PROFILE_DIR = Path('results/profiles')
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+# cProfile can only hook one profiler per thread, and on Python 3.12+ only one
+# per process, so concurrent cProfile sessions are serialized
+_CPROFILE_LOCK = threading.Lock()
+
+
+class SamplingProfiler:
+    """
+    Periodically sample Python stacks from a background thread.
+    
+    Overhead is independent of the number of function calls, so it is safe to
+    leave on for a fraction of production requests.
+    """
+    
+    def __init__(self, interval_ms: float = 5.0, thread_ids: Optional[List[int]] = None):
+        """
+        Initialize sampling profiler.
+        
+        Args:
+            interval_ms: Time between samples
+            thread_ids: Threads to sample (None for all threads but the sampler)
+        """
+        self.interval = interval_ms / 1000
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.num_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if self.thread_ids is not None and thread_id not in self.thread_ids:
+                continue
+            
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.num_samples += 1
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def start(self):
+        """Start sampling in a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def save(self, output_base: Path) -> List[Path]:
+        """
+        Write collapsed stacks ("frame;frame;frame count" per line).
+        
+        Args:
+            output_base: Output path without extension
+        
+        Returns:
+            Written files
+        """
+        output_path = output_base.with_suffix('.collapsed')
+        with open(output_path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return [output_path]
+
+
+class CProfileProfiler:
+    """Deterministic profiler (cProfile) for the current thread."""
+    
+    def __init__(self, top_n: int = 40):
+        """
+        Initialize cProfile wrapper.
+        
+        Args:
+            top_n: Number of functions listed in the text summary
+        """
+        self.top_n = top_n
+        self.profile = cProfile.Profile()
+    
+    def start(self):
+        """Enable profiling (raises RuntimeError if another session is active)."""
+        if not _CPROFILE_LOCK.acquire(blocking=False):
+            raise RuntimeError("Another cProfile session is already active")
+        self.profile.enable()
+    
+    def stop(self):
+        """Disable profiling."""
+        self.profile.disable()
+        _CPROFILE_LOCK.release()
+    
+    def save(self, output_base: Path) -> List[Path]:
+        """
+        Write the pstats dump and a cumulative-time summary.
+        
+        Args:
+            output_base: Output path without extension
+        
+        Returns:
+            Written files
+        """
+        prof_path = output_base.with_suffix('.prof')
+        self.profile.dump_stats(str(prof_path))
+        
+        summary = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=summary)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        txt_path = output_base.with_suffix('.txt')
+        txt_path.write_text(summary.getvalue())
+        
+        return [prof_path, txt_path]
+
+
+def create_profiler(mode: str, **kwargs):
+    """
+    Create a profiler by mode name.
+    
+    Args:
+        mode: 'cprofile' or 'sampling'
+        **kwargs: Profiler options
+    
+    Returns:
+        Profiler instance
+    """
+    if mode == 'cprofile':
+        return CProfileProfiler(**kwargs)
+    if mode == 'sampling':
+        return SamplingProfiler(**kwargs)
+    raise ValueError(f"Unknown profile mode '{mode}'. Available: {', '.join(PROFILE_MODES)}")
+
+
+def save_profile(profiler, name: str, output_dir: Path = PROFILE_DIR) -> List[Path]:
+    """Save a stopped profiler as results/profiles/<name>_<timestamp>.*."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_base = output_dir / f"{name}_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+    return profiler.save(output_base)
+
+
+@contextmanager
+def profile_run(mode: Optional[str], name: str, output_dir: Path = PROFILE_DIR):
+    """
+    Profile the enclosed block; does nothing if mode is None.
+    
+    Example:
+        with profile_run(args.profile, 'video'):
+            processor.process_file(...)
+    """
+    if not mode:
+        yield None
+        return
+    
+    profiler = create_profiler(mode)
+    start_time = time.time()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        paths = save_profile(profiler, name, output_dir)
+        print(f"\nProfile ({mode}, {time.time() - start_time:.1f}s) saved to:")
+        for path in paths:
+            print(f"  {path}")
+
+
+def install_request_profiling(
+    app,
+    mode: Optional[str] = None,
+    sample_rate: float = 0.0,
+    output_dir: Path = PROFILE_DIR,
+    token: Optional[str] = None
+):
+    """
+    Profile Flask requests.
+    
+    A request is profiled at random with probability sample_rate or, when
+    a token is set, on demand: the X-Profile header (value 'cprofile' or
+    'sampling'; any other value uses the default mode) is only honored
+    together with a matching X-Profile-Token, since profiling writes files
+    and serializes cProfile requests. Profiled responses get an
+    X-Profile-Output header with the file names written to output_dir.
+    
+    Args:
+        app: Flask application
+        mode: Default mode for sampled and header-triggered requests
+        sample_rate: Fraction of requests to profile (0 disables sampling)
+        output_dir: Directory for profile files
+        token: Secret required for on-demand profiling (None ignores X-Profile)
+    """
+    from flask import g, request
+    
+    app.config['PROFILE_MODE'] = mode or 'sampling'
+    app.config['PROFILE_SAMPLE_RATE'] = sample_rate
+    app.config['PROFILE_DIR'] = Path(output_dir)
+    app.config['PROFILE_TOKEN'] = token
+    
+    def _header_allowed() -> bool:
+        token = app.config['PROFILE_TOKEN']
+        given = request.headers.get(PROFILE_TOKEN_HEADER, '')
+        return bool(token) and hmac.compare_digest(given.encode(), token.encode())
+    
+    @app.before_request
+    def _start_request_profile():
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested and _header_allowed():
+            request_mode = requested.lower() if requested.lower() in PROFILE_MODES else app.config['PROFILE_MODE']
+        elif random.random() < app.config['PROFILE_SAMPLE_RATE']:
+            request_mode = app.config['PROFILE_MODE']
+        else:
+            return
+        
+        if request_mode == 'sampling':
+            profiler = SamplingProfiler(thread_ids=[threading.get_ident()])
+        else:
+            profiler = CProfileProfiler()
+        try:
+            profiler.start()
+        except RuntimeError:
+            # cProfile busy with another request: skip rather than block
+            return
+        g.profiler = profiler
+    
+    def _finish_request_profile() -> List[str]:
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return []
+        profiler.stop()
+        name = f"request_{request.endpoint or 'unknown'}"
+        return [p.name for p in save_profile(profiler, name, app.config['PROFILE_DIR'])]
+    
+    @app.after_request
+    def _save_request_profile(response):
+        paths = _finish_request_profile()
+        if paths:
+            response.headers['X-Profile-Output'] = ','.join(paths)
+        return response
+    
+    @app.teardown_request
+    def _cleanup_request_profile(exc):
+        # after_request is skipped on unhandled errors; still release the profiler
+        _finish_request_profile()
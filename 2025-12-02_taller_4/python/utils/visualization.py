@@ -1,62 +1,114 @@
 """
 Visualization utilities for detection and segmentation results.
+
+Comparison panels and object grids are composed directly with OpenCV and
+NumPy (fast enough to run per frame); matplotlib and pandas are only
+imported by the metrics plots.
 """
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-import pandas as pd
+
+
+# Layout shared by the compositors (white background, black titles)
+_BACKGROUND = 255
+_TEXT_COLOR = (0, 0, 0)
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+_MARGIN = 10
+
+
+def _fit(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Resize a BGR/grayscale image to fit in width x height, keeping its aspect ratio."""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h)
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    return cv2.resize(image, size, interpolation=interpolation)
+
+
+def _title_height(lines: int, font_scale: float, thickness: int) -> int:
+    (_, th), baseline = cv2.getTextSize('Ag', _FONT, font_scale, thickness)
+    return lines * (th + baseline + 4) + 4
+
+
+def _draw_title(canvas: np.ndarray, title: str, x: int, y: int, width: int, font_scale: float, thickness: int):
+    """Draw a (possibly multi-line) title centered over [x, x + width) starting at y."""
+    for line in title.split('\n'):
+        (tw, th), baseline = cv2.getTextSize(line, _FONT, font_scale, thickness)
+        y += th + 4
+        cv2.putText(
+            canvas, line, (x + max(0, (width - tw) // 2), y),
+            _FONT, font_scale, _TEXT_COLOR, thickness, cv2.LINE_AA
+        )
+        y += baseline
+
+
+def _compose(
+    tiles: List[Optional[np.ndarray]],
+    titles: List[str],
+    cols: int,
+    cell_width: int,
+    cell_height: int,
+    font_scale: float,
+    thickness: int
+) -> np.ndarray:
+    """Place fitted tiles on a grid of titled cells (None leaves a cell empty)."""
+    rows = int(np.ceil(len(tiles) / cols))
+    title_h = _title_height(max(t.count('\n') + 1 for t in titles) if titles else 1, font_scale, thickness)
+    cell_h = title_h + cell_height
+    canvas = np.full(
+        (rows * cell_h + (rows + 1) * _MARGIN, cols * cell_width + (cols + 1) * _MARGIN, 3),
+        _BACKGROUND, dtype=np.uint8
+    )
+    
+    for i, (tile, title) in enumerate(zip(tiles, titles)):
+        r, c = divmod(i, cols)
+        x = _MARGIN + c * (cell_width + _MARGIN)
+        y = _MARGIN + r * (cell_h + _MARGIN)
+        if tile is None:
+            continue
+        _draw_title(canvas, title, x, y, cell_width, font_scale, thickness)
+        
+        h, w = tile.shape[:2]
+        ox = x + (cell_width - w) // 2
+        oy = y + title_h + (cell_height - h) // 2
+        canvas[oy:oy + h, ox:ox + w] = tile
+    
+    return canvas
 
 
 def create_comparison_image(
     images: List[np.ndarray],
     titles: List[str],
-    output_path: Optional[str] = None
+    output_path: Optional[str] = None,
+    panel_size: int = 750
 ) -> np.ndarray:
     """
     Create side-by-side comparison of images.
     
     Args:
-        images: List of images to compare
+        images: List of images to compare (BGR or grayscale)
         titles: List of titles for each image
         output_path: Optional path to save image
+        panel_size: Each image is fitted in a panel_size x panel_size box
         
     Returns:
-        Combined comparison image
+        Combined comparison image (BGR)
     """
-    n = len(images)
-    fig, axes = plt.subplots(1, n, figsize=(5*n, 5))
-    
-    if n == 1:
-        axes = [axes]
-    
-    for i, (img, title) in enumerate(zip(images, titles)):
-        # Convert BGR to RGB for matplotlib
-        if len(img.shape) == 3:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        else:
-            img_rgb = img
-        
-        axes[i].imshow(img_rgb)
-        axes[i].set_title(title, fontsize=14)
-        axes[i].axis('off')
-    
-    plt.tight_layout()
+    tiles = [_fit(img, panel_size, panel_size) for img in images]
+    # Rows are only as tall as the tallest fitted image
+    cell_height = max(t.shape[0] for t in tiles)
+    titles = list(titles) + [''] * (len(tiles) - len(titles))
+    comparison = _compose(tiles, titles, len(tiles), panel_size, cell_height, 1.0, 2)
     
     if output_path:
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        plt.savefig(output_path, bbox_inches='tight', dpi=150)
+        cv2.imwrite(str(output_path), comparison)
         print(f"Comparison saved to: {output_path}")
     
-    # Convert to numpy array
-    fig.canvas.draw()
-    comparison = np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8)
-    comparison = comparison.reshape(fig.canvas.get_width_height()[::-1] + (3,))
-    
-    plt.close()
-    
     return comparison
 
 
@@ -71,6 +123,9 @@ def plot_metrics_timeline(
         csv_path: Path to metrics CSV file
         output_path: Path to save plot
     """
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    
     df = pd.read_csv(csv_path)
     
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
@@ -122,7 +177,8 @@ def create_detection_grid(
     detections: List[Dict],
     image: np.ndarray,
     output_path: Optional[str] = None,
-    grid_size: Tuple[int, int] = (3, 3)
+    grid_size: Tuple[int, int] = (3, 3),
+    cell_size: int = 450
 ) -> np.ndarray:
     """
     Create a grid of detected objects.
@@ -132,46 +188,35 @@ def create_detection_grid(
         image: Original image
         output_path: Path to save grid
         grid_size: Grid dimensions (rows, cols)
+        cell_size: Each crop is fitted in a cell_size x cell_size box
         
     Returns:
-        Grid image
+        Grid image (BGR)
     """
     rows, cols = grid_size
-    max_objects = rows * cols
+    h, w = image.shape[:2]
     
-    fig, axes = plt.subplots(rows, cols, figsize=(3*cols, 3*rows))
-    axes = axes.flatten() if isinstance(axes, np.ndarray) else [axes]
-    
-    for i in range(max_objects):
-        if i < len(detections):
-            det = detections[i]
-            x1, y1, x2, y2 = det['bbox']
-            
-            # Crop object
-            obj_img = image[y1:y2, x1:x2]
-            
-            # Convert BGR to RGB
-            obj_rgb = cv2.cvtColor(obj_img, cv2.COLOR_BGR2RGB)
-            
-            axes[i].imshow(obj_rgb)
-            axes[i].set_title(
-                f"{det['class_name']}\n{det['confidence']:.2f}",
-                fontsize=10
-            )
-        else:
-            axes[i].axis('off')
+    tiles, titles = [], []
+    for det in detections[:rows * cols]:
+        x1, y1, x2, y2 = (int(v) for v in det['bbox'])
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
         
-        axes[i].set_xticks([])
-        axes[i].set_yticks([])
+        # Crop object (empty boxes leave the cell blank)
+        obj_img = image[y1:y2, x1:x2]
+        tiles.append(_fit(obj_img, cell_size, cell_size) if obj_img.size else None)
+        titles.append(f"{det['class_name']}\n{det['confidence']:.2f}")
     
-    plt.tight_layout()
+    # Keep the full grid size even with fewer detections
+    tiles += [None] * (rows * cols - len(tiles))
+    titles += [''] * (rows * cols - len(titles))
+    grid = _compose(tiles, titles, cols, cell_size, cell_size, 0.7, 1)
     
     if output_path:
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        plt.savefig(output_path, bbox_inches='tight', dpi=150)
+        cv2.imwrite(str(output_path), grid)
         print(f"Detection grid saved to: {output_path}")
     
-    plt.close()
+    return grid
 
 
 def annotate_image_advanced(